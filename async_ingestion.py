@@ -0,0 +1,131 @@
+import asyncio
+import random
+import threading
+
+try:
+    import websockets
+except ImportError:  # Opsiyonel bağımlılık - thread'li istemci yine çalışır
+    websockets = None
+
+
+class AsyncIngestionEngine:
+    """Tüm combined-stream bağlantılarını tek bir asyncio event loop'unda çalıştırır
+
+    Her bağlantı kendi yeniden bağlanma döngüsüne sahiptir (jitter'lı üstel
+    bekleme). Gelen mesajlar çözülüp bağlantı başına bir batch'te biriktirilir
+    ve tick deposuna toplu olarak yazılır.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=0.25,
+                 base_backoff=1.0, max_backoff=60.0):
+        """
+        batch_size: Bu kadar tick birikince depoya yaz
+        flush_interval: En geç bu kadar saniyede bir depoya yaz
+        base_backoff: İlk yeniden bağlanma beklemesi (saniye)
+        max_backoff: Maksimum yeniden bağlanma beklemesi (saniye)
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.loop = None
+        self.thread = None
+        self.running = False
+        self._tasks = []
+
+    # ---------------- Başlatma / durdurma ----------------
+    def start(self, connections):
+        """Event loop'u arka plan thread'inde başlat ve tüm bağlantıları aç
+
+        connections: [(url, parse, store), ...]
+                     parse(message) -> tick listesi, store.append_batch(ticks) ile yazılır
+        """
+        if websockets is None:
+            raise RuntimeError("asyncio modu için 'websockets' paketi gerekli (pip install websockets)")
+
+        self.running = True
+        loop = self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run_loop():
+            # stop() zaman aşımında self.loop'u sıfırlayabilir - yerel referans kullan
+            asyncio.set_event_loop(loop)
+            self._tasks = [loop.create_task(self._connection(url, parse, store, i + 1))
+                           for i, (url, parse, store) in enumerate(connections)]
+            ready.set()
+            try:
+                loop.run_until_complete(asyncio.gather(*self._tasks, return_exceptions=True))
+            finally:
+                loop.close()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True)
+        self.thread.start()
+        ready.wait()
+        print(f"✓ asyncio motoru başlatıldı ({len(connections)} bağlantı, tek event loop)")
+
+    def stop(self, timeout=5):
+        """Tüm bağlantıları kapat ve event loop'u durdur"""
+        self.running = False
+        if self.loop is None:
+            return
+        for task in self._tasks:
+            self.loop.call_soon_threadsafe(task.cancel)
+        if self.thread:
+            self.thread.join(timeout=timeout)
+        self.loop = None
+        self.thread = None
+        self._tasks = []
+
+    # ---------------- Bağlantı döngüsü ----------------
+    def _backoff(self, attempt):
+        """Jitter'lı üstel bekleme süresi (full jitter)"""
+        ceiling = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def _connection(self, url, parse, store, connection_id):
+        """Tek bir combined-stream bağlantısı (kopunca yeniden bağlanır)"""
+        attempt = 0
+        while self.running:
+            batch = []
+            flusher = None
+            try:
+                async with websockets.connect(url, ping_interval=20, max_size=None) as ws:
+                    print(f"WebSocket açıldı (asyncio #{connection_id})")
+                    attempt = 0
+                    flusher = asyncio.ensure_future(self._periodic_flush(batch, store))
+                    async for message in ws:
+                        ticks = parse(message)
+                        if ticks:
+                            batch.extend(ticks)
+                            if len(batch) >= self.batch_size:
+                                self._flush(batch, store)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                if self.running:
+                    print(f"⚠️  WebSocket hatası (asyncio #{connection_id}): {e}")
+            finally:
+                if flusher is not None:
+                    flusher.cancel()
+                self._flush(batch, store)
+
+            if not self.running:
+                break
+            delay = self._backoff(attempt)
+            attempt += 1
+            print(f"WebSocket kapandı (asyncio #{connection_id}), {delay:.1f}s sonra yeniden bağlanılıyor...")
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                break
+
+    async def _periodic_flush(self, batch, store):
+        """Mesaj akışı yavaşken bile batch'i düzenli olarak depoya yaz"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._flush(batch, store)
+
+    def _flush(self, batch, store):
+        if batch:
+            store.append_batch(batch)
+            batch.clear()
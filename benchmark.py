@@ -0,0 +1,860 @@
+"""
+Performans ölçüm scripti (mikro benchmark'lar)
+
+Kullanım:
+    python benchmark.py decode [--corpus mesajlar.jsonl] [--messages 200000]
+    python benchmark.py stress [--writers 8] [--seconds 5]
+    python benchmark.py record --output capture.tcap [--seconds 300] [--all-market] [--klines]
+    python benchmark.py replay [--capture capture.tcap] [--speed max|1|10] [--analyze]
+    python benchmark.py ingest [--symbols 2000] [--tick-rate 10] [--seconds 10] [--asyncio] [--all-market]
+    python benchmark.py klines [--symbols 500] [--limit 1000] [--workers 16] [--live]
+    python benchmark.py pairs [--symbols 2000] [--bars 500] [--threshold 0.7] [--top-k 100]
+    python benchmark.py rolling [--symbols 1000] [--window 1440] [--updates 30]
+    python benchmark.py blocked [--symbols 5000] [--bars 168] [--block 1024] [--skip-pandas]
+    python benchmark.py lsh [--symbols 5000] [--bars 168] [--threshold 0.7] [--bits 12] [--recall 0.95]
+    python benchmark.py leadlag [--symbols 400] [--bars 60] [--max-lag 10]
+    python benchmark.py robust [--symbols 500] [--bars 1440]
+    python benchmark.py tracker
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from tick_decoder import TickerDecoder, available_backends
+from tick_recorder import TickRecorder, TickReplayer
+from tick_store import TickStore
+
+
+# ==================== MESAJ KORPUSU ====================
+
+def synthetic_ticker_corpus(n_messages=200000, n_symbols=400, seed=42, step_ms=3):
+    """Gerçek 24hrTicker combined-stream mesajlarına benzeyen sentetik korpus
+
+    step_ms: Ardışık mesajlar arasındaki event time farkı
+    """
+    rng = random.Random(seed)
+    symbols = [f"COIN{i}USDT" for i in range(n_symbols)]
+    prices = [rng.uniform(0.01, 50000) for _ in symbols]
+    event_time = 1699420500000
+    corpus = []
+    for k in range(n_messages):
+        i = k % n_symbols
+        prices[i] *= 1 + rng.gauss(0, 0.001)
+        event_time += step_ms
+        payload = {
+            "stream": f"{symbols[i].lower()}@ticker",
+            "data": {
+                "e": "24hrTicker", "E": event_time, "s": symbols[i],
+                "p": f"{prices[i] * 0.01:.8f}", "P": f"{rng.uniform(-10, 10):.3f}",
+                "w": f"{prices[i]:.8f}", "x": f"{prices[i]:.8f}",
+                "c": f"{prices[i]:.8f}", "Q": "0.10000000",
+                "b": f"{prices[i]:.8f}", "B": "1.00000000",
+                "a": f"{prices[i]:.8f}", "A": "1.00000000",
+                "o": f"{prices[i]:.8f}", "h": f"{prices[i] * 1.02:.8f}",
+                "l": f"{prices[i] * 0.98:.8f}", "v": f"{rng.uniform(1e3, 1e7):.8f}",
+                "q": f"{rng.uniform(1e5, 1e9):.8f}", "O": event_time - 86400000,
+                "C": event_time, "F": 1, "L": 100000, "n": 100000
+            }
+        }
+        corpus.append(json.dumps(payload, separators=(',', ':')))
+    return corpus
+
+
+def load_corpus(path):
+    """Satır başına bir ham mesaj içeren korpus dosyasını oku"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+# ==================== DECODE BENCHMARK ====================
+
+def legacy_decode(message):
+    """Eski on_message yolu: tam json.loads + 4 dönüşüm + datetime.now()"""
+    data = json.loads(message)
+    stream_data = data.get('data', data)
+    symbol = stream_data.get('s')
+    price = float(stream_data.get('c', 0))
+    volume = float(stream_data.get('v', 0))
+    price_change = float(stream_data.get('P', 0))
+    timestamp = datetime.now()
+    if symbol and price > 0:
+        return [(symbol, timestamp, price, volume, price_change)]
+    return []
+
+
+def _messages_per_second(decode, corpus, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in corpus:
+            decode(message)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def bench_decode(corpus):
+    """Eski ve yeni decode yollarının saniyedeki mesaj sayısını raporla"""
+    print(f"\n{'='*80}")
+    print(f"DECODE BENCHMARK ({len(corpus):,} mesaj)")
+    print(f"{'='*80}")
+
+    results = {'legacy (json + datetime.now)': _messages_per_second(legacy_decode, corpus)}
+    for backend in available_backends():
+        decoder = TickerDecoder(backend)
+        results[f"TickerDecoder[{backend}]"] = _messages_per_second(decoder.decode, corpus)
+
+    baseline = results['legacy (json + datetime.now)']
+    print(f"{'Yol':<35} {'Mesaj/sn':>15} {'Hızlanma':>10}")
+    print(f"{'-'*62}")
+    for name, rate in results.items():
+        print(f"{name:<35} {rate:>15,.0f} {rate / baseline:>9.2f}x")
+    return results
+
+
+# ==================== TICK STORE STRESS TESTİ ====================
+
+def stress_tick_store(n_writers=8, seconds=5.0, symbols_per_writer=50, shared_symbols=5):
+    """Çok sayıda yazıcı thread'e karşı okuyucunun tutarlı görüntü aldığını doğrula
+
+    Her tick'in değerleri zaman damgasından türetilir (price = ts, volume = 2*ts),
+    böylece yırtık (yarım yazılmış) bir okuma hemen tespit edilir. Kapasite küçük
+    tutulur ki ring buffer sürekli dönsün ve okunan slotların üzerine yazılsın.
+    Bazı semboller tüm yazıcılar tarafından ortak yazılır. Sonda her buffer'daki
+    tick sayısı min(kapasite, yazılan) olmalıdır (kayıp yok).
+    """
+    print(f"\n{'='*80}")
+    print(f"TICK STORE STRESS TESTİ ({n_writers} yazıcı, {seconds:.0f} sn)")
+    print(f"{'='*80}")
+
+    capacity = 1000
+    store = TickStore(capacity=capacity)
+    stop = threading.Event()
+    written = [{} for _ in range(n_writers)]
+    errors = []
+    reads = {'snapshots': 0, 'buffers': 0}
+
+    def writer(w):
+        own = [f"W{w}S{i}USDT" for i in range(symbols_per_writer)]
+        shared = [f"SHARED{i}USDT" for i in range(shared_symbols)]
+        symbols = own + shared
+        ts = w  # Yazıcılar arasında çakışmayan zaman damgaları
+        counts = dict.fromkeys(symbols, 0)
+        n = 0
+        while not stop.is_set():
+            batch = []
+            for _ in range(100):
+                ts += n_writers
+                symbol = symbols[n % len(symbols)]
+                batch.append((symbol, ts, float(ts), 2.0 * ts, 0.0))
+                counts[symbol] += 1
+                n += 1
+            store.append_batch(batch)
+        written[w] = counts
+
+    def check(symbol, arrays):
+        timestamps = arrays['timestamp']
+        if not np.array_equal(arrays['price'], timestamps.astype(np.float64)) or \
+                not np.array_equal(arrays['volume'], 2.0 * timestamps):
+            errors.append(f"{symbol}: yırtık okuma")
+        if symbol.startswith('W') and len(timestamps) > 1 and (np.diff(timestamps) <= 0).any():
+            errors.append(f"{symbol}: sıra bozuk")
+
+    def reader():
+        while not stop.is_set():
+            try:
+                for symbol, buffer in store.items():
+                    check(symbol, buffer.arrays())
+                    reads['buffers'] += 1
+                store.snapshot(interval_ms=1000)
+                reads['snapshots'] += 1
+            except Exception as e:
+                errors.append(f"okuyucu: {type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(n_writers)]
+    threads.append(threading.Thread(target=reader))
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    per_symbol = {}
+    for counts in written:
+        for symbol, n in counts.items():
+            per_symbol[symbol] = per_symbol.get(symbol, 0) + n
+    total_written = sum(per_symbol.values())
+    expected = sum(min(capacity, n) for n in per_symbol.values())
+    stored = store.total_points()
+    for symbol, buffer in store.items():
+        check(symbol, buffer.arrays())
+
+    print(f"Yazılan tick: {total_written:,} ({total_written / elapsed:,.0f} tick/sn)")
+    print(f"Depodaki tick: {stored:,} (beklenen: {expected:,})")
+    print(f"Okuyucu: {reads['buffers']:,} buffer okuması, {reads['snapshots']:,} snapshot")
+    if errors or stored != expected:
+        print(f"❌ {len(errors)} tutarsızlık bulundu: {errors[:5]}")
+        return False
+    print("✓ Tüm okumalar tutarlı, tick kaybı yok")
+    return True
+
+
+# ==================== KAYIT / REPLAY ====================
+
+def record_live(output, seconds=300, all_market=False, klines=False):
+    """Canlı Binance stream'ini belirli bir süre boyunca kayıt dosyasına yaz"""
+    from binance_websocket import BinanceWebSocket
+
+    client = BinanceWebSocket(stream_mode='all_market' if all_market else 'ticker',
+                              subscribe_klines=klines)
+    client.get_usdt_pairs()
+    client.start_recording(output)
+    client.start_streaming()
+    try:
+        time.sleep(seconds)
+    except KeyboardInterrupt:
+        pass
+    client.stop_streaming()
+
+
+def synthetic_capture(path, n_messages=200000, n_symbols=400, step_ms=20):
+    """Sentetik ticker korpusunu kayıt formatına yaz (recv zamanı = event time)
+
+    Varsayılanlarla ~66 dakikalık akış üretir (sembol başına ~500 tick),
+    yani perform_analysis'in 1 saatlik penceresini doldurur.
+    """
+    recorder = TickRecorder(path, meta={'stream_mode': 'ticker', 'synthetic': True})
+    for message in synthetic_ticker_corpus(n_messages, n_symbols, step_ms=step_ms):
+        event_time = json.loads(message)['data']['E']
+        recorder.record(message, recv_ns=event_time * 1_000_000)
+    recorder.close()
+    return path
+
+
+def bench_replay(capture, speed=None, analyze=False, limit=None):
+    """Kayıt dosyasını handler'lardan geçir, verim / gecikme ve analiz süresini raporla"""
+    from binance_websocket import BinanceWebSocket
+    from tick_recorder import read_capture_meta
+
+    meta = read_capture_meta(capture)
+    client = BinanceWebSocket(stream_mode=meta.get('stream_mode', 'ticker'),
+                              market_stream=meta.get('market_stream', '!miniTicker@arr'),
+                              kline_interval=meta.get('kline_interval', '1m'),
+                              subscribe_klines=True)
+    replayer = TickReplayer(client, capture, speed=speed)
+
+    print(f"\n{'='*80}")
+    print(f"REPLAY BENCHMARK ({os.path.basename(capture)}, hız: {'maksimum' if speed is None else f'{speed:g}x'})")
+    print(f"{'='*80}")
+
+    # Handler'ın ilk tick çıktıları ölçümü kirletmesin
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        stats = replayer.replay(limit=limit)
+
+    print(f"Frame: {stats['frames']:,} ({stats['bytes'] / 1e6:.1f} MB) - {stats['elapsed']:.2f} sn")
+    print(f"Verim: {stats['frames_per_second']:,.0f} frame/sn")
+    h = stats['handler_us']
+    print(f"Handler süresi: p50 {h['p50']:.1f} µs | p99 {h['p99']:.1f} µs | max {h['max']:.1f} µs")
+    if 'lag_ms' in stats:
+        lag = stats['lag_ms']
+        print(f"Zamanlama gecikmesi: p50 {lag['p50']:.2f} ms | p99 {lag['p99']:.2f} ms | max {lag['max']:.2f} ms")
+    print(f"Depo: {len(client.tick_store)} coin, {client.tick_store.total_points():,} tick | "
+          f"{len(client.kline_store)} coin, {client.kline_store.total_points():,} bar")
+
+    if analyze:
+        from main import ContinuousAnalyzer
+
+        analyzer = ContinuousAnalyzer(stream_mode=client.stream_mode)
+        analyzer.ws = client
+        # Analiz çıktı dosyaları çalışma dizinini kirletmesin
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            try:
+                start = time.perf_counter()
+                analyzer.perform_analysis()
+                stats['analysis_seconds'] = time.perf_counter() - start
+            finally:
+                os.chdir(cwd)
+        print(f"\nperform_analysis süresi: {stats['analysis_seconds']:.2f} sn")
+    return stats
+
+
+# ==================== YEREL SUNUCUYLA UÇTAN UCA VERİM ====================
+
+def bench_ingest(n_symbols=2000, tick_rate=10.0, seconds=10.0, use_asyncio=False,
+                 all_market=False, rest_symbols=50):
+    """Yerel mock sunucuya karşı WebSocket alım ve REST kline çekme verimini ölç"""
+    import requests
+    from binance_websocket import BinanceWebSocket
+    from correlation_analyzer import CorrelationAnalyzer
+    from mock_binance_server import start_in_subprocess
+
+    # Sunucu ayrı süreçte - ölçülen verim istemcinin kendisi olsun
+    process, base_url, stream_url = start_in_subprocess(
+        n_symbols=n_symbols, tick_rate=tick_rate, weight_limit=None)
+    stats_url = base_url.replace('/api/v3', '/mock/stats')
+    try:
+        print(f"\n{'='*80}")
+        print(f"ALIM BENCHMARK ({n_symbols} sembol × {tick_rate:g} tick/sn, "
+              f"{'asyncio' if use_asyncio else 'thread'}, {'all_market' if all_market else 'ticker'})")
+        print(f"{'='*80}")
+
+        client = BinanceWebSocket(use_asyncio=use_asyncio,
+                                  stream_mode='all_market' if all_market else 'ticker',
+                                  base_url=base_url, stream_url=stream_url)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            client.get_usdt_pairs()
+            client.start_streaming()
+            time.sleep(1.0)  # Bağlantıların kurulması
+            before = client.tick_store.total_points()
+            sent_before = requests.get(stats_url).json()['ws_messages']
+            time.sleep(seconds)
+            after = client.tick_store.total_points()
+            sent_after = requests.get(stats_url).json()['ws_messages']
+            client.stop_streaming()
+
+        ingested = (after - before) / seconds
+        sent = (sent_after - sent_before) / seconds
+        if all_market:
+            sent *= n_symbols  # Her dizi mesajı tüm sembolleri taşır
+        target = n_symbols * tick_rate
+        print(f"Hedef: {target:,.0f} tick/sn | Sunucunun gönderdiği: {sent:,.0f} tick/sn")
+        print(f"Alınan: {ingested:,.0f} tick/sn (hedefin %{ingested / target * 100:.1f}'i)")
+        print(f"Depo: {len(client.tick_store)} coin, {client.tick_store.total_points():,} tick")
+
+        analyzer = CorrelationAnalyzer(base_url=base_url)
+        symbols = client.usdt_pairs[:rest_symbols]
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            data = analyzer.fetch_all_historical_data(symbols, interval='1m', limit=1000, delay=0)
+        elapsed = time.perf_counter() - start
+        print(f"REST kline: {len(data)}/{len(symbols)} sembol × 1000 bar, {elapsed:.2f} sn "
+              f"({len(symbols) / elapsed:.1f} istek/sn)")
+        return {'ticks_per_second': ingested, 'rest_requests_per_second': len(symbols) / elapsed}
+    finally:
+        process.terminate()
+
+
+def bench_klines(n_symbols=500, limit=1000, workers=16, live=False):
+    """Eşzamanlı kline çekicinin verimini ölç (varsayılan: yerel mock sunucu)"""
+    from kline_fetcher import KlineFetcher
+    from mock_binance_server import start_in_subprocess
+
+    process = None
+    if live:
+        from binance_websocket import BINANCE_REST_URL, BinanceWebSocket
+        base_url = BINANCE_REST_URL
+        symbols = BinanceWebSocket().get_usdt_pairs()[:n_symbols]
+    else:
+        process, base_url, _ = start_in_subprocess(n_symbols=n_symbols)
+        symbols = [f"MOCK{i:04d}USDT" for i in range(n_symbols)]
+
+    try:
+        print(f"\n{'='*80}")
+        print(f"KLINE ÇEKME BENCHMARK ({len(symbols)} sembol × {limit} bar, {workers} worker, "
+              f"{'canlı' if live else 'mock'})")
+        print(f"{'='*80}")
+        fetcher = KlineFetcher(base_url, max_workers=workers)
+        start = time.perf_counter()
+        results = fetcher.fetch_many(symbols, '1m', limit)
+        elapsed = time.perf_counter() - start
+        fetcher.close()
+        bars = sum(len(arrays['close']) for arrays in results.values())
+        print(f"✓ {len(results)}/{len(symbols)} sembol, {bars:,} bar - {elapsed:.2f} sn "
+              f"({len(symbols) / elapsed:.1f} istek/sn)")
+        return elapsed
+    finally:
+        if process is not None:
+            process.terminate()
+
+
+# ==================== KORELASYON ÇİFTLERİ ====================
+
+def synthetic_correlation_matrix(n_symbols=2000, n_bars=500, n_factors=8, seed=42):
+    """Faktör modelinden üretilmiş getirilerin korelasyon matrisi (DataFrame)"""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    loadings = rng.normal(0, 1, (n_symbols, n_factors)) * rng.uniform(0, 1.5, (n_symbols, 1))
+    returns = rng.normal(0, 1, (n_bars, n_factors)) @ loadings.T + rng.normal(0, 1, (n_bars, n_symbols))
+    symbols = [f"MOCK{i:04d}USDT" for i in range(n_symbols)]
+    return pd.DataFrame(returns, columns=symbols).corr()
+
+
+def legacy_high_correlations(correlation_matrix, threshold=0.7):
+    """Eski iç içe .loc döngüsü (karşılaştırma için)"""
+    high_corr = []
+    symbols = correlation_matrix.columns.tolist()
+    for i, symbol1 in enumerate(symbols):
+        for j, symbol2 in enumerate(symbols):
+            if i < j:
+                corr = correlation_matrix.loc[symbol1, symbol2]
+                if not np.isnan(corr) and abs(corr) >= threshold:
+                    high_corr.append({
+                        'coin1': symbol1,
+                        'coin2': symbol2,
+                        'correlation': float(corr),
+                        'abs_correlation': float(abs(corr))
+                    })
+    high_corr.sort(key=lambda x: x['abs_correlation'], reverse=True)
+    return high_corr
+
+
+def bench_pairs(n_symbols=2000, n_bars=500, threshold=0.7, top_k=100, legacy_symbols=300):
+    """Vektörel çift çıkarıcıyı eski döngüyle karşılaştır"""
+    from correlation_kernels import CoinNeighbors, high_correlation_records
+
+    print(f"\n{'='*80}")
+    print(f"KORELASYON ÇİFTİ BENCHMARK ({n_symbols} sembol, eşik {threshold}, top-{top_k})")
+    print(f"{'='*80}")
+
+    # Doğruluk: küçük matriste eski döngüyle birebir aynı sonuç
+    small = synthetic_correlation_matrix(legacy_symbols, n_bars)
+    start = time.perf_counter()
+    expected = legacy_high_correlations(small, threshold)
+    legacy_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = high_correlation_records(small, threshold=threshold)
+    kernel_seconds = time.perf_counter() - start
+    if actual != expected:
+        print(f"❌ Sonuç farklı: eski {len(expected)} çift, yeni {len(actual)} çift")
+        return False
+    print(f"✓ {legacy_symbols} sembolde sonuçlar aynı ({len(actual)} çift) - "
+          f"eski {legacy_seconds * 1000:.0f} ms, yeni {kernel_seconds * 1000:.1f} ms "
+          f"({legacy_seconds / kernel_seconds:.0f}x)")
+
+    matrix = synthetic_correlation_matrix(n_symbols, n_bars)
+    start = time.perf_counter()
+    pairs = high_correlation_records(matrix, threshold=threshold)
+    elapsed = time.perf_counter() - start
+    print(f"✓ {n_symbols} sembol ({n_symbols * (n_symbols - 1) // 2:,} çift): "
+          f"{len(pairs):,} çift eşik üstünde - {elapsed * 1000:.1f} ms")
+
+    if top_k:
+        start = time.perf_counter()
+        top = high_correlation_records(matrix, threshold=None, top_k=top_k)
+        elapsed = time.perf_counter() - start
+        print(f"✓ top-{top_k} (argpartition): en yüksek |r| = {top[0]['abs_correlation']:.4f} - "
+              f"{elapsed * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    neighbors = CoinNeighbors.from_matrix(matrix, k=10, threshold=threshold)
+    table_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    neighbors.to_dict()
+    print(f"✓ coin başına top-10 komşu tablosu: {table_seconds * 1000:.1f} ms "
+          f"(+ JSON dict {(time.perf_counter() - start) * 1000:.1f} ms)")
+    return True
+
+
+# ==================== ARTIMLI KORELASYON ====================
+
+def bench_rolling(n_symbols=1000, window=1440, n_updates=30, seed=42):
+    """Bar başına artımlı güncellemeyi tam df.corr() yeniden hesaplamasıyla karşılaştır"""
+    import pandas as pd
+    from correlation_kernels import EwmaCorrelation, RollingCorrelation
+
+    print(f"\n{'='*80}")
+    print(f"ARTIMLI KORELASYON BENCHMARK ({n_symbols} sembol, {window} bar pencere, {n_updates} yeni bar)")
+    print(f"{'='*80}")
+
+    rng = np.random.default_rng(seed)
+    loadings = rng.normal(0, 1, (n_symbols, 8))
+    returns = rng.normal(0, 1, (window + n_updates, 8)) @ loadings.T + rng.normal(0, 1, (window + n_updates, n_symbols))
+    returns[rng.random(returns.shape) < 0.01] = np.nan  # Ara sıra eksik bar
+
+    rolling = RollingCorrelation(range(n_symbols), window)
+    rolling.push(returns[:window])
+
+    start = time.perf_counter()
+    for t in range(window, window + n_updates):
+        rolling.push(returns[t])
+        incremental = rolling.matrix()
+    incremental_seconds = (time.perf_counter() - start) / n_updates
+
+    start = time.perf_counter()
+    for t in range(window + n_updates - 3, window + n_updates):
+        full = pd.DataFrame(returns[t + 1 - window:t + 1]).corr().to_numpy()
+    full_seconds = (time.perf_counter() - start) / 3
+
+    ewma = EwmaCorrelation(range(n_symbols), half_life=window / 4)
+    ewma.push(returns[:window])
+    start = time.perf_counter()
+    for t in range(window, window + n_updates):
+        ewma.push(returns[t])
+        ewma.matrix()
+    ewma_seconds = (time.perf_counter() - start) / n_updates
+
+    # Çok barlı partiler: pencere dolmadan başla, pencere sınırını partilerle geç
+    batched = RollingCorrelation(range(n_symbols), window)
+    batched.push(returns[:window - 7])
+    for start_bar in range(window - 7, window + n_updates - 5, 5):
+        batched.push(returns[start_bar:start_bar + 5])
+    end_bar = start_bar + 5
+    batch_full = pd.DataFrame(returns[end_bar - window:end_bar]).corr().to_numpy()
+
+    error = max(np.nanmax(np.abs(incremental - full)), np.nanmax(np.abs(batched.matrix() - batch_full)))
+    print(f"Tam df.corr():        {full_seconds * 1000:>9.1f} ms / bar")
+    print(f"Artımlı push+matrix:  {incremental_seconds * 1000:>9.1f} ms / bar "
+          f"({full_seconds / incremental_seconds:.1f}x, pencere {rolling._rows.nbytes / 1e6:.0f} MB)")
+    print(f"EWMA push+matrix:     {ewma_seconds * 1000:>9.1f} ms / bar (pencere saklanmaz)")
+    print(f"{'✓' if error < 1e-8 else '❌'} Maksimum fark: {error:.2e}")
+    return error < 1e-8
+
+
+# ==================== BLOKLU KORELASYON ====================
+
+def bench_blocked(n_symbols=5000, n_bars=168, block_size=1024, threshold=0.7, compare_pandas=True, seed=42):
+    """Bloklu memmap korelasyonunu df.corr() ile karşılaştır (süre + tepe bellek)"""
+    import tracemalloc
+    import pandas as pd
+    from correlation_kernels import blocked_correlation
+
+    print(f"\n{'='*80}")
+    print(f"BLOKLU KORELASYON BENCHMARK ({n_symbols} sembol × {n_bars} bar, blok {block_size})")
+    print(f"{'='*80}")
+
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 1, (n_bars, 8)) @ rng.normal(0, 1, (8, n_symbols)) + rng.normal(0, 2, (n_bars, n_symbols))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tracemalloc.start()
+        start = time.perf_counter()
+        matrix = np.lib.format.open_memmap(os.path.join(workdir, 'matrix.npy'), mode='w+',
+                                           dtype=np.float64, shape=(n_symbols, n_symbols))
+        rows, cols, values = blocked_correlation(returns, threshold, block_size, out=matrix)
+        blocked_seconds = time.perf_counter() - start
+        blocked_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"Bloklu (memmap):  {blocked_seconds:>7.2f} sn, tepe RAM {blocked_peak / 1e6:>7.1f} MB, "
+              f"{len(values):,} çift |r| ≥ {threshold}")
+
+        ok = True
+        if compare_pandas:
+            tracemalloc.start()
+            start = time.perf_counter()
+            reference = pd.DataFrame(returns).corr().to_numpy()
+            pandas_seconds = time.perf_counter() - start
+            pandas_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            error = np.nanmax(np.abs(np.asarray(matrix) - reference))
+            ok = error < 1e-10
+            print(f"df.corr():        {pandas_seconds:>7.2f} sn, tepe RAM {pandas_peak / 1e6:>7.1f} MB")
+            print(f"{'✓' if ok else '❌'} Maksimum fark: {error:.2e} ({pandas_seconds / blocked_seconds:.1f}x)")
+        del matrix
+    return ok
+
+
+# ==================== YAKLAŞIK ÇİFT ARAMA ====================
+
+def bench_lsh(n_symbols=5000, n_bars=168, threshold=0.7, n_bits=12, recall=0.95, n_sectors=60, seed=42):
+    """SimHash LSH çift aramasının kesin bloklu aramaya göre recall / precision / süre raporu
+
+    Getiriler sektör faktör modelinden üretilir (piyasa + sektör + gürültü, rastgele yüklemeler),
+    böylece eşiğin iki yanında gerçekçi sayıda çift olur. Sembollerin %5'i ters işaretlidir
+    (negatif korelasyonların da bulunduğunu doğrulamak için).
+    """
+    from correlation_kernels import (blocked_correlation, approximate_correlation_pairs, simhash_candidates,
+                                     simhash_tables, standardize_columns)
+
+    n_tables = simhash_tables(threshold, n_bits, recall)
+    print(f"\n{'='*80}")
+    print(f"SIMHASH LSH BENCHMARK ({n_symbols} sembol × {n_bars} bar, |r| ≥ {threshold}, "
+          f"{n_tables} tablo × {n_bits} bit)")
+    print(f"{'='*80}")
+
+    rng = np.random.default_rng(seed)
+    sector = rng.integers(0, n_sectors, n_symbols)
+    market = rng.normal(0, 1, (n_bars, 1)) * rng.uniform(0, 0.6, n_symbols)
+    factors = rng.normal(0, 1, (n_bars, n_sectors))[:, sector] * rng.uniform(0.3, 2.0, n_symbols)
+    returns = market + factors + rng.normal(0, 1, (n_bars, n_symbols))
+    returns[:, rng.random(n_symbols) < 0.05] *= -1
+
+    start = time.perf_counter()
+    exact_rows, exact_cols, _ = blocked_correlation(returns, threshold)
+    exact_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows, cols, _ = approximate_correlation_pairs(returns, threshold, n_bits=n_bits, recall=recall)
+    approx_seconds = time.perf_counter() - start
+
+    z, valid = standardize_columns(returns)
+    candidate_rows, candidate_cols = simhash_candidates(z, valid, threshold, n_bits, n_tables)
+
+    n = n_symbols
+    exact = exact_rows * n + exact_cols
+    found = rows * n + cols
+    candidates = candidate_rows * n + candidate_cols
+    total_pairs = n * (n - 1) // 2
+    true_found = np.isin(found, exact).sum()
+    candidate_hits = np.isin(exact, candidates).sum()
+
+    print(f"Kesin (bloklu):   {exact_seconds:>7.2f} sn, {len(exact):,} çift")
+    print(f"Yaklaşık (LSH):   {approx_seconds:>7.2f} sn, {len(found):,} çift, "
+          f"{len(candidates):,} aday (tüm çiftlerin %{100 * len(candidates) / total_pairs:.2f}'i)")
+    recall_value = true_found / len(exact) if len(exact) else 1.0
+    precision_value = true_found / len(found) if len(found) else 1.0
+    candidate_precision = candidate_hits / len(candidates) if len(candidates) else 1.0
+    print(f"Recall: {recall_value:.4f}   Precision: {precision_value:.4f}   "
+          f"Aday precision: {candidate_precision:.4f}")
+    for band in (threshold, threshold + 0.05, threshold + 0.1):
+        exact_abs = np.abs(blocked_correlation(returns, band)[2])
+        approx_abs = np.abs(approximate_correlation_pairs(returns, band, n_bits=n_bits, n_tables=n_tables)[2])
+        if len(exact_abs):
+            print(f"  |r| ≥ {band:.2f}: {(np.abs(approx_abs) >= band).sum() / len(exact_abs):.4f} recall "
+                  f"({len(exact_abs):,} çift)")
+    ok = precision_value == 1.0 and recall_value >= recall - 0.05
+    print(f"{'✓' if ok else '❌'} {exact_seconds / approx_seconds:.2f}x")
+    return ok
+
+
+# ==================== GECİKMELİ KORELASYON ====================
+
+def bench_lead_lag(n_symbols=400, n_bars=60, max_lag=10, seed=42):
+    """Tüm çiftler lead-lag taraması süresi + pandas shift().corr() ile doğrulama"""
+    import pandas as pd
+    from correlation_kernels import LeadLagTable
+
+    print(f"\n{'='*80}")
+    print(f"LEAD-LAG BENCHMARK ({n_symbols} sembol × {n_bars} bar, 1-{max_lag} gecikme)")
+    print(f"{'='*80}")
+
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 1, (n_bars, n_symbols))
+    lag = min(3, max_lag)
+    returns[lag:, 1] = 0.9 * returns[:-lag, 0] + 0.3 * returns[lag:, 1]  # 0, 1'den `lag` bar önde
+
+    start = time.perf_counter()
+    table = LeadLagTable.from_returns(returns, max_lag=max_lag)
+    table.to_dict()
+    table.top_pairs(100)
+    elapsed = time.perf_counter() - start
+    print(f"Tarama + özet: {elapsed * 1000:.1f} ms ({n_symbols * (n_symbols - 1)} yönlü çift × {max_lag} gecikme)")
+
+    frame = pd.DataFrame(returns)
+    errors = []
+    for i, j in rng.integers(0, n_symbols, (50, 2)).tolist():
+        if i == j:
+            continue
+        k = int(table.best_lag[i, j])
+        errors.append(abs(frame[i].corr(frame[j].shift(-k)) - table.best_r[i, j]))
+    partner, lags, _ = table.coin_summary()
+    ok = max(errors) < 1e-10 and partner[0] == 1 and lags[0] == lag
+    print(f"{'✓' if ok else '❌'} pandas farkı {max(errors):.2e}, gömülü çift: 0 → {partner[0]} ({lags[0]:+d} bar)")
+    return ok
+
+
+# ==================== SPEARMAN / WINSORIZED ====================
+
+def bench_robust(n_symbols=500, n_bars=1440, seed=42):
+    """Spearman ve winsorized korelasyonu df.corr(method='spearman') ile karşılaştır"""
+    import pandas as pd
+    from correlation_kernels import correlation_frame
+
+    print(f"\n{'='*80}")
+    print(f"SPEARMAN / WINSORIZED BENCHMARK ({n_symbols} sembol × {n_bars} bar)")
+    print(f"{'='*80}")
+
+    # Kalın kuyruklu getiriler (Student-t, 3 serbestlik) + ortak faktör + ara sıra tek fitiller
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_t(3, (n_bars, 1)) * rng.uniform(0, 1, n_symbols) + rng.standard_t(3, (n_bars, n_symbols))
+    wicks = rng.random((n_bars, n_symbols)) < 0.001
+    returns[wicks] *= 50
+    df = pd.DataFrame(returns, columns=[f"C{i}USDT" for i in range(n_symbols)])
+
+    start = time.perf_counter()
+    reference = df.corr(method='spearman')
+    pandas_seconds = time.perf_counter() - start
+
+    timings = {}
+    results = {}
+    for method in ('pearson', 'spearman', 'winsorized'):
+        start = time.perf_counter()
+        results[method] = correlation_frame(df, method=method)
+        timings[method] = time.perf_counter() - start
+
+    error = np.nanmax(np.abs(results['spearman'].to_numpy() - reference.to_numpy()))
+    ok = error < 1e-10
+    print(f"df.corr(spearman):   {pandas_seconds:>7.2f} sn")
+    for method, seconds in timings.items():
+        print(f"{method + ' (BLAS):':<21}{seconds:>7.2f} sn")
+    print(f"{'✓' if ok else '❌'} Spearman farkı {error:.2e} ({pandas_seconds / timings['spearman']:.1f}x)")
+
+    # Fitil etkisi: her yöntemin ortak faktör korelasyonunu ne kadar tutarlı verdiği
+    clean = correlation_frame(pd.DataFrame(np.where(wicks, 0.0, returns)), method='pearson').to_numpy()
+    upper = np.triu_indices(n_symbols, k=1)
+    for method, matrix in results.items():
+        drift = np.abs(matrix.to_numpy()[upper] - clean[upper]).mean()
+        print(f"  {method:<11} fitilsiz Pearson'dan ortalama sapma: {drift:.4f}")
+    return ok
+
+
+# ==================== DEĞİŞİKLİK TAKİBİ ====================
+
+def check_change_tracker():
+    """Korelasyon değişiklik takipçisini iki döngü boyunca çalıştır (yeni + kaybolan çiftler)
+
+    İkinci döngüde A-D kaybolur, E-F yeni gelir; durum diskten yeniden
+    yüklenen takipçiyle karşılaştırılır.
+    """
+    from correlation_change_tracker import CorrelationChangeTracker
+
+    print(f"\n{'='*80}")
+    print("KORELASYON DEĞİŞİKLİK TAKİBİ KONTROLÜ")
+    print(f"{'='*80}")
+
+    def pairs(*items):
+        return [{'coin1': coin1, 'coin2': coin2, 'correlation': r} for coin1, coin2, r in items]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        log_directory = os.path.join(workdir, 'correlation_changes')
+        history_file = os.path.join(workdir, 'correlation_changes_history.json')
+        tracker = CorrelationChangeTracker(history_file, log_directory=log_directory)
+        first = tracker.analyze_and_save(pairs(('A', 'B', 0.9), ('C', 'B', 0.8), ('A', 'D', -0.75)))
+        # Yeni takipçi: durum last_correlations.corr dosyasından okunur
+        tracker = CorrelationChangeTracker(history_file, log_directory=log_directory)
+        second = tracker.analyze_and_save(pairs(('A', 'B', 0.9), ('C', 'B', 0.6), ('E', 'F', 0.95)))
+        third = tracker.analyze_and_save(pairs(('A', 'B', 0.9), ('C', 'B', 0.6), ('E', 'F', 0.95)))
+        logged = tracker.get_recent_changes(limit=100)
+
+    types = sorted((change['coin1'], change['coin2'], change['change_type']) for change in second)
+    expected = [('A', 'D', 'LOST_HIGH_CORRELATION'), ('B', 'C', 'LOST_HIGH_CORRELATION'),
+                ('E', 'F', 'NEW_HIGH_CORRELATION')]
+    ok = len(first) == 3 and types == expected and not third and len(logged) == 6
+    print(f"{'✓' if ok else '❌'} 1. döngü {len(first)}, 2. döngü {types}, 3. döngü {len(third)} "
+          f"değişiklik, günlükte {len(logged)} kayıt")
+    return ok
+
+
+# ==================== CLI ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="Coin analiz performans ölçümleri")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    decode_parser = subparsers.add_parser('decode', help="Ticker mesajı decode hızı")
+    decode_parser.add_argument('--corpus', help="Satır başına bir ham mesaj içeren dosya")
+    decode_parser.add_argument('--messages', type=int, default=200000,
+                               help="Korpus yoksa üretilecek sentetik mesaj sayısı")
+
+    stress_parser = subparsers.add_parser('stress', help="Tick store eşzamanlılık stress testi")
+    stress_parser.add_argument('--writers', type=int, default=8, help="Yazıcı thread sayısı")
+    stress_parser.add_argument('--seconds', type=float, default=5.0, help="Test süresi (saniye)")
+
+    record_parser = subparsers.add_parser('record', help="Canlı stream'i kayıt dosyasına yaz")
+    record_parser.add_argument('--output', required=True, help="Kayıt dosyası (.tcap)")
+    record_parser.add_argument('--seconds', type=float, default=300, help="Kayıt süresi (saniye)")
+    record_parser.add_argument('--all-market', action='store_true', help="!miniTicker@arr tek bağlantı modu")
+    record_parser.add_argument('--klines', action='store_true', help="@kline_1m stream'lerini de kaydet")
+
+    replay_parser = subparsers.add_parser('replay', help="Kayıt dosyasını handler'lardan tekrar oynat")
+    replay_parser.add_argument('--capture', help="Kayıt dosyası (yoksa sentetik kayıt üretilir)")
+    replay_parser.add_argument('--speed', default='max', help="'max' veya hız çarpanı (1 = gerçek zaman)")
+    replay_parser.add_argument('--limit', type=int, help="En fazla bu kadar frame oynat")
+    replay_parser.add_argument('--analyze', action='store_true', help="Replay sonrası perform_analysis süresini ölç")
+
+    ingest_parser = subparsers.add_parser('ingest', help="Yerel mock sunucuya karşı alım verimi")
+    ingest_parser.add_argument('--symbols', type=int, default=2000, help="Sembol sayısı")
+    ingest_parser.add_argument('--tick-rate', type=float, default=10.0, help="Sembol başına saniyedeki tick")
+    ingest_parser.add_argument('--seconds', type=float, default=10.0, help="Ölçüm süresi")
+    ingest_parser.add_argument('--asyncio', action='store_true', help="asyncio alım motorunu kullan")
+    ingest_parser.add_argument('--all-market', action='store_true', help="!miniTicker@arr tek bağlantı modu")
+
+    klines_parser = subparsers.add_parser('klines', help="Eşzamanlı kline çekme verimi")
+    klines_parser.add_argument('--symbols', type=int, default=500, help="Sembol sayısı")
+    klines_parser.add_argument('--limit', type=int, default=1000, help="Sembol başına bar")
+    klines_parser.add_argument('--workers', type=int, default=16, help="Eşzamanlı istek sayısı")
+    klines_parser.add_argument('--live', action='store_true', help="Gerçek Binance API'sine karşı ölç")
+
+    pairs_parser = subparsers.add_parser('pairs', help="Yüksek korelasyon çifti çıkarma hızı")
+    pairs_parser.add_argument('--symbols', type=int, default=2000, help="Sembol sayısı")
+    pairs_parser.add_argument('--bars', type=int, default=500, help="Sembol başına getiri sayısı")
+    pairs_parser.add_argument('--threshold', type=float, default=0.7, help="Minimum |r|")
+    pairs_parser.add_argument('--top-k', type=int, default=100, help="En yüksek K çift (0 = atla)")
+
+    rolling_parser = subparsers.add_parser('rolling', help="Artımlı korelasyon güncelleme hızı")
+    rolling_parser.add_argument('--symbols', type=int, default=1000, help="Sembol sayısı")
+    rolling_parser.add_argument('--window', type=int, default=1440, help="Pencere (bar)")
+    rolling_parser.add_argument('--updates', type=int, default=30, help="Ölçülecek yeni bar sayısı")
+
+    blocked_parser = subparsers.add_parser('blocked', help="Bloklu bellek dışı korelasyon")
+    blocked_parser.add_argument('--symbols', type=int, default=5000, help="Sembol sayısı")
+    blocked_parser.add_argument('--bars', type=int, default=168, help="Getiri sayısı (7 gün saatlik = 168)")
+    blocked_parser.add_argument('--block', type=int, default=1024, help="Blok boyu")
+    blocked_parser.add_argument('--skip-pandas', action='store_true', help="df.corr() karşılaştırmasını atla")
+
+    lsh_parser = subparsers.add_parser('lsh', help="Yaklaşık (SimHash LSH) yüksek korelasyon araması")
+    lsh_parser.add_argument('--symbols', type=int, default=5000, help="Sembol sayısı")
+    lsh_parser.add_argument('--bars', type=int, default=168, help="Getiri sayısı")
+    lsh_parser.add_argument('--threshold', type=float, default=0.7, help="Minimum |r|")
+    lsh_parser.add_argument('--bits', type=int, default=12, help="Tablo başına bit")
+    lsh_parser.add_argument('--recall', type=float, default=0.95, help="Eşikteki çift için hedef recall")
+
+    lead_lag_parser = subparsers.add_parser('leadlag', help="Tüm çiftler gecikmeli korelasyon taraması")
+    lead_lag_parser.add_argument('--symbols', type=int, default=400, help="Sembol sayısı")
+    lead_lag_parser.add_argument('--bars', type=int, default=60, help="Getiri sayısı (1m bar)")
+    lead_lag_parser.add_argument('--max-lag', type=int, default=10, help="En büyük gecikme (bar)")
+
+    robust_parser = subparsers.add_parser('robust', help="Spearman / winsorized korelasyon")
+    robust_parser.add_argument('--symbols', type=int, default=500, help="Sembol sayısı")
+    robust_parser.add_argument('--bars', type=int, default=1440, help="Getiri sayısı")
+
+    subparsers.add_parser('tracker', help="Korelasyon değişiklik takibi kontrolü (yeni / kaybolan çiftler)")
+
+    args = parser.parse_args()
+
+    if args.command == 'decode':
+        corpus = load_corpus(args.corpus) if args.corpus else synthetic_ticker_corpus(args.messages)
+        bench_decode(corpus)
+    elif args.command == 'stress':
+        if not stress_tick_store(args.writers, args.seconds):
+            raise SystemExit(1)
+    elif args.command == 'record':
+        record_live(args.output, args.seconds, args.all_market, args.klines)
+    elif args.command == 'ingest':
+        bench_ingest(args.symbols, args.tick_rate, args.seconds, args.asyncio, args.all_market)
+    elif args.command == 'klines':
+        bench_klines(args.symbols, args.limit, args.workers, args.live)
+    elif args.command == 'pairs':
+        if not bench_pairs(args.symbols, args.bars, args.threshold, args.top_k):
+            raise SystemExit(1)
+    elif args.command == 'rolling':
+        if not bench_rolling(args.symbols, args.window, args.updates):
+            raise SystemExit(1)
+    elif args.command == 'robust':
+        if not bench_robust(args.symbols, args.bars):
+            raise SystemExit(1)
+    elif args.command == 'leadlag':
+        if not bench_lead_lag(args.symbols, args.bars, args.max_lag):
+            raise SystemExit(1)
+    elif args.command == 'lsh':
+        if not bench_lsh(args.symbols, args.bars, args.threshold, args.bits, args.recall):
+            raise SystemExit(1)
+    elif args.command == 'blocked':
+        if not bench_blocked(args.symbols, args.bars, args.block, compare_pandas=not args.skip_pandas):
+            raise SystemExit(1)
+    elif args.command == 'tracker':
+        if not check_change_tracker():
+            raise SystemExit(1)
+    elif args.command == 'replay':
+        speed = None if args.speed == 'max' else float(args.speed)
+        if args.capture:
+            bench_replay(args.capture, speed, args.analyze, args.limit)
+        else:
+            with tempfile.TemporaryDirectory() as workdir:
+                capture = synthetic_capture(os.path.join(workdir, 'synthetic.tcap'))
+                bench_replay(capture, speed, args.analyze, args.limit)
+
+
+if __name__ == '__main__':
+    main()
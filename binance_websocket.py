@@ -1,22 +1,63 @@
+import numpy as np
 import requests
 import websocket
-import json
 import threading
 import time
-from collections import defaultdict
 from datetime import datetime
+from tick_store import TickStore, KLINE_FIELDS
+from async_ingestion import AsyncIngestionEngine
+from tick_decoder import TickerDecoder
+from tick_recorder import TickRecorder, CHANNEL_TICKER, CHANNEL_KLINE
+from kline_fetcher import INTERVAL_MS
+
+BINANCE_REST_URL = "https://api.binance.com/api/v3"
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
 
 class BinanceWebSocket:
-    def __init__(self):
-        self.base_url = "https://api.binance.com/api/v3"
-        self.stream_url = "wss://stream.binance.com:9443/stream"
+    def __init__(self, buffer_capacity=3600, buffer_horizon_seconds=3600, use_asyncio=False,
+                 json_backend=None, stream_mode='ticker', market_stream='!miniTicker@arr',
+                 subscribe_klines=False, kline_interval='1m', kline_capacity=1440,
+                 base_url=BINANCE_REST_URL, stream_url=BINANCE_STREAM_URL):
+        """
+        buffer_capacity: Sembol başına ring buffer'da tutulacak maksimum tick sayısı
+        buffer_horizon_seconds: Okumada tutulacak zaman ufku (saniye, None = sınırsız)
+        use_asyncio: True ise tüm bağlantılar tek asyncio event loop'unda çalışır,
+                     False ise chunk başına bir thread (eski davranış)
+        json_backend: 'orjson', 'simdjson' veya 'json' (None = mevcut en hızlısı)
+        stream_mode: 'ticker' (sembol başına @ticker stream'i) veya
+                     'all_market' (tek bağlantıda tüm piyasa dizi stream'i)
+        market_stream: all_market modunda kullanılacak stream ('!miniTicker@arr' veya '!ticker@arr')
+        subscribe_klines: True ise ticker'lara ek olarak <symbol>@kline_<interval> stream'leri
+                          de dinlenir ve kapanmış barlar ayrı bir depoda tutulur
+        kline_interval: Kline aralığı (varsayılan '1m')
+        kline_capacity: Sembol başına tutulacak maksimum kapanmış bar sayısı
+        base_url: REST API base URL (yerel test sunucusu için değiştirilebilir)
+        stream_url: Combined-stream WebSocket URL'i
+        """
+        if stream_mode not in ('ticker', 'all_market'):
+            raise ValueError(f"Geçersiz stream_mode: {stream_mode}")
+        self.base_url = base_url
+        self.stream_url = stream_url
         self.usdt_pairs = []
-        self.price_data = defaultdict(list)
-        self.price_volume_data = defaultdict(list)  # Fiyat ve volume birlikte
+        self.buffer_capacity = buffer_capacity
+        self.buffer_horizon_seconds = buffer_horizon_seconds
+        # Fiyat, volume ve 24h değişim tek bir ring buffer deposunda
+        self.tick_store = TickStore(buffer_capacity, buffer_horizon_seconds)
+        self.decoder = TickerDecoder(json_backend)
+        self.stream_mode = stream_mode
+        self.market_stream = market_stream
+        self._usdt_set = frozenset()  # all_market modunda sembol filtresi
+        # Borsanın kapattığı OHLCV barları (ticker örneklemesinden bağımsız, kesin kapanışlar)
+        self.subscribe_klines = subscribe_klines
+        self.kline_interval = kline_interval
+        self.kline_store = TickStore(kline_capacity, fields=KLINE_FIELDS)
         self.ws_threads = []  # Her chunk için thread saklamak için
         self.ws_apps = []  # WebSocket uygulamalarını sakla
         self.running = False
         self.reconnect_delay = 5  # Yeniden bağlanma gecikmesi (saniye)
+        self.use_asyncio = use_asyncio
+        self.async_engine = None
+        self.recorder = None  # Opsiyonel ham frame kaydedici (replay / yük testi için)
 
     # ---------------- REST API ile USDT çiftlerini alma ----------------
     def get_usdt_pairs(self):
@@ -51,6 +92,8 @@ class BinanceWebSocket:
                 print("⚠️  Hiç USDT çifti bulunamadı!")
                 return []
             
+            self._usdt_set = frozenset(self.usdt_pairs)
+            
             print(f"✓ Toplam {len(self.usdt_pairs)} USDT çifti bulundu")
             return self.usdt_pairs
             
@@ -70,40 +113,67 @@ class BinanceWebSocket:
             traceback.print_exc()
             return []
 
+    # ---------------- Mesaj çözme ----------------
+    def parse_message(self, message):
+        """Ticker mesajını tick listesine çevir
+
+        Dönen format: [(symbol, event_time_ms, price, volume, price_change_percent)]
+        """
+        if self.recorder is not None:
+            self.recorder.record(message, CHANNEL_TICKER)
+        if self.stream_mode == 'all_market':
+            # Tüm piyasa dizisi - USDT çiftlerine filtrelenmiş tick listesi (asyncio batch yolu)
+            return self.decoder.decode_array_ticks(message, self._usdt_set or None)
+        return self.decoder.decode(message)
+
+    def append_market_message(self, message):
+        """Tüm piyasa dizi mesajını kolonlar halinde çöz ve depoya yaz
+
+        Tick tuple'ı oluşturulmaz: decode_array'in kolonları sembol başına tek
+        kilitli yazımla ring buffer'lara kopyalanır.
+        """
+        if self.recorder is not None:
+            self.recorder.record(message, CHANNEL_TICKER)
+        symbols, event_times, prices, volumes, price_changes = self.decoder.decode_array(
+            message, self._usdt_set or None)
+        self.tick_store.append_columns(symbols, event_times, np.column_stack((prices, volumes, price_changes)))
+
+    def parse_kline_message(self, message):
+        """Kline mesajını bar listesine çevir (açık bar güncellemeleri boş liste döner)
+
+        Dönen format: [(symbol, open_time_ms, open, high, low, close, volume)]
+        """
+        if self.recorder is not None:
+            self.recorder.record(message, CHANNEL_KLINE)
+        return self.decoder.decode_kline(message)
+
     # ---------------- WebSocket eventleri ----------------
     def on_message(self, ws, message):
         try:
-            data = json.loads(message)
-            stream_data = data.get('data', data)  # combined veya single stream farkı
+            if self.stream_mode == 'all_market':
+                self.append_market_message(message)
+                return
             
-            symbol = stream_data.get('s')
-            price = float(stream_data.get('c', 0))  # Close price (son fiyat)
-            volume = float(stream_data.get('v', 0))  # Volume (24h volume)
-            price_change = float(stream_data.get('P', 0))  # Price change percent (24h)
-            timestamp = datetime.now()
-            
-            if symbol and price > 0:
-                # Sadece fiyat (eski uyumluluk için)
-                self.price_data[symbol].append({
-                    'timestamp': timestamp, 
-                    'price': price
-                })
-                
-                # Fiyat ve volume birlikte (yeni analiz için)
-                self.price_volume_data[symbol].append({
-                    'timestamp': timestamp,
-                    'price': price,
-                    'volume': volume,
-                    'price_change_percent': price_change
-                })
+            ticks = self.parse_message(message)
+            for symbol, timestamp, price, volume, price_change in ticks:
+                # Fiyat, volume ve 24h değişim tek ring buffer'a (O(1), eski tick'in üzerine yazar)
+                self.tick_store.append(symbol, timestamp, price, volume, price_change)
                 
                 # İlk birkaç veriyi göster (test için)
-                if len(self.price_volume_data[symbol]) <= 3:
-                    print(f"{symbol}: {price} USDT | Vol: {volume:.2f} | Change: {price_change:.2f}% - {timestamp.strftime('%H:%M:%S')}")
+                if len(self.tick_store[symbol]) <= 3:
+                    print(f"{symbol}: {price} USDT | Vol: {volume:.2f} | Change: {price_change:.2f}% - {datetime.fromtimestamp(timestamp / 1000).strftime('%H:%M:%S')}")
                     
         except Exception as e:
             print(f"Mesaj işleme hatası: {e}")
 
+    def on_kline_message(self, ws, message):
+        try:
+            bars = self.parse_kline_message(message)
+            if bars:
+                self.kline_store.append_batch(bars)
+        except Exception as e:
+            print(f"Kline mesaj işleme hatası: {e}")
+
     def on_error(self, ws, error):
         print(f"WebSocket hatası: {error}")
 
@@ -119,6 +189,14 @@ class BinanceWebSocket:
         streams = [f"{pair.lower()}@ticker" for pair in pairs_chunk]
         return f"{self.stream_url}?streams={'/'.join(streams)}"
 
+    def create_kline_stream_url(self, pairs_chunk):
+        streams = [f"{pair.lower()}@kline_{self.kline_interval}" for pair in pairs_chunk]
+        return f"{self.stream_url}?streams={'/'.join(streams)}"
+
+    def create_market_stream_url(self):
+        """Tüm piyasa dizi stream'i için URL (tek bağlantı)"""
+        return f"{self.stream_url}?streams={self.market_stream}"
+
     # ---------------- Streaming başlat ---------------- 
     def start_streaming(self, auto_reconnect=True):
         """WebSocket streaming'i başlat
@@ -131,15 +209,40 @@ class BinanceWebSocket:
             self.get_usdt_pairs()
 
         chunk_size = 200
-        for i in range(0, len(self.usdt_pairs), chunk_size):
-            chunk = self.usdt_pairs[i:i + chunk_size]
-            url = self.create_stream_url(chunk)
-            print(f"{len(chunk)} çift için stream başlatılıyor ({i + 1} - {i + len(chunk)})...")
+        if self.stream_mode == 'all_market':
+            # Tek bağlantı, saniyede bir tüm semboller tek mesajda
+            chunks = [(self.create_market_stream_url(), self.usdt_pairs, 'ticker')]
+            print(f"Tüm piyasa stream'i ({self.market_stream}) başlatılıyor - {len(self.usdt_pairs)} USDT çifti filtrelenecek...")
+        else:
+            chunks = [(self.create_stream_url(self.usdt_pairs[i:i + chunk_size]), self.usdt_pairs[i:i + chunk_size], 'ticker')
+                      for i in range(0, len(self.usdt_pairs), chunk_size)]
+        
+        if self.subscribe_klines:
+            # Kapanmış barlar için ayrı bağlantılar (aynı 200'lük chunk'lar)
+            chunks += [(self.create_kline_stream_url(self.usdt_pairs[i:i + chunk_size]), self.usdt_pairs[i:i + chunk_size], 'kline')
+                       for i in range(0, len(self.usdt_pairs), chunk_size)]
+            print(f"Kline stream'leri (@kline_{self.kline_interval}) de başlatılıyor...")
+        
+        if self.use_asyncio:
+            # Tüm bağlantılar tek event loop'ta (thread başına bağlantı yok)
+            connections = [
+                (url, self.parse_kline_message, self.kline_store) if kind == 'kline'
+                else (url, self.parse_message, self.tick_store)
+                for url, _, kind in chunks
+            ]
+            print(f"{len(self.usdt_pairs)} çift için {len(connections)} asyncio bağlantısı başlatılıyor...")
+            self.async_engine = AsyncIngestionEngine()
+            self.async_engine.start(connections)
+            return
+        
+        for url, chunk, kind in chunks:
+            if self.stream_mode == 'ticker' or kind == 'kline':
+                print(f"{len(chunk)} çift için {kind} stream'i başlatılıyor...")
 
             # Her chunk için ayrı WebSocket thread
             ws_app = websocket.WebSocketApp(
                 url,
-                on_message=self.on_message,
+                on_message=self.on_kline_message if kind == 'kline' else self.on_message,
                 on_error=self.on_error,
                 on_close=self.on_close,
                 on_open=self.on_open
@@ -167,6 +270,9 @@ class BinanceWebSocket:
     def stop_streaming(self):
         """WebSocket streaming'i durdur"""
         self.running = False
+        if self.async_engine is not None:
+            self.async_engine.stop()
+            self.async_engine = None
         for ws_app in self.ws_apps:
             try:
                 ws_app.close()
@@ -174,16 +280,58 @@ class BinanceWebSocket:
                 pass
         self.ws_apps = []
         self.ws_threads = []
+        self.stop_recording()
+
+    # ---------------- Ham frame kaydı ----------------
+    def start_recording(self, path):
+        """Gelen tüm ham frame'leri (ticker + kline) ikili kayıt dosyasına yaz"""
+        self.stop_recording()
+        self.recorder = TickRecorder(path, meta={
+            'stream_mode': self.stream_mode,
+            'market_stream': self.market_stream,
+            'kline_interval': self.kline_interval,
+            'symbols': self.usdt_pairs,
+        })
+        print(f"✓ Frame kaydı başladı: {path}")
+
+    def stop_recording(self):
+        """Kaydı durdur ve dosyayı kapat"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+            print(f"✓ Frame kaydı kapatıldı: {recorder.path} ({recorder.frames} frame, {recorder.bytes / 1e6:.1f} MB)")
 
     # ---------------- Fiyat verilerini alma ----------------
     def get_price_data(self):
-        return self.price_data
+        return self.tick_store
 
     # ---------------- Fiyat ve Volume verilerini alma ----------------
     def get_price_volume_data(self):
-        return self.price_volume_data
+        # Fiyat ve volume aynı depoda tutuluyor
+        return self.tick_store
+
+    # ---------------- Hizalanmış anlık görüntü ----------------
+    def snapshot(self, window=3600, interval_seconds=60):
+        """Son `window` saniyelik tick'leri zaman × sembol matrislerine dönüştür
+
+        Analiz döngüsünde bir kez çağrılır; dönen TickSnapshot hem
+        CorrelationAnalyzer hem PriceVolumeAnalyzer tarafından paylaşılır.
+        """
+        return self.tick_store.snapshot(window_seconds=window, interval_ms=interval_seconds * 1000)
+
+    def bar_snapshot(self, window=3600):
+        """Son `window` saniyelik kapanmış kline barlarını zaman × sembol matrislerine dönüştür
+
+        Kovalar bar açılış zamanlarıdır; kolonlar open/high/low/close/volume.
+        """
+        interval_ms = self.kline_interval_ms()
+        return self.kline_store.snapshot(window_seconds=window, interval_ms=interval_ms)
+
+    def kline_interval_ms(self):
+        """Kline aralığını milisaniyeye çevir ('1m' -> 60000)"""
+        return INTERVAL_MS[self.kline_interval]
 
     # ---------------- Fiyat verilerini temizleme ----------------
     def clear_price_data(self):
-        self.price_data = defaultdict(list)
-        self.price_volume_data = defaultdict(list)
\ No newline at end of file
+        self.tick_store.clear()
+        self.kline_store.clear()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+# Zaman damgası formatı - sözlük sırası = zaman sırası (strptime gerekmez)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SEGMENT_SUFFIX = '.ndjson'
+
+
+class ChangeLog:
+    """Korelasyon değişiklikleri için yalnızca-ekleme (append-only) günlük
+
+    Her gün ayrı bir segment dosyasıdır ('2024-05-01.ndjson'), her satır tek
+    bir değişiklik kaydıdır (JSON). Yazım yalnızca yeni satırları dosya sonuna
+    ekler; eski kayıtlar okunmaz, yeniden yazılmaz. Saklama süresi dolan
+    segmentler bütün olarak silinir - döngü başına G/Ç yeni kayıt sayısıyla
+    orantılıdır.
+
+    Yazım sırasında çökme en fazla son satırı yarım bırakır; okuyucu
+    çözülemeyen satırları atlar.
+    """
+
+    def __init__(self, directory='correlation_changes', retention_days=30):
+        """
+        directory: Segment klasörü
+        retention_days: Kayıtların saklanacağı gün sayısı
+        """
+        self.directory = directory
+        self.retention_days = retention_days
+
+    def _segment_path(self, day):
+        return os.path.join(self.directory, f"{day}{SEGMENT_SUFFIX}")
+
+    def segments(self):
+        """(gün, dosya yolu) listesi, eskiden yeniye"""
+        if not os.path.isdir(self.directory):
+            return []
+        days = sorted(name[:-len(SEGMENT_SUFFIX)] for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX))
+        return [(day, self._segment_path(day)) for day in days]
+
+    def cutoff(self, now=None):
+        """Saklama sınırı (bu zaman damgasından eski kayıtlar gösterilmez)"""
+        return ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime(TIMESTAMP_FORMAT)
+
+    # ---------------- Yazma ----------------
+    def append(self, records):
+        """Kayıtları gün segmentlerinin sonuna ekle (kayıt başına tek satır)
+
+        records: 'timestamp' alanı TIMESTAMP_FORMAT'ta olan dict listesi
+        """
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        by_day = {}
+        for record in records:
+            by_day.setdefault(record['timestamp'][:10], []).append(
+                json.dumps(record, ensure_ascii=False) + '\n')
+        for day, lines in by_day.items():
+            with open(self._segment_path(day), 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def prune(self, now=None):
+        """Tamamı saklama süresinin dışında kalan segmentleri sil, silinen sayısını döndür"""
+        cutoff_day = self.cutoff(now)[:10]
+        removed = 0
+        for day, path in self.segments():
+            if day >= cutoff_day:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                print(f"⚠️  Segment silme hatası ({path}): {e}")
+        return removed
+
+    # ---------------- Okuma ----------------
+    def read(self, limit=None, since=None):
+        """Kayıtları en yeniden eskiye oku
+
+        limit: En fazla kayıt sayısı (None = hepsi) - yeterli kayıt bulununca
+               daha eski segmentler açılmaz
+        since: Bu zaman damgasından eskileri atla (None = saklama sınırı)
+        """
+        since = self.cutoff() if since is None else since
+        records = []
+        for day, path in reversed(self.segments()):
+            if day < since[:10]:
+                break
+            segment = []
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue  # Yarım kalmış satır
+                        if record.get('timestamp', '') >= since:
+                            segment.append(record)
+            except OSError as e:
+                print(f"⚠️  Segment okuma hatası ({path}): {e}")
+                continue
+            segment.sort(key=lambda record: record.get('timestamp', ''), reverse=True)
+            records.extend(segment)
+            if limit is not None and len(records) >= limit:
+                return records[:limit]
+        return records
+
+    def import_legacy(self, history_file):
+        """Eski tek-dosya JSON geçmişini (changes_history) günlüğe aktar
+
+        Sadece günlük henüz boşsa çalışır; aktarılan kayıt sayısını döndürür.
+        """
+        if self.segments() or not os.path.exists(history_file):
+            return 0
+        try:
+            with open(history_file, 'r', encoding='utf-8') as f:
+                changes = json.load(f).get('changes_history', [])
+        except Exception as e:
+            print(f"⚠️  Eski değişiklik geçmişi okunamadı: {e}")
+            return 0
+        cutoff = self.cutoff()
+        changes = [change for change in changes if change.get('timestamp', '') >= cutoff]
+        self.append(changes)
+        return len(changes)
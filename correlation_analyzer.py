@@ -1,22 +1,74 @@
 import pandas as pd
 import numpy as np
-import requests
 import time
+import os
 from datetime import datetime, timedelta
 import json
 from collections import defaultdict
+from tick_store import TickRingBuffer, TickSnapshot
+from kline_fetcher import KlineFetcher, INTERVAL_MS
+from kline_cache import KlineCache, MAX_KLINES_PER_REQUEST
+from history_loader import DeepHistoryLoader
+from correlation_kernels import (high_correlation_records, approximate_correlation_pairs, correlation_frame,
+                                 CoinNeighbors, LeadLagTable, RollingCorrelation, EwmaCorrelation)
+from matrix_store import save_matrix_pair
+from correlation_clusters import CorrelationClusters, MAX_CLUSTER_SYMBOLS
 
 class CorrelationAnalyzer:
     def __init__(self, base_url="https://api.binance.com/api/v3", 
-                 min_data_points=50, correlation_threshold=0.7):
+                 min_data_points=50, correlation_threshold=0.7, kline_cache_dir='kline_cache'):
         """
         base_url: Binance REST API base URL
         min_data_points: Minimum veri noktası sayısı (korelasyon için yeterli veri)
         correlation_threshold: Yüksek korelasyon eşiği (0.7 = %70 korelasyon)
+        kline_cache_dir: Kalıcı kline önbelleği klasörü (None = önbellek kapalı, her seferinde tam indirme)
         """
         self.base_url = base_url
         self.min_data_points = min_data_points
         self.correlation_threshold = correlation_threshold
+        self.kline_cache_dir = kline_cache_dir
+        self._fetcher = None
+        self._kline_cache = None
+        self._history_loader = None
+        self._rolling = None
+        self._rolling_last_time = None
+    
+    @property
+    def fetcher(self):
+        """Paylaşılan kline çekici (bağlantı havuzu + ağırlık limiti, ilk kullanımda oluşturulur)"""
+        if self._fetcher is None:
+            self._fetcher = KlineFetcher(self.base_url)
+        return self._fetcher
+    
+    @property
+    def kline_cache(self):
+        """Disk üzerindeki kline önbelleği (kapalıysa None)"""
+        if self._kline_cache is None and self.kline_cache_dir:
+            self._kline_cache = KlineCache(self.kline_cache_dir, self.fetcher)
+        return self._kline_cache
+    
+    @property
+    def history_loader(self):
+        """1000 bar üstü istekler için sayfalı yükleyici (sayfalar önbellek klasöründe saklanır)"""
+        if self._history_loader is None:
+            directory = os.path.join(self.kline_cache_dir, 'pages') if self.kline_cache_dir else None
+            self._history_loader = DeepHistoryLoader(self.fetcher, directory)
+        return self._history_loader
+    
+    def _fetch_klines(self, symbols, interval, limit, progress=True):
+        """Sembollerin son `limit` barını kolon dizileri olarak getir: {symbol: arrays}
+        
+        limit > 1000 ise sayfalı derin yükleyici, değilse önbellek (veya doğrudan API) kullanılır.
+        """
+        if limit > MAX_KLINES_PER_REQUEST:
+            start_ms = int(time.time() * 1000) - limit * INTERVAL_MS[interval]
+            fetched = self.history_loader.load_many(symbols, interval, start_ms, progress=progress)
+            return {symbol: {column: values[-limit:] for column, values in arrays.items()}
+                    for symbol, arrays in fetched.items()}
+        if self.kline_cache is not None:
+            # Önbellekteki semboller için sadece son bardan sonrası çekilir
+            return self.kline_cache.get_many(symbols, interval, limit, progress=progress)
+        return self.fetcher.fetch_many(symbols, interval, limit, progress=progress)
         
     # ==================== GEÇMİŞ VERİ ÇEKME (REST API) ====================
     
@@ -25,48 +77,34 @@ class CorrelationAnalyzer:
         
         symbol: Coin çifti (örn: 'BTCUSDT')
         interval: Zaman aralığı ('1m', '5m', '1h', '1d' vb.)
-        limit: Kaç veri noktası (maksimum 1000)
+        limit: Kaç veri noktası (1000 üstü sayfalı olarak çekilir)
         """
         try:
-            url = f"{self.base_url}/klines"
-            params = {
-                'symbol': symbol,
-                'interval': interval,
-                'limit': limit
-            }
-            
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Klines formatı: [Open time, Open, High, Low, Close, Volume, ...]
-            # Close price'ı al (index 4)
-            prices = []
-            timestamps = []
-            
-            for kline in data:
-                timestamp = datetime.fromtimestamp(kline[0] / 1000)  # Unix timestamp (ms)
-                close_price = float(kline[4])  # Close price
-                timestamps.append(timestamp)
-                prices.append(close_price)
-            
-            return {
-                'symbol': symbol,
-                'timestamps': timestamps,
-                'prices': prices
-            }
+            arrays = self._fetch_klines([symbol], interval, limit, progress=False).get(symbol)
+            if arrays is None:
+                return None
+            return self._kline_record(symbol, arrays)
             
         except Exception as e:
             print(f"  {symbol} geçmiş veri çekme hatası: {e}")
             return None
     
-    def fetch_all_historical_data(self, symbols, interval='1m', limit=500, delay=0.1):
-        """Tüm coinler için geçmiş verileri çek
+    @staticmethod
+    def _kline_record(symbol, arrays):
+        """Kline kolon dizilerini {'symbol', 'timestamps', 'prices'} formatına çevir (close fiyatı)"""
+        return {
+            'symbol': symbol,
+            'timestamps': pd.to_datetime(arrays['open_time'], unit='ms'),
+            'prices': arrays['close']
+        }
+    
+    def fetch_all_historical_data(self, symbols, interval='1m', limit=500, delay=None):
+        """Tüm coinler için geçmiş verileri eşzamanlı çek
         
         symbols: Coin çiftleri listesi
         interval: Zaman aralığı
-        limit: Her coin için kaç veri noktası
-        delay: İstekler arası bekleme (rate limit için)
+        limit: Her coin için kaç veri noktası (1000 üstü sayfalı olarak çekilir, örn: 30 gün 1m = 43200)
+        delay: Kullanılmıyor (hız sınırı artık ağırlık tabanlı token bucket ile yapılıyor)
         """
         print(f"\n{'='*80}")
         print("GEÇMİŞ VERİLER ÇEKİLİYOR (REST API)")
@@ -74,28 +112,20 @@ class CorrelationAnalyzer:
         print(f"Toplam {len(symbols)} coin için veri çekiliyor...")
         print(f"Interval: {interval}, Limit: {limit}")
         
-        historical_data = {}
-        successful = 0
-        failed = 0
+        start = time.time()
+        fetched = self._fetch_klines(symbols, interval, limit)
+        if limit <= MAX_KLINES_PER_REQUEST and self.kline_cache is not None:
+            stats = self.kline_cache.stats
+            print(f"Önbellek: {stats['top_ups']} artımlı, {stats['full_downloads']} tam indirme "
+                  f"(toplam {stats['bars_fetched']} bar)")
         
-        for i, symbol in enumerate(symbols, 1):
-            print(f"[{i}/{len(symbols)}] {symbol} çekiliyor...", end=' ')
-            
-            data = self.fetch_historical_data(symbol, interval, limit)
-            
-            if data and len(data['prices']) > 0:
-                historical_data[symbol] = data
-                successful += 1
-                print(f"✓ ({len(data['prices'])} veri)")
-            else:
-                failed += 1
-                print("✗")
-            
-            # Rate limit için bekleme
-            if i < len(symbols):
-                time.sleep(delay)
+        # Sonuçları giriş sırasıyla döndür
+        historical_data = {symbol: self._kline_record(symbol, fetched[symbol])
+                           for symbol in symbols if symbol in fetched}
+        successful = len(historical_data)
+        failed = len(symbols) - successful
         
-        print(f"\n✓ Başarılı: {successful}, ✗ Başarısız: {failed}")
+        print(f"\n✓ Başarılı: {successful}, ✗ Başarısız: {failed} ({time.time() - start:.1f} sn)")
         return historical_data
     
     def prepare_historical_dataframe(self, historical_data):
@@ -129,20 +159,37 @@ class CorrelationAnalyzer:
     def prepare_realtime_dataframe(self, price_data):
         """WebSocket'ten gelen anlık verileri DataFrame'e dönüştür
         
-        price_data: binance_websocket'ten gelen price_data dict'i
-        Format: {symbol: [{'timestamp': datetime, 'price': float}, ...]}
+        price_data: binance_websocket'ten gelen TickSnapshot, TickStore veya eski format dict
+        Eski format: {symbol: [{'timestamp': datetime, 'price': float}, ...]}
         """
         print("\nAnlık veriler DataFrame'e dönüştürülüyor...")
         
+        if isinstance(price_data, TickSnapshot):
+            # Zaten hizalanmış matris - kopyalamadan DataFrame'e sar
+            if len(price_data) < 2 or len(price_data.symbols) == 0:
+                print("Yeterli anlık veri bulunamadı!")
+                return None
+            # Kline bar görüntüsünde fiyat kolonu 'close'
+            field = 'price' if 'price' in price_data.columns else 'close'
+            df = price_data.to_frame(field)
+            print(f"Anlık veri DataFrame hazırlandı: {len(df)} satır, {len(df.columns)} coin")
+            return df
+        
         price_series = {}
         
         for symbol, data_list in price_data.items():
             if len(data_list) < 2:
                 continue
             
-            # Timestamp ve price'ı ayır
-            timestamps = [item['timestamp'] for item in data_list]
-            prices = [item['price'] for item in data_list]
+            if isinstance(data_list, TickRingBuffer):
+                # Ring buffer kolonları (timestamp epoch ms)
+                arrays = data_list.arrays()
+                timestamps = pd.to_datetime(arrays['timestamp'], unit='ms')
+                prices = arrays['price']
+            else:
+                # Timestamp ve price'ı ayır
+                timestamps = [item['timestamp'] for item in data_list]
+                prices = [item['price'] for item in data_list]
             
             # Series oluştur
             series = pd.Series(prices, index=timestamps, name=symbol)
@@ -183,9 +230,16 @@ class CorrelationAnalyzer:
     
     # ==================== KORELASYON HESAPLAMA ====================
     
-    def calculate_correlation_matrix(self, df):
-        """Korelasyon matrisini hesapla"""
-        print("\nKorelasyon matrisi hesaplanıyor...")
+    def calculate_correlation_matrix(self, df, method='pearson', half_life=30, winsor_limit=0.01):
+        """Korelasyon matrisini hesapla
+        
+        method: 'pearson' (tüm satırlar eşit ağırlıklı), 'ewma' (üstel ağırlıklı, yeni barlar baskın),
+                'spearman' (sıra korelasyonu) veya 'winsorized' (kuyrukları kırpılmış Pearson)
+                - son ikisi tek fitillere karşı dayanıklıdır, bloklu BLAS çekirdeğiyle hesaplanır
+        half_life: EWMA yarı ömrü (satır / bar sayısı)
+        winsor_limit: 'winsorized' için kuyruk başına kırpma oranı (0.01 = %1)
+        """
+        print(f"\nKorelasyon matrisi hesaplanıyor ({method})...")
         
         # Yeterli veri olan coinleri filtrele
         valid_columns = []
@@ -201,31 +255,109 @@ class CorrelationAnalyzer:
             return None
         
         df_valid = df[valid_columns]
-        correlation_matrix = df_valid.corr()
+        if method == 'ewma':
+            engine = EwmaCorrelation(valid_columns, half_life=half_life)
+            engine.push(df_valid.to_numpy(dtype=np.float64))
+            correlation_matrix = engine.to_frame()
+        elif method == 'pearson':
+            correlation_matrix = df_valid.corr()
+        elif method in ('spearman', 'winsorized'):
+            correlation_matrix = correlation_frame(df_valid, method=method, winsor_limit=winsor_limit)
+        else:
+            raise ValueError(f"Bilinmeyen korelasyon yöntemi: {method}")
         
         print(f"Korelasyon matrisi hesaplandı: {len(correlation_matrix)}x{len(correlation_matrix)}")
         return correlation_matrix
     
-    def find_high_correlations(self, correlation_matrix):
-        """Yüksek korelasyonlu coin çiftlerini bul"""
-        print(f"\nYüksek korelasyonlu çiftler aranıyor (eşik: {self.correlation_threshold})...")
-        
-        high_correlations = []
-        
-        for i, coin1 in enumerate(correlation_matrix.columns):
-            for j, coin2 in enumerate(correlation_matrix.columns):
-                if i < j:
-                    correlation = correlation_matrix.loc[coin1, coin2]
-                    
-                    if not np.isnan(correlation) and abs(correlation) >= self.correlation_threshold:
-                        high_correlations.append({
-                            'coin1': coin1,
-                            'coin2': coin2,
-                            'correlation': correlation,
-                            'abs_correlation': abs(correlation)
-                        })
-        
-        high_correlations.sort(key=lambda x: x['abs_correlation'], reverse=True)
+    def update_rolling_correlation(self, price_data, window=60, use_returns=True, method='pearson', half_life=30,
+                                   winsor_limit=0.01):
+        """Artımlı korelasyon: sadece son çağrıdan bu yana gelen barları işle
+        
+        price_data: TickSnapshot (ticker veya kline bar görüntüsü) / TickStore / eski format dict
+        window: Korelasyon penceresi (bar sayısı, 'pearson' için)
+        use_returns: True ise fiyat değişimleri, False ise fiyatlar
+        method: 'pearson' (kayan pencere), 'ewma' (pencere saklanmaz, sadece N × N durum) veya
+                'spearman' / 'winsorized' (artımlı güncellenemez - son pencere her çağrıda yeniden hesaplanır)
+        half_life: EWMA yarı ömrü (bar)
+        winsor_limit: 'winsorized' için kuyruk başına kırpma oranı (0.01 = %1)
+        
+        Her çağrı O(yeni bar × N²) iş yapar; sembol listesi veya pencere değişirse
+        motor mevcut verilerden yeniden kurulur. Eksik barlar satır satır atılmaz,
+        her çift kendi ortak barlarıyla hesaplanır (df.corr() gibi).
+        """
+        df = self.prepare_realtime_dataframe(price_data)
+        if df is None:
+            return None
+        if isinstance(price_data, TickSnapshot) and 'price' in price_data.columns:
+            # Ticker görüntüsünün son kovası henüz kapanmadı - bir sonraki çağrıda işlenir
+            df = df.iloc[:-1]
+        
+        values = df.pct_change() * 100 if use_returns else df
+        values = values.iloc[1:] if use_returns else values
+        if len(values) == 0:
+            return None
+        
+        if method in ('spearman', 'winsorized'):
+            # Yeni bir bar pencerenin tüm sıralarını / kantillerini değiştirir - toplamlar işe yaramaz
+            self._rolling = None
+            self._rolling_last_time = values.index[-1]
+            return self.calculate_correlation_matrix(values.iloc[-window:], method=method, winsor_limit=winsor_limit)
+        
+        symbols = list(values.columns)
+        rolling = self._rolling
+        if method == 'ewma':
+            stale = not isinstance(rolling, EwmaCorrelation) or rolling.half_life != half_life
+        elif method == 'pearson':
+            stale = not isinstance(rolling, RollingCorrelation) or rolling.window != window
+        else:
+            raise ValueError(f"Bilinmeyen korelasyon yöntemi: {method}")
+        if stale or rolling.symbols != symbols:
+            if method == 'ewma':
+                rolling = EwmaCorrelation(symbols, half_life=half_life)
+                rolling.push(values.to_numpy())
+            else:
+                rolling = RollingCorrelation(symbols, window)
+                rolling.push(values.to_numpy()[-window:])
+            self._rolling = rolling
+            print(f"Artımlı korelasyon motoru kuruldu ({method}): {len(symbols)} coin, {len(rolling)} bar")
+        else:
+            fresh = values[values.index > self._rolling_last_time]
+            if len(fresh):
+                rolling.push(fresh.to_numpy())
+            print(f"Artımlı korelasyon ({method}): {len(fresh)} yeni bar işlendi")
+        self._rolling_last_time = values.index[-1]
+        
+        # Yeterli veri olan coinler (calculate_correlation_matrix ile aynı filtre)
+        valid = np.flatnonzero(rolling.counts() >= self.min_data_points)
+        if len(valid) < 2:
+            print("Yeterli coin bulunamadı!")
+            return None
+        labels = [symbols[i] for i in valid]
+        return pd.DataFrame(rolling.matrix()[np.ix_(valid, valid)], index=labels, columns=labels)
+    
+    def find_high_correlations(self, correlation_matrix=None, returns=None, approximate=False, recall=0.95):
+        """Yüksek korelasyonlu coin çiftlerini bul
+        
+        correlation_matrix: Korelasyon matrisi (kesin mod)
+        returns: Getiri DataFrame'i (yaklaşık mod, kolonlar = coinler)
+        approximate: True = N × N matris hesaplamadan SimHash LSH adayları + kesin doğrulama
+        recall: Yaklaşık modda eşikteki bir çiftin bulunma olasılığı
+        """
+        print(f"\nYüksek korelasyonlu çiftler aranıyor (eşik: {self.correlation_threshold}"
+              f"{', yaklaşık' if approximate else ''})...")
+        
+        if approximate:
+            if returns is None:
+                raise ValueError("Yaklaşık mod için getiri verisi (returns) gerekli")
+            symbols = returns.columns.tolist()
+            rows, cols, values = approximate_correlation_pairs(returns.to_numpy(dtype=np.float64),
+                                                               threshold=self.correlation_threshold, recall=recall)
+            high_correlations = [
+                {'coin1': symbols[i], 'coin2': symbols[j], 'correlation': r, 'abs_correlation': abs(r)}
+                for i, j, r in zip(rows.tolist(), cols.tolist(), values.tolist())
+            ]
+        else:
+            high_correlations = high_correlation_records(correlation_matrix, threshold=self.correlation_threshold)
         print(f"{len(high_correlations)} yüksek korelasyonlu çift bulundu")
         return high_correlations
     
@@ -238,53 +370,88 @@ class CorrelationAnalyzer:
             print(f"{target_coin} bulunamadı!")
             return []
         
-        correlations = []
-        
-        for other_coin in correlation_matrix.columns:
-            if other_coin != target_coin:
-                corr = correlation_matrix.loc[target_coin, other_coin]
-                
-                if not np.isnan(corr):
-                    correlations.append({
-                        'coin': other_coin,
-                        'correlation': corr,
-                        'abs_correlation': abs(corr)
-                    })
-        
-        # Korelasyona göre sırala
-        correlations.sort(key=lambda x: x['abs_correlation'], reverse=True)
-        return correlations
+        row = correlation_matrix.loc[target_coin].drop(target_coin).dropna()
+        row = row.iloc[np.argsort(-np.abs(row.to_numpy()), kind='stable')]
+        return [
+            {'coin': coin, 'correlation': corr, 'abs_correlation': abs(corr)}
+            for coin, corr in zip(row.index, row.to_numpy().tolist())
+        ]
     
     def analyze_by_coin(self, correlation_matrix, top_n=10):
-        """Her coin için en yüksek korelasyonlu coinleri bul"""
+        """Her coin için en yüksek korelasyonlu coinleri bul
+        
+        Dönen değer: CoinNeighbors (coin_analyses[coin] eski dict formatını verir)
+        """
         print(f"\n{'='*80}")
         print(f"HER COIN İÇİN EN YÜKSEK {top_n} KORELASYON")
         print(f"{'='*80}")
         
-        coin_analyses = {}
+        coin_analyses = CoinNeighbors.from_matrix(correlation_matrix, k=top_n,
+                                                  threshold=self.correlation_threshold)
+        high_counts = coin_analyses.high_counts()
+        print(f"{len(coin_analyses)} coin, ortalama {high_counts.mean() if len(high_counts) else 0:.1f} "
+              f"yüksek korelasyonlu komşu (≥{self.correlation_threshold})")
+        
+        # Sadece en çok yüksek korelasyonu olan coinleri göster (coin başına çıktı yerine)
+        for i in np.argsort(-high_counts, kind='stable')[:10]:
+            neighbors = [
+                f"{coin_analyses.symbols[j]} {r:+.3f}"
+                for j, r in zip(coin_analyses.top_indices[i][:3].tolist(), coin_analyses.top_values[i][:3].tolist())
+                if j >= 0
+            ]
+            print(f"  {coin_analyses.symbols[i]:<15} {high_counts[i]:>5} yüksek | {', '.join(neighbors)}")
         
-        for coin in correlation_matrix.columns:
-            correlations = self.get_correlations_for_coin(correlation_matrix, coin)
-            high_corrs = [c for c in correlations if abs(c['correlation']) >= self.correlation_threshold]
-            
-            coin_analyses[coin] = {
-                'all_correlations': correlations,
-                'high_correlations': high_corrs,
-                'top_correlations': correlations[:top_n]
+        return coin_analyses
+    
+    def analyze_lead_lag(self, returns, max_lag=10, top_n=100, filename='realtime_lead_lag.json'):
+        """Hangi coin hangisinden kaç bar önce hareket ediyor? (tüm çiftler, 1..max_lag gecikme)
+        
+        returns: Getiri DataFrame'i (satır = bar, kolon = coin; 1m barlarda gecikme = dakika)
+        top_n: Kaydedilecek en güçlü (önden giden, takip eden) çift sayısı
+        Dönen değer: LeadLagTable
+        """
+        print(f"\nGecikmeli korelasyon taranıyor (1-{max_lag} bar, {len(returns.columns)} coin)...")
+        if len(returns) <= max_lag + 2 or len(returns.columns) < 2:
+            print(f"⚠️  Yetersiz veri ({len(returns)} satır)")
+            return None
+        
+        table = LeadLagTable.from_returns(returns, max_lag=max_lag)
+        top_pairs = table.top_pairs(top_n)
+        for pair in top_pairs[:10]:
+            zero_lag = pair['zero_lag_correlation']
+            print(f"  {pair['leader']:<15} → {pair['follower']:<15} {pair['lag']:>3} bar  r={pair['correlation']:+.3f}"
+                  + (f" (eşzamanlı {zero_lag:+.3f})" if zero_lag is not None else ""))
+        
+        try:
+            output = {
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'max_lag': max_lag,
+                'data_points': len(returns),
+                'coins': table.to_dict(),
+                'top_pairs': top_pairs,
             }
-            
-            # Her coin için sonuçları göster
-            print(f"\n{coin}:")
-            print(f"  Toplam {len(correlations)} coin ile korelasyon")
-            print(f"  {len(high_corrs)} yüksek korelasyonlu (≥{self.correlation_threshold})")
-            print(f"  En yüksek {top_n} korelasyon:")
-            
-            for i, corr_data in enumerate(correlations[:top_n], 1):
-                corr = corr_data['correlation']
-                status = "Pozitif" if corr > 0 else "Negatif"
-                print(f"    {i}. {corr_data['coin']:<15} {corr:>8.4f} ({status})")
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(output, f, indent=2, ensure_ascii=False)
+            print(f"Gecikmeli korelasyonlar {filename} dosyasına kaydedildi")
+        except Exception as e:
+            print(f"Kaydetme hatası: {e}")
+        return table
+    
+    def cluster_correlation_matrix(self, correlation_matrix, max_distance=0.5):
+        """Coin gruplarını bul: 1 - |r| uzaklığında ortalama bağlantılı kümeleme
         
-        return coin_analyses
+        max_distance: Kesim uzaklığı (0.5 = küme içi ortalama |r| ≥ 0.5)
+        Dönen değer: CorrelationClusters (seriation sırası + etiketler, matrisle birlikte kaydedilir)
+        """
+        if len(correlation_matrix) > MAX_CLUSTER_SYMBOLS:
+            print(f"⚠️  {len(correlation_matrix)} coin kümeleme için fazla (>{MAX_CLUSTER_SYMBOLS}), atlanıyor")
+            return None
+        clusters = CorrelationClusters.from_matrix(correlation_matrix, max_distance=max_distance)
+        groups = clusters.members(min_size=2)
+        print(f"{clusters.n_clusters} küme ({len(groups)} çok üyeli, max_distance={max_distance})")
+        for label, coins in sorted(groups.items(), key=lambda item: -len(item[1]))[:5]:
+            print(f"  K{label:<4} {len(coins):>4} coin | {', '.join(coins[:6])}{' ...' if len(coins) > 6 else ''}")
+        return clusters
     
     # ==================== GÖRÜNTÜLEME VE KAYDETME ====================
     
@@ -331,26 +498,7 @@ class CorrelationAnalyzer:
     def save_coin_analyses(self, coin_analyses, filename='coin_correlations.json'):
         """Her coin için korelasyon analizlerini kaydet"""
         try:
-            output = {}
-            for coin, analysis in coin_analyses.items():
-                output[coin] = {
-                    'high_correlations': [
-                        {
-                            'coin': c['coin'],
-                            'correlation': float(c['correlation']),
-                            'abs_correlation': float(c['abs_correlation'])
-                        }
-                        for c in analysis['high_correlations']
-                    ],
-                    'top_correlations': [
-                        {
-                            'coin': c['coin'],
-                            'correlation': float(c['correlation']),
-                            'abs_correlation': float(c['abs_correlation'])
-                        }
-                        for c in analysis['top_correlations']
-                    ]
-                }
+            output = coin_analyses.to_dict()
             
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(output, f, indent=2, ensure_ascii=False)
@@ -361,10 +509,18 @@ class CorrelationAnalyzer:
             print(f"Kaydetme hatası: {e}")
             return False
     
-    def save_correlation_matrix(self, correlation_matrix, filename='correlation_matrix.csv'):
-        """Korelasyon matrisini CSV dosyasına kaydet"""
+    def save_correlation_matrix(self, correlation_matrix, filename='correlation_matrix.csv', binary=True,
+                                clusters=None):
+        """Korelasyon matrisini CSV dosyasına kaydet
+        
+        binary: Yanına memmap'lenebilir float32 kopya da yaz ('x.csv' -> 'x.corr', dashboard bunu okur)
+        clusters: CorrelationClusters - seriation sırası ve küme etiketleri binary kopyaya eklenir
+        """
         try:
-            correlation_matrix.to_csv(filename)
+            if binary:
+                save_matrix_pair(filename, correlation_matrix, clusters=clusters)
+            else:
+                correlation_matrix.to_csv(filename)
             print(f"Korelasyon matrisi {filename} dosyasına kaydedildi")
             return True
         except Exception as e:
@@ -420,22 +576,31 @@ class CorrelationAnalyzer:
         # 7. Her coin için analiz
         coin_analyses = self.analyze_by_coin(correlation_matrix)
         
-        # 8. Sonuçları göster
+        # 8. Coin grupları (heatmap sıralaması için matrisle birlikte kaydedilir)
+        clusters = self.cluster_correlation_matrix(correlation_matrix)
+        
+        # 9. Sonuçları göster
         self.display_correlations(high_correlations)
         
-        # 9. Kaydet
+        # 10. Kaydet
         self.save_correlations(high_correlations, 'historical_correlations.json')
         self.save_coin_analyses(coin_analyses, 'historical_coin_correlations.json')
-        self.save_correlation_matrix(correlation_matrix, 'historical_correlation_matrix.csv')
+        self.save_correlation_matrix(correlation_matrix, 'historical_correlation_matrix.csv', clusters=clusters)
         
         return correlation_matrix, high_correlations, coin_analyses
     
-    def analyze_realtime_data(self, price_data, use_returns=True, resample_interval='1min'):
+    def analyze_realtime_data(self, price_data, use_returns=True, resample_interval='1min',
+                              method='pearson', half_life=30, lead_lag_max_lag=None, winsor_limit=0.01):
         """Anlık WebSocket verileriyle korelasyon analizi
         
-        price_data: binance_websocket'ten gelen price_data dict'i
+        price_data: binance_websocket'ten gelen TickSnapshot (veya TickStore / eski format dict)
         use_returns: True ise fiyat değişimleri, False ise fiyatlar
-        resample_interval: Veri yeniden örnekleme aralığı
+        resample_interval: Veri yeniden örnekleme aralığı (TickSnapshot zaten hizalı, atlanır)
+        method: 'pearson' (eşit ağırlıklı), 'ewma' (üstel ağırlıklı), 'spearman' (sıra korelasyonu)
+                veya 'winsorized' (kuyrukları kırpılmış Pearson) - bkz. calculate_correlation_matrix
+        half_life: 'ewma' yarı ömrü (bar)
+        winsor_limit: 'winsorized' için kuyruk başına kırpma oranı (0.01 = alt ve üst %1)
+        lead_lag_max_lag: Verilirse aynı getirilerle 1..N bar gecikmeli korelasyon taraması (analyze_lead_lag)
         """
         print("\n" + "="*80)
         print("ANLIK VERİLERLE KORELASYON ANALİZİ")
@@ -447,7 +612,7 @@ class CorrelationAnalyzer:
             return None, None, None
         
         # 2. Yeniden örnekle
-        if resample_interval:
+        if resample_interval and not isinstance(price_data, TickSnapshot):
             df = self.resample_data(df, resample_interval)
         
         # 3. Returns veya fiyatlar
@@ -457,7 +622,8 @@ class CorrelationAnalyzer:
             df = df.dropna()
         
         # 4. Korelasyon matrisi
-        correlation_matrix = self.calculate_correlation_matrix(df)
+        correlation_matrix = self.calculate_correlation_matrix(df, method=method, half_life=half_life,
+                                                               winsor_limit=winsor_limit)
         if correlation_matrix is None:
             return None, None, None
         
@@ -467,12 +633,19 @@ class CorrelationAnalyzer:
         # 6. Her coin için analiz
         coin_analyses = self.analyze_by_coin(correlation_matrix)
         
-        # 7. Sonuçları göster
+        # 7. Coin grupları (heatmap sıralaması için matrisle birlikte kaydedilir)
+        clusters = self.cluster_correlation_matrix(correlation_matrix)
+        
+        # 8. Sonuçları göster
         self.display_correlations(high_correlations)
         
-        # 8. Kaydet
+        # 9. Kaydet
         self.save_correlations(high_correlations, 'realtime_correlations.json')
         self.save_coin_analyses(coin_analyses, 'realtime_coin_correlations.json')
-        self.save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv')
+        self.save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv', clusters=clusters)
+        
+        # 10. Gecikmeli (lead-lag) korelasyon - aynı getiriler üzerinde
+        if lead_lag_max_lag:
+            self.analyze_lead_lag(df[correlation_matrix.columns], max_lag=lead_lag_max_lag)
         
         return correlation_matrix, high_correlations, coin_analyses
\ No newline at end of file
@@ -3,191 +3,197 @@ import os
 from datetime import datetime
 from typing import Dict, List, Optional
 
+import numpy as np
+import pandas as pd
+
+from change_log import ChangeLog, TIMESTAMP_FORMAT
+from correlation_kernels import high_correlation_records
+from correlation_pyramid import CorrelationPyramid
+from matrix_store import CorrelationMatrixFile, write_correlation_matrix
+
 class CorrelationChangeTracker:
     """Korelasyon değişikliklerini takip eden sınıf"""
     
     def __init__(self, history_file='correlation_changes_history.json', 
-                 threshold_change=0.1, min_correlation=0.7):
+                 threshold_change=0.1, min_correlation=0.7,
+                 log_directory='correlation_changes', retention_days=30):
         """
+        history_file: Eski tek-dosya JSON geçmişi (sadece ilk çalıştırmada günlüğe aktarılır)
         threshold_change: Önemli değişiklik eşiği (örn: 0.1 = %10 değişim)
         min_correlation: Takip edilecek minimum korelasyon değeri
+        log_directory: Değişiklik günlüğü klasörü (günlük segmentler + son korelasyonlar)
+        retention_days: Değişikliklerin saklanacağı gün sayısı
         """
         self.history_file = history_file
         self.threshold_change = threshold_change
         self.min_correlation = min_correlation
+        self.change_log = ChangeLog(log_directory, retention_days)
+        self.state_file = os.path.join(log_directory, 'last_correlations.corr')
+        imported = self.change_log.import_legacy(history_file)
+        if imported:
+            print(f"✓ {imported} eski korelasyon değişikliği günlüğe aktarıldı")
         self.previous_correlations = self.load_previous_correlations()
     
-    def load_previous_correlations(self) -> Dict:
-        """Önceki korelasyon değerlerini yükle"""
+    def load_previous_correlations(self) -> pd.DataFrame:
+        """Önceki korelasyon durumunu yükle (N × N, kaydı olmayan çiftler NaN)"""
+        if os.path.exists(self.state_file):
+            try:
+                return CorrelationMatrixFile(self.state_file).to_frame()
+            except Exception as e:
+                print(f"⚠️  Önceki korelasyon yükleme hatası: {e}")
+        # Eski tek-dosya geçmişteki son korelasyonlar
         if os.path.exists(self.history_file):
             try:
                 with open(self.history_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    # En son analiz değerlerini al
-                    if 'last_correlations' in data:
-                        return data['last_correlations']
+                return self._pair_state(list(data.get('last_correlations', {}).values()))
             except Exception as e:
                 print(f"⚠️  Önceki korelasyon yükleme hatası: {e}")
-        return {}
+        return self._pair_state([])
+    
+    @staticmethod
+    def _pair_state(correlations: List[Dict]) -> pd.DataFrame:
+        """Çift kayıtlarını sembol indeksli simetrik matrise çevir (kaydı olmayan çiftler NaN)"""
+        symbols = sorted({corr.get('coin1', '') for corr in correlations} |
+                         {corr.get('coin2', '') for corr in correlations})
+        positions = {symbol: i for i, symbol in enumerate(symbols)}
+        rows = np.array([positions[corr.get('coin1', '')] for corr in correlations], dtype=np.int64)
+        cols = np.array([positions[corr.get('coin2', '')] for corr in correlations], dtype=np.int64)
+        values = np.array([corr.get('correlation', 0) for corr in correlations], dtype=np.float64)
+        matrix = np.full((len(symbols), len(symbols)), np.nan)
+        matrix[rows, cols] = values
+        matrix[cols, rows] = values
+        return pd.DataFrame(matrix, index=symbols, columns=symbols)
     
     def save_previous_correlations(self, correlations: List[Dict]):
-        """Mevcut korelasyonları önceki değerler olarak kaydet"""
+        """Mevcut korelasyonları önceki değerler olarak kaydet
+        
+        Durum, sembol indeksli seyrek binary matris olarak yazılır (matrix_store,
+        sadece kaydı olan çiftler); yazım atomiktir. float64 saklanır - float32'de
+        tam eşikteki bir değer (0.7 -> 0.6999...) yeniden yüklenince eşiğin altına düşer.
+        """
         try:
-            # Mevcut veriyi yükle
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            else:
-                data = {'changes_history': [], 'last_correlations': {}}
-            
-            # Yeni korelasyonları dict formatına çevir (hızlı erişim için)
-            new_correlations = {}
-            for corr in correlations:
-                coin1 = corr.get('coin1', '')
-                coin2 = corr.get('coin2', '')
-                correlation = corr.get('correlation', 0)
-                
-                # Çifti sıralı olarak sakla (coin1 < coin2)
-                pair_key = tuple(sorted([coin1, coin2]))
-                new_correlations[pair_key] = {
-                    'coin1': coin1,
-                    'coin2': coin2,
-                    'correlation': correlation,
-                    'abs_correlation': abs(correlation)
-                }
-            
-            data['last_correlations'] = new_correlations
-            
-            # Dosyaya kaydet
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
+            state = self._pair_state(correlations)
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+            write_correlation_matrix(self.state_file, state, dtype='float64', floor=0.0)
+            self.previous_correlations = state
             return True
         except Exception as e:
             print(f"❌ Korelasyon kaydetme hatası: {e}")
             return False
     
     def detect_changes(self, current_correlations: List[Dict]) -> List[Dict]:
-        """Mevcut korelasyonlarla önceki korelasyonları karşılaştır ve değişiklikleri tespit et"""
-        changes = []
-        timestamp = datetime.now()
+        """Mevcut korelasyonlarla önceki korelasyonları karşılaştır ve değişiklikleri tespit et
         
-        # Mevcut korelasyonları dict formatına çevir
-        current_dict = {}
-        for corr in current_correlations:
-            coin1 = corr.get('coin1', '')
-            coin2 = corr.get('coin2', '')
-            correlation = corr.get('correlation', 0)
-            abs_corr = abs(correlation)
-            
-            # Sadece yeterince yüksek korelasyonları takip et
-            if abs_corr < self.min_correlation:
-                continue
-            
-            pair_key = tuple(sorted([coin1, coin2]))
-            current_dict[pair_key] = {
-                'coin1': coin1,
-                'coin2': coin2,
-                'correlation': correlation,
-                'abs_correlation': abs_corr
-            }
+        İki durum ortak sembol ekseninde hizalanır; değişen / yeni / kaybolan
+        çiftler üst üçgen üzerinde NumPy maskeleriyle bulunur. Python döngüsü
+        sadece bulunan değişiklikler için kayıt oluşturur.
         
-        # Önceki korelasyonlarla karşılaştır
-        checked_pairs = set()
+        Mevcut çiftler girdideki coin1 / coin2 yönüyle kaydedilir; kaybolan
+        çiftlerin yönü durumda saklanmadığından alfabetik sıradadır.
+        """
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
         
-        # 1. Mevcut korelasyonları kontrol et (yeni veya değişmiş)
-        for pair_key, current_data in current_dict.items():
-            checked_pairs.add(pair_key)
-            coin1 = current_data['coin1']
-            coin2 = current_data['coin2']
-            current_corr = current_data['correlation']
-            current_abs = current_data['abs_correlation']
-            
-            if pair_key in self.previous_correlations:
-                # Önceki değer var - karşılaştır
-                prev_data = self.previous_correlations[pair_key]
-                prev_corr = prev_data.get('correlation', 0)
-                prev_abs = prev_data.get('abs_correlation', 0)
-                
-                # Değişim miktarını hesapla
-                abs_change = abs(current_abs - prev_abs)
-                corr_change = current_corr - prev_corr
-                
-                # Önemli değişiklik var mı?
-                if abs_change >= self.threshold_change:
-                    change_type = self._determine_change_type(prev_abs, current_abs, prev_corr, current_corr)
-                    
-                    changes.append({
-                        'timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                        'coin1': coin1,
-                        'coin2': coin2,
-                        'previous_correlation': round(prev_corr, 4),
-                        'previous_abs_correlation': round(prev_abs, 4),
-                        'current_correlation': round(current_corr, 4),
-                        'current_abs_correlation': round(current_abs, 4),
-                        'change_amount': round(corr_change, 4),
-                        'abs_change_amount': round(abs_change, 4),
-                        'change_type': change_type,
-                        'status': self._get_status(prev_abs, current_abs)
-                    })
+        # Sadece yeterince yüksek korelasyonları takip et
+        current = self._pair_state([corr for corr in current_correlations
+                                    if abs(corr.get('correlation', 0)) >= self.min_correlation])
+        previous = self.previous_correlations
+        symbols = sorted(set(previous.columns) | set(current.columns))
+        rows, cols = np.triu_indices(len(symbols), k=1)
+        prev_corr = previous.reindex(index=symbols, columns=symbols).to_numpy()[rows, cols]
+        current_corr = current.reindex(index=symbols, columns=symbols).to_numpy()[rows, cols]
+        
+        has_prev = ~np.isnan(prev_corr)
+        has_current = ~np.isnan(current_corr)
+        prev_abs = np.abs(prev_corr)
+        current_abs = np.abs(current_corr)
+        with np.errstate(invalid='ignore'):
+            abs_change = np.abs(current_abs - prev_abs)
+            changed = has_prev & has_current & (abs_change >= self.threshold_change)
+            lost = has_prev & ~has_current & (prev_abs >= self.min_correlation)
+        new = ~has_prev & has_current
+        
+        def pick(mask):
+            """Maskedeki çiftler: (k, coin1, coin2) + 4 basamağa yuvarlanmış değer listeleri"""
+            k = np.flatnonzero(mask)
+            columns = [np.round(values[k], 4).tolist()
+                       for values in (prev_corr, prev_abs, current_corr, current_abs, abs_change)]
+            return k, [symbols[i] for i in rows[k]], [symbols[j] for j in cols[k]], columns
+        
+        changes = []
+        # 1. Mevcut korelasyonlar (yeni veya değişmiş)
+        k, coins1, coins2, (prev_r, prev_a, current_r, current_a, change_a) = pick(changed | new)
+        # Girdideki yön: (coin2, coin1) olarak gelen çiftlerin korelasyonu simetrik, sadece isimler yer değiştirir
+        flipped = {(corr.get('coin2', ''), corr.get('coin1', '')) for corr in current_correlations
+                   if corr.get('coin1', '') > corr.get('coin2', '')}
+        change_amount = np.round(current_corr[k] - prev_corr[k], 4).tolist()
+        change_types = self._change_types(prev_abs[k], current_abs[k]).tolist()
+        for m, (coin1, coin2) in enumerate(zip(coins1, coins2)):
+            if (coin1, coin2) in flipped:
+                coin1, coin2 = coin2, coin1
+            if has_prev[k[m]]:
+                # Önceki değer var - değişim
+                changes.append({
+                    'timestamp': timestamp,
+                    'coin1': coin1,
+                    'coin2': coin2,
+                    'previous_correlation': prev_r[m],
+                    'previous_abs_correlation': prev_a[m],
+                    'current_correlation': current_r[m],
+                    'current_abs_correlation': current_a[m],
+                    'change_amount': change_amount[m],
+                    'abs_change_amount': change_a[m],
+                    'change_type': change_types[m],
+                    'status': self._get_status(prev_abs[k[m]], current_abs[k[m]])
+                })
             else:
                 # Yeni yüksek korelasyonlu çift
-                if current_abs >= self.min_correlation:
-                    changes.append({
-                        'timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                        'coin1': coin1,
-                        'coin2': coin2,
-                        'previous_correlation': None,
-                        'previous_abs_correlation': None,
-                        'current_correlation': round(current_corr, 4),
-                        'current_abs_correlation': round(current_abs, 4),
-                        'change_amount': None,
-                        'abs_change_amount': None,
-                        'change_type': 'NEW_HIGH_CORRELATION',
-                        'status': 'YENİ YÜKSEK KORELASYON'
-                    })
+                changes.append({
+                    'timestamp': timestamp,
+                    'coin1': coin1,
+                    'coin2': coin2,
+                    'previous_correlation': None,
+                    'previous_abs_correlation': None,
+                    'current_correlation': current_r[m],
+                    'current_abs_correlation': current_a[m],
+                    'change_amount': None,
+                    'abs_change_amount': None,
+                    'change_type': 'NEW_HIGH_CORRELATION',
+                    'status': 'YENİ YÜKSEK KORELASYON'
+                })
         
-        # 2. Önceki korelasyonları kontrol et (kaybolan yüksek korelasyonlar)
-        for pair_key, prev_data in self.previous_correlations.items():
-            if pair_key not in checked_pairs:
-                prev_abs = prev_data.get('abs_correlation', 0)
-                
-                # Önceki değer yüksek korelasyonluysa ve şimdi yoksa
-                if prev_abs >= self.min_correlation:
-                    coin1 = prev_data['coin1']
-                    coin2 = prev_data['coin2']
-                    prev_corr = prev_data.get('correlation', 0)
-                    
-                    changes.append({
-                        'timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                        'coin1': coin1,
-                        'coin2': coin2,
-                        'previous_correlation': round(prev_corr, 4),
-                        'previous_abs_correlation': round(prev_abs, 4),
-                        'current_correlation': None,
-                        'current_abs_correlation': None,
-                        'change_amount': None,
-                        'abs_change_amount': round(prev_abs, 4),  # Tamamen kayboldu
-                        'change_type': 'LOST_HIGH_CORRELATION',
-                        'status': 'YÜKSEK KORELASYON KAYBOLDU'
-                    })
+        # 2. Kaybolan yüksek korelasyonlar
+        _, coins1, coins2, (prev_r, prev_a, _, _, _) = pick(lost)
+        for coin1, coin2, r, abs_r in zip(coins1, coins2, prev_r, prev_a):
+            changes.append({
+                'timestamp': timestamp,
+                'coin1': coin1,
+                'coin2': coin2,
+                'previous_correlation': r,
+                'previous_abs_correlation': abs_r,
+                'current_correlation': None,
+                'current_abs_correlation': None,
+                'change_amount': None,
+                'abs_change_amount': abs_r,  # Tamamen kayboldu
+                'change_type': 'LOST_HIGH_CORRELATION',
+                'status': 'YÜKSEK KORELASYON KAYBOLDU'
+            })
         
         return changes
     
-    def _determine_change_type(self, prev_abs: float, current_abs: float, 
-                               prev_corr: float, current_corr: float) -> str:
-        """Değişiklik tipini belirle"""
-        if prev_abs >= self.min_correlation and current_abs < self.min_correlation:
-            return 'HIGH_TO_LOW'  # Yüksekten düşüğe
-        elif prev_abs < self.min_correlation and current_abs >= self.min_correlation:
-            return 'LOW_TO_HIGH'  # Düşükten yükseğe
-        elif prev_abs >= self.min_correlation and current_abs >= self.min_correlation:
-            if current_abs < prev_abs:
-                return 'DECREASED'  # Azaldı ama hala yüksek
-            else:
-                return 'INCREASED'  # Arttı
-        else:
-            return 'CHANGED'  # Genel değişim
+    def _change_types(self, prev_abs: np.ndarray, current_abs: np.ndarray) -> np.ndarray:
+        """Değişiklik tiplerini belirle (çift başına, vektörel)"""
+        with np.errstate(invalid='ignore'):
+            prev_high = prev_abs >= self.min_correlation
+            current_high = current_abs >= self.min_correlation
+            return np.select(
+                [prev_high & ~current_high,                              # Yüksekten düşüğe
+                 ~prev_high & current_high,                              # Düşükten yükseğe
+                 prev_high & current_high & (current_abs < prev_abs),    # Azaldı ama hala yüksek
+                 prev_high & current_high],                              # Arttı
+                ['HIGH_TO_LOW', 'LOW_TO_HIGH', 'DECREASED', 'INCREASED'],
+                default='CHANGED'                                        # Genel değişim
+            )
     
     def _get_status(self, prev_abs: float, current_abs: float) -> str:
         """Durum açıklaması"""
@@ -204,58 +210,25 @@ class CorrelationChangeTracker:
             return f"DEĞİŞTİ ({prev_abs:.3f} → {current_abs:.3f})"
     
     def save_changes(self, changes: List[Dict]):
-        """Değişiklikleri geçmişe kaydet"""
+        """Değişiklikleri günlüğe ekle, saklama süresi dolan günleri sil
+        
+        Sadece yeni kayıtlar yazılır; eski geçmiş okunmaz ve yeniden yazılmaz.
+        """
         if not changes:
             return
         
         try:
-            # Mevcut geçmişi yükle
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            else:
-                data = {'changes_history': [], 'last_correlations': {}}
-            
-            # Yeni değişiklikleri ekle
-            if 'changes_history' not in data:
-                data['changes_history'] = []
-            
-            data['changes_history'].extend(changes)
-            
-            # Son 30 günlük değişiklikleri tut (dosya boyutunu sınırla)
-            from datetime import timedelta
-            cutoff_date = datetime.now() - timedelta(days=30)
-            
-            # 30 günden eski kayıtları filtrele
-            filtered_history = [
-                change for change in data['changes_history']
-                if datetime.strptime(change.get('timestamp', ''), "%Y-%m-%d %H:%M:%S") >= cutoff_date
-            ]
-            
-            data['changes_history'] = filtered_history
-            
-            # Eğer hala çok fazla kayıt varsa (güvenlik için), son 5000'ini tut
-            if len(data['changes_history']) > 5000:
-                data['changes_history'] = data['changes_history'][-5000:]
-            
-            # Dosyaya kaydet
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
+            self.change_log.append(changes)
+            self.change_log.prune()
             print(f"✓ {len(changes)} korelasyon değişikliği kaydedildi")
             
         except Exception as e:
             print(f"❌ Değişiklik kaydetme hatası: {e}")
     
     def get_recent_changes(self, limit: int = 50) -> List[Dict]:
-        """Son değişiklikleri getir"""
+        """Son değişiklikleri getir (en yeniler önce)"""
         try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    changes = data.get('changes_history', [])
-                    # En yeni değişiklikler önce
-                    return sorted(changes, key=lambda x: x.get('timestamp', ''), reverse=True)[:limit]
+            return self.change_log.read(limit=limit)
         except Exception as e:
             print(f"⚠️  Değişiklik okuma hatası: {e}")
         return []
@@ -280,7 +253,9 @@ class CorrelationChangeTracker:
                 if change['previous_correlation'] is not None:
                     prev = change['previous_correlation']
                     curr = change['current_correlation']
-                    print(f"{coin1} ↔ {coin2}: {status} ({prev:.4f} → {curr:.4f})")
+                    # Kaybolan çiftlerde güncel değer yok
+                    curr = 'yok' if curr is None else f"{curr:.4f}"
+                    print(f"{coin1} ↔ {coin2}: {status} ({prev:.4f} → {curr})")
                 else:
                     print(f"{coin1} ↔ {coin2}: {status}")
             
@@ -294,4 +269,14 @@ class CorrelationChangeTracker:
         self.save_previous_correlations(current_correlations)
         
         return changes
-
+    
+    def analyze_pyramid(self, pyramid, horizon: str = '1h'):
+        """Korelasyon piramidinin bir ufkunu doğrudan takip et (ham geçmiş okunmaz)
+        
+        pyramid: CorrelationPyramid veya .npz dosya yolu
+        horizon: '1h', '4h', '24h', '7d', '30d' (veya saniye)
+        """
+        if isinstance(pyramid, str):
+            pyramid = CorrelationPyramid.load(pyramid)
+        current_correlations = high_correlation_records(pyramid.matrix(horizon), threshold=self.min_correlation)
+        return self.analyze_and_save(current_correlations)
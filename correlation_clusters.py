@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+from correlation_kernels import _as_matrix
+
+# Kümeleme N × N yoğun uzaklık matrisi ister - bundan büyük evrenlerde atlanır
+MAX_CLUSTER_SYMBOLS = 5000
+
+
+def average_linkage(distance):
+    """Ortalama bağlantılı hiyerarşik kümeleme (en yakın komşu zinciri, O(N²))
+
+    distance: Simetrik N × N uzaklık matrisi (NaN = en uzak, 1.0 kabul edilir)
+    Dönen format: float64[N - 1, 4] birleşme tablosu - satır başına
+                  (küme a, küme b, uzaklık, yeni küme boyu); 0..N-1 yapraklar,
+                  N + k ise k. satırda oluşan küme (scipy linkage formatı)
+
+    Zincir, birbirinin en yakın komşusu olan iki kümeye ulaşınca birleştirir;
+    ortalama bağlantı indirgenebilir olduğundan sonuç, her adımda küresel en
+    yakın çifti birleştiren klasik algoritmayla aynıdır. Birleşmeler en sonda
+    uzaklığa göre sıralanıp küme numaraları yeniden verilir.
+    """
+    d = np.array(distance, dtype=np.float64)
+    n = d.shape[0]
+    if n < 2:
+        return np.empty((0, 4))
+    d[np.isnan(d)] = 1.0
+    np.fill_diagonal(d, np.inf)
+    sizes = np.ones(n)
+    active = np.ones(n, dtype=bool)
+    merges = []
+    chain = []
+
+    while len(merges) < n - 1:
+        if not chain:
+            chain.append(int(np.flatnonzero(active)[0]))
+        a = chain[-1]
+        row = np.where(active, d[a], np.inf)
+        b = int(np.argmin(row))
+        if len(chain) > 1 and row[chain[-2]] <= row[b]:
+            b = chain[-2]  # Eşitlikte zincirin önceki halkası - döngü olmaz
+        if len(chain) > 1 and b == chain[-2]:
+            chain.pop()
+            chain.pop()
+            merges.append((a, b, row[b], sizes[a] + sizes[b]))
+            # Lance-Williams: d(k, a ∪ b) = (n_a d(k, a) + n_b d(k, b)) / (n_a + n_b)
+            merged = (sizes[a] * d[a] + sizes[b] * d[b]) / (sizes[a] + sizes[b])
+            d[a], d[:, a] = merged, merged
+            d[a, a] = np.inf
+            sizes[a] += sizes[b]
+            active[b] = False
+        else:
+            chain.append(b)
+
+    # Uzaklığa göre sırala ve küme numaralarını birleşme sırasına göre ver
+    merges.sort(key=lambda merge: merge[2])
+    parent = list(range(n))
+    cluster_id = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    linkage = np.empty((n - 1, 4))
+    for k, (a, b, dist, size) in enumerate(merges):
+        root_a, root_b = find(a), find(b)
+        first, second = sorted((cluster_id[root_a], cluster_id[root_b]))
+        linkage[k] = (first, second, dist, size)
+        parent[root_b] = root_a
+        cluster_id[root_a] = n + k
+    return linkage
+
+
+def leaf_order(linkage, n):
+    """Dendrogram yaprak sırası (seriation): benzer coinler heatmap'te yan yana düşer"""
+    if n < 2:
+        return np.arange(n)
+    order = []
+    stack = [2 * n - 2]
+    while stack:
+        node = stack.pop()
+        if node < n:
+            order.append(node)
+        else:
+            left, right = linkage[node - n, :2].astype(np.int64)
+            stack.append(right)
+            stack.append(left)
+    return np.array(order, dtype=np.int64)
+
+
+def cut_linkage(linkage, n, max_distance):
+    """Uzaklığı max_distance'ı aşmayan birleşmeleri uygula, düz küme etiketleri döndür
+
+    Etiketler seriation sırasında ilk görünüşe göre 0, 1, 2... verilir.
+    """
+    parent = np.arange(2 * n - 1)
+    for k, (a, b, dist, _) in enumerate(linkage):
+        if dist <= max_distance:
+            parent[int(a)] = parent[int(b)] = n + k
+    # Her düğümün kökü: birleşmeler sıralı olduğundan sondan başa tek geçiş yeterli
+    for node in range(2 * n - 2, -1, -1):
+        parent[node] = parent[parent[node]]
+    roots = parent[:n]
+    order = leaf_order(linkage, n)
+    _, first_seen, inverse = np.unique(roots[order], return_index=True, return_inverse=True)
+    rank = np.argsort(np.argsort(first_seen))
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = rank[inverse]
+    return labels
+
+
+class CorrelationClusters:
+    """Korelasyon matrisinden seriation sırası + küme etiketleri
+
+    Uzaklık 1 - |r| (negatif korelasyonlu coinler de aynı gruba düşer).
+    Ortalama bağlantı max_distance'ta kesilir: 0.5, küme içi ortalama
+    |r| ≥ 0.5 demektir.
+    """
+
+    def __init__(self, symbols, order, labels, max_distance):
+        """
+        symbols: Sembol listesi (N)
+        order: Seriation sırası (int64[N], sembol indeksleri)
+        labels: Küme etiketi (int64[N]; 0 en baştaki küme)
+        max_distance: Kesim uzaklığı
+        """
+        self.symbols = list(symbols)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.max_distance = max_distance
+
+    @classmethod
+    def from_matrix(cls, correlation_matrix, max_distance=0.5, symbols=None):
+        matrix, symbols = _as_matrix(correlation_matrix, symbols)
+        linkage = average_linkage(1.0 - np.abs(matrix))
+        n = len(symbols)
+        return cls(symbols, leaf_order(linkage, n), cut_linkage(linkage, n, max_distance), max_distance)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def n_clusters(self):
+        return int(self.labels.max()) + 1 if len(self.labels) else 0
+
+    def ordered_symbols(self):
+        return [self.symbols[i] for i in self.order]
+
+    def members(self, min_size=1):
+        """{küme etiketi: [coinler (seriation sırasında)]}"""
+        groups = {}
+        for i in self.order.tolist():
+            groups.setdefault(int(self.labels[i]), []).append(self.symbols[i])
+        return {label: coins for label, coins in groups.items() if len(coins) >= min_size}
+
+    def reorder(self, correlation_matrix):
+        """Matrisi seriation sırasına diz (matrisde olmayan coinler atlanır, fazlalar sona)"""
+        present = set(correlation_matrix.columns)
+        ordered = [symbol for symbol in self.ordered_symbols() if symbol in present]
+        known = set(ordered)
+        ordered += [symbol for symbol in correlation_matrix.columns if symbol not in known]
+        return correlation_matrix.loc[ordered, ordered]
+
+    def collapse(self, correlation_matrix, min_size=1):
+        """Küme × küme ortalama korelasyon (köşegen: küme içi ortalama, kendisiyle korelasyon hariç)
+
+        min_size: Bundan küçük kümeler gösterilmez (örn. 2 = tekil coinleri at)
+        Dönen değer: (DataFrame K × K, küme boyları Series) - etiketler 'K0 (12)' formatında
+        """
+        matrix, symbols = _as_matrix(correlation_matrix)
+        positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        labels = np.array([self.labels[positions[symbol]] if symbol in positions else -1 for symbol in symbols],
+                          dtype=np.int64)
+        sizes = np.bincount(labels[labels >= 0], minlength=self.n_clusters)
+        shown = np.flatnonzero(sizes >= max(min_size, 1))
+        remap = np.full(self.n_clusters + 1, -1)
+        remap[shown] = np.arange(len(shown))
+        labels = remap[labels]  # -1 (matriste yok) -> remap[-1] = -1
+        keep = np.flatnonzero(labels >= 0)
+        keep = keep[np.argsort(labels[keep], kind='stable')]
+        matrix, labels = matrix[np.ix_(keep, keep)], labels[keep]
+
+        names = [f"K{label} ({size})" for label, size in zip(shown.tolist(), sizes[shown].tolist())]
+        if len(labels) == 0:
+            return pd.DataFrame(index=names, columns=names, dtype=np.float64), pd.Series(sizes[shown], index=names)
+
+        # Kümeye göre sıralı matriste satır ve kolon blokları reduceat ile toplanır - O(N²)
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        present = ~np.isnan(matrix)
+        sums = np.add.reduceat(np.add.reduceat(np.where(present, matrix, 0.0), starts, axis=0), starts, axis=1)
+        counts = np.add.reduceat(np.add.reduceat(present.astype(np.float64), starts, axis=0), starts, axis=1)
+        # Köşegenden coinlerin kendisiyle korelasyonunu (1.0) çıkar
+        diagonal = np.diag(matrix)
+        sums[np.diag_indices(len(starts))] -= np.add.reduceat(np.where(np.isnan(diagonal), 0.0, diagonal), starts)
+        counts[np.diag_indices(len(starts))] -= np.add.reduceat(~np.isnan(diagonal), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / counts
+        return pd.DataFrame(mean, index=names, columns=names), pd.Series(sizes[shown], index=names)
+
+    def to_header(self):
+        """matrix_store başlığına yazılacak JSON alanları"""
+        return {'order': self.order.tolist(), 'labels': self.labels.tolist(), 'max_distance': self.max_distance}
+
+    @classmethod
+    def from_header(cls, symbols, header):
+        return cls(symbols, header['order'], header['labels'], header['max_distance'])
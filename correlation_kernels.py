@@ -0,0 +1,828 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+PAIR_COLUMNS = ('coin1', 'coin2', 'correlation', 'abs_correlation')
+
+
+def _as_matrix(correlation_matrix, symbols=None):
+    """DataFrame veya ndarray'den (kare float64 matris, sembol listesi) döndür"""
+    if isinstance(correlation_matrix, pd.DataFrame):
+        if symbols is None:
+            symbols = correlation_matrix.columns.tolist()
+        matrix = correlation_matrix.to_numpy(dtype=np.float64)
+    else:
+        matrix = np.asarray(correlation_matrix, dtype=np.float64)
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError(f"Kare korelasyon matrisi gerekli, gelen boyut: {matrix.shape}")
+    if symbols is None:
+        symbols = list(range(matrix.shape[0]))
+    return matrix, symbols
+
+
+def upper_pairs(correlation_matrix, threshold=0.7, top_k=None):
+    """Üst üçgendeki (i < j) çiftleri |r|'ye göre azalan sırada döndür
+
+    correlation_matrix: Kare korelasyon matrisi (ndarray veya DataFrame)
+    threshold: Minimum |r| (None = filtre yok, NaN çiftler en sona)
+    top_k: Sadece en yüksek |r|'li K çift (None = hepsi)
+    Dönen format: (i: int64[m], j: int64[m], r: float64[m])
+
+    Eşit |r|'li çiftler satır sırasını korur (eski iç içe döngüyle aynı sonuç).
+    """
+    matrix, _ = _as_matrix(correlation_matrix)
+    rows, cols = np.triu_indices(matrix.shape[0], k=1)
+    values = matrix[rows, cols]
+    abs_values = np.abs(values)
+
+    if threshold is not None:
+        with np.errstate(invalid='ignore'):
+            keep = abs_values >= threshold  # NaN karşılaştırması False -> atılır
+        rows, cols, values, abs_values = rows[keep], cols[keep], values[keep], abs_values[keep]
+
+    if top_k is not None and top_k < len(values):
+        # O(m) seçim; sadece seçilen K çift sıralanır
+        sort_key = np.where(np.isnan(abs_values), -np.inf, abs_values)
+        chosen = np.sort(np.argpartition(-sort_key, top_k - 1)[:top_k]) if top_k > 0 else np.empty(0, dtype=np.int64)
+        rows, cols, values, abs_values = rows[chosen], cols[chosen], values[chosen], abs_values[chosen]
+
+    order = np.argsort(-abs_values, kind='stable')  # NaN en sona düşer
+    return rows[order], cols[order], values[order]
+
+
+def high_correlation_pairs(correlation_matrix, symbols=None, threshold=0.7, top_k=None):
+    """Yüksek korelasyonlu çiftleri DataFrame olarak döndür
+
+    symbols: Satır/kolon etiketleri (None = DataFrame kolonları veya 0..n-1)
+    Kolonlar: coin1, coin2, correlation, abs_correlation (|r|'ye göre azalan)
+    """
+    matrix, symbols = _as_matrix(correlation_matrix, symbols)
+    rows, cols, values = upper_pairs(matrix, threshold, top_k)
+    labels = np.asarray(symbols, dtype=object)
+    return pd.DataFrame({
+        'coin1': labels[rows],
+        'coin2': labels[cols],
+        'correlation': values,
+        'abs_correlation': np.abs(values),
+    }, columns=list(PAIR_COLUMNS))
+
+
+def high_correlation_records(correlation_matrix, symbols=None, threshold=0.7, top_k=None):
+    """high_correlation_pairs sonucunu JSON'a yazılabilir dict listesi olarak döndür
+
+    Dönen format: [{'coin1', 'coin2', 'correlation', 'abs_correlation'}, ...]
+    """
+    matrix, symbols = _as_matrix(correlation_matrix, symbols)
+    rows, cols, values = upper_pairs(matrix, threshold, top_k)
+    return [
+        {
+            'coin1': symbols[i],
+            'coin2': symbols[j],
+            'correlation': r,
+            'abs_correlation': abs(r),
+        }
+        for i, j, r in zip(rows.tolist(), cols.tolist(), values.tolist())
+    ]
+
+
+# ---------------- Bloklu (bellek dışı) korelasyon ----------------
+
+def standardize_columns(values):
+    """Kolonları sıfır ortalama / birim norm olacak şekilde ölçekle
+
+    Z^T Z doğrudan Pearson korelasyonudur. NaN'lar kolon ortalamasıyla
+    doldurulur (standartlaştırıldıktan sonra 0); sabit kolonlar NaN olur.
+    Dönen format: (Z: float64[T, N], geçerli kolon maskesi: bool[N])
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    means = np.divide(np.where(present, values, 0.0).sum(axis=0), counts,
+                      out=np.zeros(values.shape[1]), where=counts > 0)
+    centered = np.where(present, values - means, 0.0)
+    norms = np.sqrt((centered * centered).sum(axis=0))
+    valid = (counts >= 2) & (norms > 0)
+    z = np.divide(centered, norms, out=np.zeros_like(centered), where=valid)
+    return z, valid
+
+
+def blocked_correlation(values, threshold=0.7, block_size=1024, out=None, top_k=None):
+    """Korelasyon matrisini blok blok (BLAS) hesapla, yüksek |r| çiftlerini akışta topla
+
+    values: Getiri matrisi (T × N)
+    threshold: Toplanacak çiftler için minimum |r| (None = hiçbiri, sadece matris)
+    block_size: Kare blok boyu (bellekteki en büyük ara sonuç block_size² × 8 byte)
+    out: N × N çıktı dizisi (örn: np.lib.format.open_memmap) - None ise matris tutulmaz
+    top_k: Sadece en yüksek |r|'li K çifti tut (None = hepsi)
+    Dönen format: (i: int64[m], j: int64[m], r: float64[m]) - |r|'ye göre azalan,
+                  upper_pairs ile aynı sıra
+
+    Tam yoğun matris RAM'de hiç oluşturulmaz: her (I, J ≥ I) bloğu tek bir
+    Z_I^T Z_J çarpımıdır; blok `out`a (ve simetriğine) yazılır ve çiftleri
+    hemen çıkarılır.
+    """
+    z, valid = standardize_columns(values)
+    n = z.shape[1]
+    found_rows, found_cols, found_values = [], [], []
+
+    for i0 in range(0, n, block_size):
+        i1 = min(i0 + block_size, n)
+        z_i = z[:, i0:i1]
+        for j0 in range(i0, n, block_size):
+            j1 = min(j0 + block_size, n)
+            tile = z_i.T @ z[:, j0:j1]
+            np.clip(tile, -1.0, 1.0, out=tile)
+            tile[~valid[i0:i1], :] = np.nan
+            tile[:, ~valid[j0:j1]] = np.nan
+            if i0 == j0:
+                diagonal = np.where(valid[i0:i1], 1.0, np.nan)
+                np.fill_diagonal(tile, diagonal)
+            if out is not None:
+                out[i0:i1, j0:j1] = tile
+                if j0 != i0:
+                    out[j0:j1, i0:i1] = tile.T
+            if threshold is None:
+                continue
+            with np.errstate(invalid='ignore'):
+                hit = np.abs(tile) >= threshold
+            if i0 == j0:
+                hit = np.triu(hit, k=1)
+            rows, cols = np.nonzero(hit)
+            found_rows.append(rows + i0)
+            found_cols.append(cols + j0)
+            found_values.append(tile[rows, cols])
+
+        if top_k is not None and found_values:
+            # Blok satırı sonunda sadece en iyi K çift tutulur (bellek O(K))
+            rows, cols, vals = (np.concatenate(found_rows), np.concatenate(found_cols),
+                                np.concatenate(found_values))
+            if len(vals) > top_k:
+                keep = np.argpartition(-np.abs(vals), top_k - 1)[:top_k] if top_k > 0 else np.empty(0, dtype=np.int64)
+                rows, cols, vals = rows[keep], cols[keep], vals[keep]
+            found_rows, found_cols, found_values = [rows], [cols], [vals]
+
+    if out is not None and hasattr(out, 'flush'):
+        out.flush()
+    if not found_values:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), np.empty(0)
+    rows, cols, vals = np.concatenate(found_rows), np.concatenate(found_cols), np.concatenate(found_values)
+    order = np.lexsort((cols, rows, -np.abs(vals)))
+    return rows[order].astype(np.int64), cols[order].astype(np.int64), vals[order]
+
+
+def rank_columns(values):
+    """Her kolonu ayrı sırala (1..T, eşitlerde ortalama sıra; NaN korunur)
+
+    Sıralanmış kolonlarda eşit değer grupları bitişiktir; grubun ilk ve son
+    konumu kümülatif maksimum / minimumla bulunur ve ortalama sıra tüm gruba
+    yazılır - kolon başına Python döngüsü yok. Sonuç pandas rank(method='average').
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n = values.shape
+    ranks = np.full(values.shape, np.nan)
+    if n_rows == 0:
+        return ranks
+    order = np.argsort(values, axis=0, kind='stable')  # NaN en sona
+    ordered = np.take_along_axis(values, order, axis=0)
+    positions = np.arange(n_rows)[:, None]
+    new_group = np.ones(values.shape, dtype=bool)
+    new_group[1:] = ordered[1:] != ordered[:-1]
+    group_end = np.ones(values.shape, dtype=bool)
+    group_end[:-1] = new_group[1:]
+    first = np.maximum.accumulate(np.where(new_group, positions, 0), axis=0)
+    last = np.minimum.accumulate(np.where(group_end, positions, n_rows - 1)[::-1], axis=0)[::-1]
+    average = (first + last) / 2.0 + 1.0
+    average[np.isnan(ordered)] = np.nan
+    np.put_along_axis(ranks, order, average, axis=0)
+    return ranks
+
+
+def winsorize_columns(values, limit=0.01):
+    """Her kolonu kendi [limit, 1 - limit] kantillerine kırp (tek fitillerin etkisini sınırlar)
+
+    limit: Her kuyruktan kırpılacak oran (0.01 = %1 alt + %1 üst)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0 or limit <= 0:
+        return values.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Tamamen NaN kolonlar
+        low, high = np.nanquantile(values, [limit, 1.0 - limit], axis=0)
+    return np.clip(values, low, high)
+
+
+# df.corr() yerine kullanılabilecek yöntemler (hepsi aynı bloklu BLAS çekirdeği)
+CORRELATION_METHODS = ('pearson', 'spearman', 'winsorized')
+
+
+def correlation_frame(df, block_size=1024, method='pearson', winsor_limit=0.01):
+    """df.corr() yerine bloklu BLAS korelasyonu (eksiksiz veride sonuç aynı)
+
+    method: 'pearson', 'spearman' (kolon bazlı sıralama + Pearson, df.corr(method='spearman')
+            ile aynı) veya 'winsorized' (kolon bazlı kantil kırpma + Pearson)
+    winsor_limit: 'winsorized' için kuyruk başına kırpma oranı
+
+    Eksik değerli kolonlarda NaN'lar ortalamayla doldurulur (df.corr()'un
+    ikili-tam yönteminden farklı) - bu yüzden dropna() sonrası kullanılır.
+    """
+    values = df.to_numpy(dtype=np.float64)
+    if method == 'spearman':
+        values = rank_columns(values)
+    elif method == 'winsorized':
+        values = winsorize_columns(values, winsor_limit)
+    elif method != 'pearson':
+        raise ValueError(f"Bilinmeyen korelasyon yöntemi: {method}")
+    symbols = list(df.columns)
+    matrix = np.empty((len(symbols), len(symbols)))
+    blocked_correlation(values, threshold=None, block_size=block_size, out=matrix)
+    return pd.DataFrame(matrix, index=symbols, columns=symbols)
+
+
+# ---------------- Yaklaşık çift arama (SimHash LSH) ----------------
+
+def simhash_tables(threshold=0.7, n_bits=12, recall=0.95):
+    """Eşikteki bir çifti `recall` olasılıkla aday yapacak tablo sayısı
+
+    İki birim vektör arasındaki açı θ ise rastgele bir hiperdüzlem bitinin
+    eşit olma olasılığı 1 - θ/π'dir (r = cos θ). n_bits'lik bir tablo anahtarı
+    p^n_bits olasılıkla çakışır; L tablodan en az birinde çakışma 1 - (1 - p^b)^L.
+    """
+    p = 1.0 - np.arccos(min(abs(threshold), 1.0)) / np.pi
+    hit = p ** n_bits
+    if hit >= 1.0:
+        return 1
+    return max(1, int(np.ceil(np.log(1.0 - recall) / np.log(1.0 - hit))))
+
+
+def simhash_candidates(z, valid=None, threshold=0.7, n_bits=12, n_tables=None, recall=0.95, seed=0):
+    """Standartlaştırılmış kolonlardan aday çiftleri (i < j) üret
+
+    z: standardize_columns çıktısı (T × N, birim norm kolonlar)
+    valid: Geçerli kolon maskesi (None = hepsi)
+    n_tables: Tablo sayısı (None = simhash_tables ile `recall`dan hesaplanır)
+    Dönen format: (i: int64[c], j: int64[c]) - tekrarsız, satır sırasında
+
+    Her kolon rastgele hiperdüzlemlerle n_tables × n_bits bitlik imzaya
+    indirgenir. Anahtar ve bit tümleyeni aynı kovaya düşer, böylece negatif
+    korelasyonlu çiftler de aday olur. Aynı kovadaki kolonlar sıralı
+    anahtarlarda bitişik olduğundan çiftler kova boyu kadar kaydırmayla
+    vektörel üretilir; maliyet tüm çiftler yerine kova çakışmalarıyla orantılıdır.
+    """
+    n_rows, n = z.shape
+    if n_tables is None:
+        n_tables = simhash_tables(threshold, n_bits, recall)
+    columns = np.flatnonzero(valid) if valid is not None else np.arange(n)
+    rng = np.random.default_rng(seed)
+    weights = np.left_shift(np.int64(1), np.arange(n_bits, dtype=np.int64))
+    mask = (1 << n_bits) - 1
+
+    found = []
+    for table in range(n_tables):
+        planes = rng.standard_normal((n_rows, n_bits))
+        keys = (z[:, columns].T @ planes > 0).astype(np.int64) @ weights
+        keys = np.minimum(keys, keys ^ mask)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        for shift in range(1, len(order)):
+            same = sorted_keys[shift:] == sorted_keys[:-shift]
+            if not same.any():
+                break  # Hiçbir kova bu kadar büyük değil
+            a, b = columns[order[:-shift][same]], columns[order[shift:][same]]
+            found.append(np.minimum(a, b) * n + np.maximum(a, b))
+
+    # Tablolar arası tekrarlar tek sıralamayla atılır (i * N + j kodları)
+    candidates = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+    candidates.sort()
+    if len(candidates):
+        candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+    return candidates // n, candidates % n
+
+
+def approximate_correlation_pairs(values, threshold=0.7, n_bits=12, n_tables=None, recall=0.95,
+                                  seed=0, chunk_size=16384):
+    """|r| ≥ threshold çiftlerini N × N matris hesaplamadan bul (SimHash adayları + kesin doğrulama)
+
+    values: Getiri matrisi (T × N)
+    recall: Eşiğin tam üzerindeki bir çiftin bulunma olasılığı (tablo sayısını belirler;
+            daha yüksek |r|'li çiftler daha yüksek olasılıkla bulunur)
+    Dönen format: blocked_correlation ile aynı (i, j, r) - dönen her çift kesin
+                  hesaplanmıştır (yanlış pozitif yok, bazı çiftler kaçabilir)
+    """
+    z, valid = standardize_columns(values)
+    rows, cols = simhash_candidates(z, valid, threshold, n_bits, n_tables, recall, seed)
+    columns = np.ascontiguousarray(z.T)
+    found_rows, found_cols, found_values = [], [], []
+    for start in range(0, len(rows), chunk_size):
+        i, j = rows[start:start + chunk_size], cols[start:start + chunk_size]
+        r = np.clip(np.einsum('ct,ct->c', columns[i], columns[j]), -1.0, 1.0)
+        hit = np.abs(r) >= threshold
+        found_rows.append(i[hit])
+        found_cols.append(j[hit])
+        found_values.append(r[hit])
+    if not found_values:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), np.empty(0)
+    rows, cols, vals = np.concatenate(found_rows), np.concatenate(found_cols), np.concatenate(found_values)
+    order = np.lexsort((cols, rows, -np.abs(vals)))
+    return rows[order], cols[order], vals[order]
+
+
+# ---------------- Coin başına komşular ----------------
+
+def top_neighbors(correlation_matrix, k=10):
+    """Her satırın |r|'ye göre en yüksek k komşusunu tek argpartition geçişiyle bul
+
+    Köşegen (kendisi) ve NaN korelasyonlar atlanır.
+    Dönen format: (indices: int64[n, k], values: float64[n, k]) - her satır
+                  |r|'ye göre azalan; geçerli komşusu k'dan az olan satırlar
+                  -1 / NaN ile doldurulur
+    """
+    matrix, _ = _as_matrix(correlation_matrix)
+    n = matrix.shape[0]
+    k = max(0, min(k, n - 1))
+    if k == 0:
+        return np.empty((n, 0), dtype=np.int64), np.empty((n, 0))
+
+    sort_key = np.abs(matrix)
+    sort_key[np.isnan(sort_key)] = -np.inf
+    np.fill_diagonal(sort_key, -np.inf)
+
+    indices = np.argpartition(-sort_key, k - 1, axis=1)[:, :k]
+    keys = np.take_along_axis(sort_key, indices, axis=1)
+    # Satır içinde |r| azalan, eşitlikte kolon sırası (eski sıralamayla aynı)
+    order = np.lexsort((indices, -keys), axis=1)
+    indices = np.take_along_axis(indices, order, axis=1)
+    keys = np.take_along_axis(keys, order, axis=1)
+
+    values = np.take_along_axis(matrix, indices, axis=1)
+    missing = np.isneginf(keys)
+    indices[missing] = -1
+    values[missing] = np.nan
+    return indices, values
+
+
+def neighbors_above(correlation_matrix, threshold=0.7):
+    """|r| >= threshold olan tüm komşuları satır satır gruplanmış (CSR) olarak döndür
+
+    Dönen format: (offsets: int64[n + 1], indices: int64[m], values: float64[m])
+                  satır i'nin komşuları indices[offsets[i]:offsets[i + 1]],
+                  her satır içinde |r|'ye göre azalan
+    """
+    matrix, _ = _as_matrix(correlation_matrix)
+    n = matrix.shape[0]
+    rows, cols, values = upper_pairs(matrix, threshold)
+    # Üst üçgen çiftlerini iki yöne aç (i -> j ve j -> i)
+    rows, cols, values = np.concatenate([rows, cols]), np.concatenate([cols, rows]), np.concatenate([values, values])
+    order = np.lexsort((cols, -np.abs(values), rows))
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return offsets, cols[order], values[order]
+
+
+class CoinNeighbors:
+    """Coin başına korelasyon komşuları için kompakt tablo
+
+    Eski analyze_by_coin çıktısının (coin -> dict listeleri) yerine sadece
+    NumPy dizileri tutar; dict görünümü istenirse coin başına üretilir.
+    """
+
+    def __init__(self, symbols, top_indices, top_values, high_offsets, high_indices, high_values, threshold):
+        """
+        symbols: Sembol listesi (N)
+        top_indices / top_values: top_neighbors çıktısı (N × k)
+        high_offsets / high_indices / high_values: neighbors_above çıktısı
+        threshold: Yüksek korelasyon eşiği
+        """
+        self.symbols = symbols
+        self.top_indices = top_indices
+        self.top_values = top_values
+        self.high_offsets = high_offsets
+        self.high_indices = high_indices
+        self.high_values = high_values
+        self.threshold = threshold
+        self._positions = {symbol: i for i, symbol in enumerate(symbols)}
+
+    @classmethod
+    def from_matrix(cls, correlation_matrix, k=10, threshold=0.7, symbols=None):
+        matrix, symbols = _as_matrix(correlation_matrix, symbols)
+        top_indices, top_values = top_neighbors(matrix, k)
+        high_offsets, high_indices, high_values = neighbors_above(matrix, threshold)
+        return cls(symbols, top_indices, top_values, high_offsets, high_indices, high_values, threshold)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def high_counts(self):
+        """Coin başına eşik üstü komşu sayısı (int64[N])"""
+        return np.diff(self.high_offsets)
+
+    def _records(self, indices, values):
+        return [
+            {'coin': self.symbols[j], 'correlation': r, 'abs_correlation': abs(r)}
+            for j, r in zip(indices, values)
+            if j >= 0
+        ]
+
+    def __getitem__(self, symbol):
+        """Eski format: {'high_correlations': [...], 'top_correlations': [...]}"""
+        i = self._positions[symbol]
+        lo, hi = self.high_offsets[i], self.high_offsets[i + 1]
+        return {
+            'high_correlations': self._records(self.high_indices[lo:hi].tolist(), self.high_values[lo:hi].tolist()),
+            'top_correlations': self._records(self.top_indices[i].tolist(), self.top_values[i].tolist()),
+        }
+
+    def to_dict(self):
+        """Tüm tabloyu JSON'a yazılabilir {coin: {...}} sözlüğüne çevir"""
+        # tolist() bir kez - satır başına NumPy skaler dönüşümü yok
+        top_indices = self.top_indices.tolist()
+        top_values = self.top_values.tolist()
+        high_indices = self.high_indices.tolist()
+        high_values = self.high_values.tolist()
+        offsets = self.high_offsets.tolist()
+        return {
+            symbol: {
+                'high_correlations': self._records(high_indices[offsets[i]:offsets[i + 1]],
+                                                   high_values[offsets[i]:offsets[i + 1]]),
+                'top_correlations': self._records(top_indices[i], top_values[i]),
+            }
+            for i, symbol in enumerate(self.symbols)
+        }
+
+
+# ---------------- Gecikmeli (lead-lag) korelasyon ----------------
+
+def lagged_correlation(values, max_lag=10):
+    """Tüm çiftler için 1..max_lag bar gecikmeli korelasyonların |r|'ce en güçlüsü
+
+    values: Getiri matrisi (T × N)
+    Dönen format: (best_r: float64[N, N], best_lag: int64[N, N], zero_lag: float64[N, N])
+        best_r[i, j] = corr(x_i[t], x_j[t + k]) - i, j'ye k = best_lag[i, j] bar önden gider
+        zero_lag = eşzamanlı korelasyon (karşılaştırma için); köşegen ve geçersiz kolonlar NaN
+
+    Her gecikme için örtüşen iki parça (x[:-k], x[k:]) ayrı standartlaştırılır
+    ve tek bir Z_a^T Z_b çarpımıyla tüm çiftlerin kesin Pearson korelasyonu
+    alınır. Küçük gecikme aralığında bu, FFT çapraz korelasyonundan hem daha
+    hızlıdır hem de her gecikmede örtüşme normalizasyonu kesindir.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n = values.shape
+    best_r = np.full((n, n), np.nan)
+    best_abs = np.full((n, n), -1.0)
+    best_lag = np.zeros((n, n), dtype=np.int64)
+
+    for lag in range(1, min(max_lag, n_rows - 2) + 1):
+        leader, leader_valid = standardize_columns(values[:-lag])
+        follower, follower_valid = standardize_columns(values[lag:])
+        r = np.clip(leader.T @ follower, -1.0, 1.0)
+        r[~leader_valid, :] = np.nan
+        r[:, ~follower_valid] = np.nan
+        with np.errstate(invalid='ignore'):
+            better = np.abs(r) > best_abs  # NaN hiçbir zaman seçilmez
+        best_r[better] = r[better]
+        best_abs[better] = np.abs(r[better])
+        best_lag[better] = lag
+
+    z, valid = standardize_columns(values)
+    zero_lag = np.clip(z.T @ z, -1.0, 1.0)
+    zero_lag[~valid, :] = np.nan
+    zero_lag[:, ~valid] = np.nan
+    np.fill_diagonal(best_r, np.nan)
+    np.fill_diagonal(zero_lag, np.nan)
+    best_lag[np.isnan(best_r)] = 0
+    return best_r, best_lag, zero_lag
+
+
+class LeadLagTable:
+    """Coin çiftleri için en güçlü gecikmeli korelasyon tablosu (bkz. lagged_correlation)
+
+    Coin başına özet: coinin önden gittiği (satır) ve takip ettiği (kolon)
+    çiftler arasından |r|'si en yüksek olan. Gecikme işaretli raporlanır:
+    +k = coin partnerinden k bar önce hareket eder, -k = k bar sonra.
+    """
+
+    def __init__(self, symbols, best_r, best_lag, zero_lag, max_lag):
+        """
+        symbols: Sembol listesi (N)
+        best_r / best_lag / zero_lag: lagged_correlation çıktısı (N × N)
+        max_lag: Taranan en büyük gecikme (bar)
+        """
+        self.symbols = list(symbols)
+        self.best_r = best_r
+        self.best_lag = best_lag
+        self.zero_lag = zero_lag
+        self.max_lag = max_lag
+
+    @classmethod
+    def from_returns(cls, returns, max_lag=10, symbols=None):
+        """returns: Getiri DataFrame'i (kolonlar = coinler) veya T × N dizi"""
+        if isinstance(returns, pd.DataFrame):
+            if symbols is None:
+                symbols = returns.columns.tolist()
+            returns = returns.to_numpy(dtype=np.float64)
+        if symbols is None:
+            symbols = list(range(returns.shape[1]))
+        best_r, best_lag, zero_lag = lagged_correlation(returns, max_lag)
+        return cls(symbols, best_r, best_lag, zero_lag, max_lag)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def coin_summary(self):
+        """Coin başına (partner indeksi, işaretli gecikme, r) - partner yoksa -1 / 0 / NaN"""
+        n = len(self.symbols)
+        strength = np.where(np.isnan(self.best_r), -1.0, np.abs(self.best_r))
+        lead_partner = strength.argmax(axis=1)
+        follow_partner = strength.argmax(axis=0)
+        rows = np.arange(n)
+        leads = strength[rows, lead_partner] >= strength[follow_partner, rows]
+
+        partner = np.where(leads, lead_partner, follow_partner)
+        lag = np.where(leads, self.best_lag[rows, lead_partner], -self.best_lag[follow_partner, rows])
+        r = np.where(leads, self.best_r[rows, lead_partner], self.best_r[follow_partner, rows])
+        missing = np.isnan(r)
+        partner[missing] = -1
+        lag[missing] = 0
+        return partner, lag, r
+
+    def top_pairs(self, top_k=100, threshold=None):
+        """|r|'ye göre en güçlü (önden giden, takip eden) çiftler
+
+        Dönen format: [{'leader', 'follower', 'lag', 'correlation', 'zero_lag_correlation'}, ...]
+        """
+        strength = np.where(np.isnan(self.best_r), -1.0, np.abs(self.best_r)).ravel()
+        if threshold is not None:
+            candidates = np.flatnonzero(strength >= threshold)
+        else:
+            candidates = np.flatnonzero(strength >= 0)
+        if top_k is not None and top_k < len(candidates):
+            candidates = candidates[np.argpartition(-strength[candidates], top_k - 1)[:top_k]] if top_k > 0 \
+                else candidates[:0]
+        candidates = candidates[np.argsort(-strength[candidates], kind='stable')]
+        leaders, followers = np.divmod(candidates, len(self.symbols))
+        return [
+            {
+                'leader': self.symbols[i],
+                'follower': self.symbols[j],
+                'lag': lag,
+                'correlation': r,
+                'zero_lag_correlation': None if np.isnan(r0) else r0,
+            }
+            for i, j, lag, r, r0 in zip(leaders.tolist(), followers.tolist(),
+                                        self.best_lag[leaders, followers].tolist(),
+                                        self.best_r[leaders, followers].tolist(),
+                                        self.zero_lag[leaders, followers].tolist())
+        ]
+
+    def to_dict(self):
+        """Coin başına özet: {coin: {'partner', 'lag', 'correlation', 'zero_lag_correlation'}}"""
+        partner, lag, r = self.coin_summary()
+        output = {}
+        for i, (j, k, value) in enumerate(zip(partner.tolist(), lag.tolist(), r.tolist())):
+            if j < 0:
+                continue
+            r0 = self.zero_lag[i, j]
+            output[self.symbols[i]] = {
+                'partner': self.symbols[j],
+                'lag': k,
+                'correlation': value,
+                'zero_lag_correlation': None if np.isnan(r0) else float(r0),
+            }
+        return output
+
+
+# ---------------- Artımlı korelasyon ----------------
+
+class PairwiseMoments:
+    """Artımlı korelasyon motorlarının ortak durumu
+
+    Her sembol çifti için ikili-tam (pairwise complete, df.corr() ile aynı)
+    ağırlıklı toplamlar tutulur: W_ij, Σx_i, Σx_i², Σx_i·x_j (sadece ikisinin
+    de dolu olduğu barlar). Bar eklemek / çıkarmak bu toplamlara O(N²) bir
+    güncellemedir (BLAS matris çarpımı). Sayısal kaymayı azaltmak için
+    değerler sembol başına bir referansa göre kaydırılarak toplanır.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self._shift = np.zeros(len(self.symbols))
+        self._reset_sums()
+
+    def _reset_sums(self):
+        n = len(self.symbols)
+        self._n = np.zeros((n, n))
+        self._sx = np.zeros((n, n))
+        self._sxx = np.zeros((n, n))
+        self._sxy = np.zeros((n, n))
+
+    @staticmethod
+    def _column_means(rows):
+        """NaN'ları atlayarak kolon ortalaması (hiç veri yoksa 0)"""
+        present = ~np.isnan(rows)
+        counts = present.sum(axis=0)
+        totals = np.where(present, rows, 0.0).sum(axis=0)
+        return np.divide(totals, counts, out=np.zeros(rows.shape[1]), where=counts > 0)
+
+    @classmethod
+    def from_sums(cls, symbols, n, sx, sxx, sxy, shift):
+        """Önceden toplanmış (veya birleştirilmiş) toplamlardan durum oluştur"""
+        moments = cls(symbols)
+        moments._n, moments._sx, moments._sxx, moments._sxy = n, sx, sxx, sxy
+        moments._shift = shift
+        return moments
+
+    def sums(self):
+        """(n, Σx, Σx², Σxy) toplamlarını döndür - aynı kaydırmalı durumlar toplanarak birleştirilebilir"""
+        return self._n, self._sx, self._sxx, self._sxy
+
+    def add(self, rows, weights=None):
+        """Barları ağırlıklarıyla ekle (weights None = hepsi 1)"""
+        rows = self._check_rows(rows)
+        self._accumulate(rows, np.ones(len(rows)) if weights is None else np.asarray(weights, dtype=np.float64))
+
+    def _check_rows(self, rows):
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if rows.shape[1] != len(self.symbols):
+            raise ValueError(f"Bar genişliği {rows.shape[1]} != sembol sayısı {len(self.symbols)}")
+        return rows
+
+    def _accumulate(self, rows, weights):
+        """rows (B × N) barlarını bar başına ağırlıkla (B, negatif = çıkar) toplamlara ekle"""
+        present = ~np.isnan(rows)
+        mask = present.astype(np.float64)
+        x = np.where(present, rows - self._shift, 0.0)
+        weighted_mask = mask * weights[:, None]
+        weighted_x = x * weights[:, None]
+        self._n += weighted_mask.T @ mask
+        self._sx += weighted_x.T @ mask      # [i, j] = Σ w·x_i (j de doluysa)
+        self._sxx += (weighted_x * x).T @ mask
+        self._sxy += weighted_x.T @ x
+
+    def _valid_pairs(self):
+        """Korelasyonu tanımlı olacak çiftler (alt sınıflar daraltabilir)"""
+        return self._n > 0
+
+    def matrix(self):
+        """Güncel korelasyon matrisi (N × N, yetersiz ortak veri = NaN)"""
+        n = self._n
+        sx = self._sx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = n * self._sxy - sx * sx.T
+            var = n * self._sxx - sx * sx
+            # Tek ortak bar / sabit seri: varyans yuvarlama gürültüsü düzeyinde
+            var[var <= 1e-12 * n * self._sxx] = np.nan
+            corr = cov / np.sqrt(var * var.T)
+        corr[~self._valid_pairs()] = np.nan
+        np.clip(corr, -1.0, 1.0, out=corr)
+        diagonal = np.diag(corr).copy()
+        diagonal[~np.isnan(diagonal)] = 1.0
+        np.fill_diagonal(corr, diagonal)
+        return corr
+
+    def to_frame(self):
+        """matrix() sonucunu sembol etiketli DataFrame olarak döndür"""
+        return pd.DataFrame(self.matrix(), index=self.symbols, columns=self.symbols)
+
+
+class RollingCorrelation(PairwiseMoments):
+    """Kayan pencerede artımlı Pearson korelasyonu
+
+    Yeni bar eklemek / süresi dolan barı çıkarmak toplamlara O(N²) bir
+    güncelleme yapar; tüm pencereyi yeniden taramak (O(T·N²)) gerekmez.
+    Toplamlar `rebuild_every` güncellemede bir penceredeki barlardan sıfırdan
+    yeniden hesaplanır (ekle/çıkar kaynaklı kayma sınırlanır).
+    """
+
+    def __init__(self, symbols, window=60, min_periods=2, rebuild_every=1000):
+        """
+        symbols: Sembol listesi (N, sabit sıra)
+        window: Penceredeki maksimum bar sayısı
+        min_periods: Bir çiftin korelasyonu için gereken minimum ortak bar
+        rebuild_every: Kaç bar güncellemesinde bir toplamlar sıfırdan hesaplanır
+        """
+        super().__init__(symbols)
+        self.window = window
+        self.min_periods = max(2, min_periods)
+        self.rebuild_every = rebuild_every
+        self._rows = np.full((window, len(self.symbols)), np.nan)  # Pencere ring buffer'ı
+        self._head = 0                                             # Sonraki yazılacak satır
+        self._count = 0                                            # Penceredeki bar sayısı
+        self._updates = 0
+
+    def __len__(self):
+        return self._count
+
+    def window_rows(self):
+        """Penceredeki barları eskiden yeniye döndür (count × N)"""
+        if self._count < self.window:
+            return self._rows[:self._count].copy()
+        return np.roll(self._rows, -self._head, axis=0)
+
+    def rebuild(self):
+        """Toplamları penceredeki barlardan sıfırdan hesapla (kayma düzeltmesi)"""
+        rows = self.window_rows()
+        self._shift = self._column_means(rows)
+        self._reset_sums()
+        if len(rows):
+            self._accumulate(rows, np.ones(len(rows)))
+        self._updates = 0
+
+    def push(self, rows):
+        """Yeni bar(lar) ekle, pencereden taşan en eski barları çıkar
+
+        rows: float64[N] veya float64[B, N] (NaN = o barda veri yok)
+        """
+        rows = self._check_rows(rows)
+        if len(rows) >= self.window:
+            # Tüm pencere yenileniyor - sıfırdan kur
+            self._rows[:] = rows[-self.window:]
+            self._head = 0
+            self._count = self.window
+            self.rebuild()
+            return
+        if self._count == 0:
+            # İlk barlar kaydırma referansı olur (rebuild'de pencere ortalamasına güncellenir)
+            self._shift = self._column_means(rows)
+
+        slots = (self._head + np.arange(len(rows))) % self.window
+        expired = max(0, self._count + len(rows) - self.window)
+        if expired:
+            # Pencereden çıkan en eski barlar = yazılacak slotların son `expired` tanesi
+            # (pencere dolu değilse ilk slotlar henüz boştur)
+            self._accumulate(self._rows[slots[-expired:]], -np.ones(expired))
+        self._rows[slots] = rows
+        self._accumulate(rows, np.ones(len(rows)))
+        self._head = int((self._head + len(rows)) % self.window)
+        self._count = min(self.window, self._count + len(rows))
+
+        self._updates += len(rows)
+        if self._updates >= self.rebuild_every:
+            self.rebuild()
+
+    def counts(self):
+        """Sembol başına penceredeki dolu bar sayısı (int64[N])"""
+        return np.rint(np.diag(self._n)).astype(np.int64)
+
+    def _valid_pairs(self):
+        return self._n >= self.min_periods - 0.5
+
+
+class EwmaCorrelation(PairwiseMoments):
+    """Üstel ağırlıklı (EWMA) artımlı korelasyon
+
+    Bar geçmişi saklanmaz: her yeni barda tüm toplamlar λ = 0.5^(1/half_life)
+    ile sönümlenir ve yeni bar ağırlık 1 ile eklenir. Bellek sadece N × N
+    durumdur, geçmiş uzunluğundan bağımsızdır. Sonuç
+    pandas `ewm(halflife=half_life).corr()` ile aynıdır.
+    """
+
+    def __init__(self, symbols, half_life=30.0, min_periods=2):
+        """
+        symbols: Sembol listesi (N, sabit sıra)
+        half_life: Yarı ömür (bar); bu kadar önceki barın ağırlığı yarıya iner
+        min_periods: Sembol başına korelasyondan önce görülmesi gereken minimum bar
+        """
+        super().__init__(symbols)
+        self.half_life = half_life
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.min_periods = max(2, min_periods)
+        self._seen = np.zeros(len(self.symbols), dtype=np.int64)
+        self._bars = 0
+
+    def __len__(self):
+        return self._bars
+
+    def push(self, rows):
+        """Yeni bar(lar) ekle
+
+        rows: float64[N] veya float64[B, N] (NaN = o barda veri yok)
+        """
+        rows = self._check_rows(rows)
+        if self._bars == 0:
+            self._shift = self._column_means(rows)
+        # B bar: eski durum λ^B ile sönümlenir, bar k'nın ağırlığı λ^(B-1-k)
+        weights = self.decay ** np.arange(len(rows) - 1, -1, -1, dtype=np.float64)
+        scale = self.decay ** len(rows)
+        self._n *= scale
+        self._sx *= scale
+        self._sxx *= scale
+        self._sxy *= scale
+        self._accumulate(rows, weights)
+        self._seen += (~np.isnan(rows)).sum(axis=0)
+        self._bars += len(rows)
+
+    def counts(self):
+        """Sembol başına şimdiye kadar görülen dolu bar sayısı (int64[N])"""
+        return self._seen.copy()
+
+    def _valid_pairs(self):
+        enough = self._seen >= self.min_periods
+        return (self._n > 0) & enough[:, None] & enough[None, :]
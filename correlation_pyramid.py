@@ -0,0 +1,195 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from correlation_kernels import PairwiseMoments
+
+# Sabit ufuklar (saniye)
+PYRAMID_HORIZONS = {
+    '1h': 3600,
+    '4h': 4 * 3600,
+    '24h': 24 * 3600,
+    '7d': 7 * 86400,
+    '30d': 30 * 86400,
+}
+
+# (kova boyu saniye, bu seviyenin kapsadığı yaş üst sınırı saniye)
+# Son 4 saat saatlik, 4-24 saat 4 saatlik, 1-30 gün günlük kovalar
+PYRAMID_LEVELS = (
+    (3600, 4 * 3600),
+    (4 * 3600, 24 * 3600),
+    (86400, 30 * 86400),
+)
+
+
+class CorrelationPyramid:
+    """Zaman kovası başına birleştirilebilir korelasyon toplamları
+
+    Barlar tek geçişte kovalara toplanır (kova başına n, Σx, Σx², Σxy;
+    bkz. PairwiseMoments). Herhangi bir "son N saat / gün" korelasyonu,
+    ilgili kovaların toplamlarının O(kova × N²) birleştirilmesidir - ham
+    geçmişi tekrar okumaya gerek yoktur. Kova çözünürlüğü yaşla büyür, bu
+    yüzden ufuklar kova sınırına yukarı yuvarlanır.
+    """
+
+    def __init__(self, symbols, bucket_first, bucket_last, bucket_rows, n, sx, sxx, sxy, shift, end_time):
+        """
+        symbols: Sembol listesi (N)
+        bucket_first / bucket_last: Kovadaki ilk ve son barın zamanı (epoch saniye, B)
+        bucket_rows: Kova başına bar sayısı (B)
+        n / sx / sxx / sxy: Kova başına toplamlar (B × N × N)
+        shift: Toplamlarda kullanılan sembol başına kaydırma (N)
+        end_time: Son barın zamanı (epoch saniye, yaşlar buna göre)
+        """
+        self.symbols = list(symbols)
+        self.bucket_first = bucket_first
+        self.bucket_last = bucket_last
+        self.bucket_rows = bucket_rows
+        self.n = n
+        self.sx = sx
+        self.sxx = sxx
+        self.sxy = sxy
+        self.shift = shift
+        self.end_time = end_time
+
+    @classmethod
+    def build(cls, timestamps, values, symbols, end_time=None, levels=PYRAMID_LEVELS):
+        """Barlardan piramidi tek geçişte kur
+
+        timestamps: Bar zamanları (epoch saniye, artan, T)
+        values: Getiri matrisi (T × N, NaN = veri yok)
+        end_time: Yaş referansı (None = son bar)
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if end_time is None:
+            end_time = int(timestamps[-1]) if len(timestamps) else int(time.time())
+
+        # Her bara (seviye boyu, kova başlangıcı) ata - en yeni seviye önce
+        age = end_time - timestamps
+        sizes = np.zeros(len(timestamps), dtype=np.int64)
+        for size, max_age in reversed(levels):
+            sizes[age < max_age] = size
+        keep = sizes > 0  # En eski seviyeden de yaşlı barlar atılır
+        timestamps, values, sizes = timestamps[keep], values[keep], sizes[keep]
+        starts = timestamps // sizes * sizes
+
+        # Barlar zamana göre sıralı -> aynı kovanın barları ardışık
+        boundaries = np.flatnonzero((np.diff(starts) != 0) | (np.diff(sizes) != 0)) + 1
+        first_rows = np.concatenate([[0], boundaries]) if len(timestamps) else np.empty(0, dtype=np.int64)
+        last_rows = np.concatenate([boundaries, [len(timestamps)]]) if len(timestamps) else np.empty(0, dtype=np.int64)
+
+        shift = PairwiseMoments._column_means(values) if len(values) else np.zeros(len(symbols))
+        n_symbols = len(symbols)
+        stats = np.zeros((4, len(first_rows), n_symbols, n_symbols))
+        for b, (lo, hi) in enumerate(zip(first_rows, last_rows)):
+            moments = PairwiseMoments.from_sums(symbols, stats[0, b], stats[1, b], stats[2, b], stats[3, b], shift)
+            moments.add(values[lo:hi])  # Toplamlar doğrudan stats'a yazılır
+
+        return cls(symbols, timestamps[first_rows], timestamps[last_rows - 1], (last_rows - first_rows).astype(np.int64),
+                   stats[0], stats[1], stats[2], stats[3], shift, end_time)
+
+    # ---------------- Sorgular ----------------
+    def _select(self, seconds):
+        """Son `seconds` saniyeye düşen kovalar (boolean maske)
+
+        Sınırdaki kova, barlarının orta noktası aralıktaysa dahil edilir
+        (ufuk en yakın kova sınırına yuvarlanır).
+        """
+        return (self.bucket_first + self.bucket_last) / 2 >= self.end_time - seconds
+
+    def coverage(self):
+        """Piramidin kapsadığı süre (saniye)"""
+        if len(self.bucket_first) == 0:
+            return 0
+        return int(self.end_time - self.bucket_first.min())
+
+    def count(self, horizon):
+        """Ufuktaki bar sayısı"""
+        return int(self.bucket_rows[self._select(self._seconds(horizon))].sum())
+
+    @staticmethod
+    def _seconds(horizon):
+        return PYRAMID_HORIZONS[horizon] if isinstance(horizon, str) else int(horizon)
+
+    def moments(self, horizon):
+        """Ufuktaki kovaları birleştirip PairwiseMoments olarak döndür
+
+        horizon: PYRAMID_HORIZONS anahtarı ('1h', '7d', ...) veya saniye
+        """
+        selected = self._select(self._seconds(horizon))
+        return PairwiseMoments.from_sums(self.symbols, self.n[selected].sum(axis=0), self.sx[selected].sum(axis=0),
+                                         self.sxx[selected].sum(axis=0), self.sxy[selected].sum(axis=0), self.shift)
+
+    def matrix(self, horizon):
+        """Ufuk için korelasyon matrisi (DataFrame)"""
+        return self.moments(horizon).to_frame()
+
+    def horizons(self):
+        """Tüm sabit ufukların korelasyon matrisleri {'1h': DataFrame, ...}"""
+        return {name: self.matrix(name) for name in PYRAMID_HORIZONS}
+
+    # ---------------- Disk ----------------
+    def save(self, path):
+        """Piramidi atomik olarak sıkıştırılmış .npz dosyasına yaz (toplamlar float32)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, symbols=np.array(self.symbols), bucket_first=self.bucket_first,
+                                    bucket_last=self.bucket_last, bucket_rows=self.bucket_rows,
+                                    n=self.n.astype(np.float32), sx=self.sx.astype(np.float32),
+                                    sxx=self.sxx.astype(np.float32), sxy=self.sxy.astype(np.float32),
+                                    shift=self.shift, end_time=np.int64(self.end_time))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['symbols'].tolist(), data['bucket_first'], data['bucket_last'], data['bucket_rows'],
+                       data['n'].astype(np.float64), data['sx'].astype(np.float64),
+                       data['sxx'].astype(np.float64), data['sxy'].astype(np.float64),
+                       data['shift'], int(data['end_time']))
+
+
+def pyramid_from_price_history(history_data, max_symbols=300, end_time=None):
+    """realtime_price_history.json formatından (5 dakikalık noktalar) getiri piramidi kur
+
+    max_symbols: En çok veri noktası olan (eşitlikte en yüksek hacimli) bu kadar coin
+    Dönen değer: CorrelationPyramid (yeterli veri yoksa None)
+    """
+    history = history_data.get('history', []) if history_data else []
+    if len(history) < 2:
+        return None
+
+    observed = {}
+    volumes = {}
+    for point in history:
+        for symbol, data in point.get('prices', {}).items():
+            observed[symbol] = observed.get(symbol, 0) + 1
+            volumes[symbol] = data.get('volume_24h') or 0
+    symbols = sorted(observed, key=lambda s: (-observed[s], -volumes[s]))[:max_symbols]
+    if len(symbols) < 2:
+        return None
+
+    positions = {symbol: i for i, symbol in enumerate(symbols)}
+    prices = np.full((len(history), len(symbols)), np.nan)
+    timestamps = np.empty(len(history), dtype=np.int64)
+    for t, point in enumerate(history):
+        timestamps[t] = int(pd.Timestamp(point['timestamp']).timestamp())
+        for symbol, data in point.get('prices', {}).items():
+            i = positions.get(symbol)
+            if i is not None and data.get('price'):
+                prices[t, i] = data['price']
+
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, prices = timestamps[order], prices[order]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = prices[1:] / prices[:-1] - 1.0
+    return CorrelationPyramid.build(timestamps[1:], returns, symbols, end_time=end_time)
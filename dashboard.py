@@ -10,6 +10,11 @@ import time
 from datetime import datetime
 import subprocess
 import threading
+from correlation_kernels import correlation_frame, high_correlation_pairs, high_correlation_records
+from correlation_pyramid import CorrelationPyramid
+from matrix_store import save_matrix_pair, load_matrix_pair
+from correlation_clusters import CorrelationClusters, MAX_CLUSTER_SYMBOLS
+from change_log import ChangeLog
 
 # Sayfa yapılandırması
 st.set_page_config(
@@ -229,6 +234,85 @@ def load_csv_file(filename):
             return None
     return None
 
+def load_correlation_matrix_file(filename):
+    """CSV'nin binary .corr kardeşini memmap ile aç (yoksa, CSV ile eşleşmiyorsa veya bozuksa None)
+    
+    filename: CSV dosya adı (ör. 'historical_correlation_matrix.csv')
+    """
+    return load_matrix_pair(filename)
+
+def load_correlation_matrix(filename):
+    """Korelasyon matrisini yükle - binary kopya varsa metin ayrıştırmadan, yoksa CSV'den"""
+    matrix_file = load_correlation_matrix_file(filename)
+    if matrix_file is not None:
+        return matrix_file.to_frame()
+    return load_csv_file(filename)
+
+def load_correlation_clusters(filename, corr_matrix=None):
+    """Matrisle birlikte kaydedilmiş küme bilgisini oku
+    
+    Binary dosyada yoksa (eski CSV) ve matris verilmişse burada hesaplanır.
+    """
+    matrix_file = load_correlation_matrix_file(filename)
+    if matrix_file is not None and matrix_file.clusters is not None:
+        return matrix_file.clusters
+    if corr_matrix is not None and 2 <= len(corr_matrix) <= MAX_CLUSTER_SYMBOLS:
+        return CorrelationClusters.from_matrix(corr_matrix)
+    return None
+
+def save_correlation_matrix(correlation_matrix, filename='realtime_correlation_matrix.csv'):
+    """Korelasyon matrisini CSV ve binary .corr (küme bilgisiyle) olarak kaydet"""
+    clusters = (CorrelationClusters.from_matrix(correlation_matrix)
+                if len(correlation_matrix) <= MAX_CLUSTER_SYMBOLS else None)
+    save_matrix_pair(filename, correlation_matrix, clusters=clusters)
+
+def load_correlation_pyramid(filename='correlation_pyramid.npz'):
+    """GitHub Actions'ın ürettiği korelasyon piramidini yükle (yoksa None)"""
+    if os.path.exists(filename):
+        try:
+            return CorrelationPyramid.load(filename)
+        except Exception:
+            return None
+    return None
+
+def pyramid_time_filter(time_period, time_unit, history_count=None, min_required=5, rerun=False):
+    """Zaman bazlı filtreyi önceden hesaplanmış piramitten yanıtla
+    
+    Ham geçmiş okunmaz; seçilen aralığın kovaları birleştirilir (O(N²)).
+    Piramit yoksa veya aralıkta yeterli veri yoksa False döner (ham geçmişten hesaplanır).
+    """
+    pyramid = load_correlation_pyramid()
+    if pyramid is None:
+        return False
+    seconds = time_period * (86400 if time_unit == "Gün" else 3600)
+    n_data_points = pyramid.count(seconds)
+    if n_data_points < min_required:
+        return False
+    
+    correlation_matrix = pyramid.matrix(seconds)
+    high_corr = high_correlation_records(correlation_matrix, threshold=0.7)
+    result_data = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'filter_type': f'Son {time_period} {time_unit.lower()}',
+        'data_points_used': n_data_points,
+        'high_correlations': high_corr,
+        'total_pairs': len(high_corr),
+        'source': 'correlation_pyramid'
+    }
+    if history_count is not None:
+        result_data['total_data_points'] = history_count
+    
+    with open('realtime_correlations.json', 'w', encoding='utf-8') as f:
+        json.dump(result_data, f, indent=2, ensure_ascii=False)
+    save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv')
+    
+    st.success(f"✅ Korelasyon hesaplandı! {len(high_corr)} yüksek korelasyon çifti bulundu.")
+    st.info(f"⚡ Önceden hesaplanmış piramitten okundu: {len(pyramid.symbols)} en likit coin, "
+            f"son {time_period} {time_unit.lower()} içinde {n_data_points} veri noktası.")
+    if rerun:
+        st.rerun()
+    return True
+
 # ==================== ANA SAYFA ====================
 if page == "Ana Sayfa":
     st.header("📈 Genel Bakış")
@@ -248,8 +332,8 @@ if page == "Ana Sayfa":
     
     # Metrikler - Coin ve analiz bilgileri
     correlations = load_json_file('historical_correlations.json') or load_json_file('realtime_correlations.json')
-    corr_matrix_hist = load_csv_file('historical_correlation_matrix.csv')
-    corr_matrix_realtime = load_csv_file('realtime_correlation_matrix.csv')
+    corr_matrix_hist = load_correlation_matrix('historical_correlation_matrix.csv')
+    corr_matrix_realtime = load_correlation_matrix('realtime_correlation_matrix.csv')
     
     # Price history'den coin sayısını al (en güncel)
     price_history = load_json_file('realtime_price_history.json')
@@ -443,13 +527,19 @@ if page == "Ana Sayfa":
             corr_matrix_file = "realtime_correlation_matrix.csv"
             st.caption("💡 Anlık Veriler: WebSocket üzerinden gerçek zamanlı olarak toplanan verilerle hesaplanan korelasyonlar (her 5 dakikada bir güncellenir)")
         
-        corr_matrix = load_csv_file(corr_matrix_file)
-        
-        if corr_matrix is not None:
-            # İlk 15 coin'i göster (önizleme için)
-            preview_coins = corr_matrix.columns[:15].tolist()
-            preview_matrix = corr_matrix.loc[preview_coins, preview_coins]
-            
+        # Önizleme için tam matris gerekmez - binary dosyadan sadece 15 × 15 okunur
+        matrix_file = load_correlation_matrix_file(corr_matrix_file)
+        if matrix_file is not None:
+            preview_matrix = matrix_file.submatrix(matrix_file.symbols[:15])
+        else:
+            corr_matrix = load_csv_file(corr_matrix_file)
+            preview_matrix = None
+            if corr_matrix is not None:
+                # İlk 15 coin'i göster (önizleme için)
+                preview_coins = corr_matrix.columns[:15].tolist()
+                preview_matrix = corr_matrix.loc[preview_coins, preview_coins]
+        
+        if preview_matrix is not None:
             fig = px.imshow(
                 preview_matrix,
                 labels=dict(x="Coin", y="Coin", color="Korelasyon"),
@@ -894,8 +984,8 @@ elif page == "Korelasyon Analizi":
             estimated_points = time_period * 12  # Saat × veri/saat
             st.caption(f"💡 Tahmini veri noktası: ~{estimated_points:,} (Son {time_period} saat)")
         
-        # Korelasyon hesaplama
-        if calculate_btn:
+        # Korelasyon hesaplama (piramit varsa ham geçmiş okunmaz)
+        if calculate_btn and not pyramid_time_filter(time_period, time_unit, min_required=min_required, rerun=True):
             # Seçilen zaman aralığını kullan
             from datetime import datetime, timedelta
             try:
@@ -950,25 +1040,10 @@ elif page == "Korelasyon Analizi":
                                     st.error("⚠️ Korelasyon hesaplanamadı!")
                                 else:
                                     # Korelasyon matrisi
-                                    correlation_matrix = df_returns.corr()
+                                    correlation_matrix = correlation_frame(df_returns)
                                     
                                     # Yüksek korelasyonları bul
-                                    high_corr = []
-                                    symbols = correlation_matrix.columns.tolist()
-                                    
-                                    for i, symbol1 in enumerate(symbols):
-                                        for j, symbol2 in enumerate(symbols):
-                                            if i < j:
-                                                corr = correlation_matrix.loc[symbol1, symbol2]
-                                                if not np.isnan(corr) and abs(corr) >= 0.7:
-                                                    high_corr.append({
-                                                        'coin1': symbol1,
-                                                        'coin2': symbol2,
-                                                        'correlation': float(corr),
-                                                        'abs_correlation': float(abs(corr))
-                                                    })
-                                    
-                                    high_corr.sort(key=lambda x: x['abs_correlation'], reverse=True)
+                                    high_corr = high_correlation_records(correlation_matrix, threshold=0.7)
                                     
                                     # Sonuçları kaydet
                                     result_data = {
@@ -983,7 +1058,7 @@ elif page == "Korelasyon Analizi":
                                         json.dump(result_data, f, indent=2, ensure_ascii=False)
                                     
                                     # Korelasyon matrisini CSV olarak kaydet
-                                    correlation_matrix.to_csv('realtime_correlation_matrix.csv')
+                                    save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv')
                                     
                                     st.success(f"✅ Korelasyon hesaplandı! {len(high_corr)} yüksek korelasyon çifti bulundu.")
                                     st.info(f"💡 Son {time_period} {time_unit.lower()} içinde {n_data_points} veri noktası kullanıldı.")
@@ -1045,8 +1120,8 @@ elif page == "Korelasyon Analizi":
                     estimated_points = time_period * 12  # Saat × veri/saat
                     st.caption(f"💡 Tahmini veri noktası: ~{estimated_points:,} (Son {time_period} saat)")
                 
-                # Zaman bazlı filtreleme
-                if calculate_btn:
+                # Zaman bazlı filtreleme (piramit varsa ham geçmiş okunmaz)
+                if calculate_btn and not pyramid_time_filter(time_period, time_unit, history_count, min_required):
                     from datetime import datetime, timedelta
                     try:
                         # Şu anki zaman
@@ -1106,25 +1181,10 @@ elif page == "Korelasyon Analizi":
                                             st.error("⚠️ Korelasyon hesaplanamadı!")
                                         else:
                                             # Korelasyon matrisi
-                                            correlation_matrix = df_returns.corr()
+                                            correlation_matrix = correlation_frame(df_returns)
                                             
                                             # Yüksek korelasyonları bul
-                                            high_corr = []
-                                            symbols = correlation_matrix.columns.tolist()
-                                            
-                                            for i, symbol1 in enumerate(symbols):
-                                                for j, symbol2 in enumerate(symbols):
-                                                    if i < j:
-                                                        corr = correlation_matrix.loc[symbol1, symbol2]
-                                                        if not np.isnan(corr) and abs(corr) >= 0.7:
-                                                            high_corr.append({
-                                                                'coin1': symbol1,
-                                                                'coin2': symbol2,
-                                                                'correlation': float(corr),
-                                                                'abs_correlation': float(abs(corr))
-                                                            })
-                                            
-                                            high_corr.sort(key=lambda x: x['abs_correlation'], reverse=True)
+                                            high_corr = high_correlation_records(correlation_matrix, threshold=0.7)
                                             
                                             # Sonuçları kaydet
                                             result_data = {
@@ -1139,7 +1199,7 @@ elif page == "Korelasyon Analizi":
                                             with open('realtime_correlations.json', 'w', encoding='utf-8') as f:
                                                 json.dump(result_data, f, indent=2, ensure_ascii=False)
                                             
-                                            correlation_matrix.to_csv('realtime_correlation_matrix.csv')
+                                            save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv')
                                             
                                             st.success(f"✅ Korelasyon hesaplandı! {len(high_corr)} yüksek korelasyon çifti bulundu.")
                                             st.info(f"📊 Son {time_period} {time_unit.lower()} içindeki {n_data_points} veri noktası kullanıldı.")
@@ -1217,25 +1277,10 @@ elif page == "Korelasyon Analizi":
                                     st.error("⚠️ Korelasyon hesaplanamadı!")
                                 else:
                                     # Korelasyon matrisi
-                                    correlation_matrix = df_returns.corr()
+                                    correlation_matrix = correlation_frame(df_returns)
                                     
                                     # Yüksek korelasyonları bul
-                                    high_corr = []
-                                    symbols = correlation_matrix.columns.tolist()
-                                    
-                                    for i, symbol1 in enumerate(symbols):
-                                        for j, symbol2 in enumerate(symbols):
-                                            if i < j:
-                                                corr = correlation_matrix.loc[symbol1, symbol2]
-                                                if not np.isnan(corr) and abs(corr) >= 0.7:
-                                                    high_corr.append({
-                                                        'coin1': symbol1,
-                                                        'coin2': symbol2,
-                                                        'correlation': float(corr),
-                                                        'abs_correlation': float(abs(corr))
-                                                    })
-                                    
-                                    high_corr.sort(key=lambda x: x['abs_correlation'], reverse=True)
+                                    high_corr = high_correlation_records(correlation_matrix, threshold=0.7)
                                     
                                     # Sonuçları kaydet
                                     result_data = {
@@ -1249,7 +1294,7 @@ elif page == "Korelasyon Analizi":
                                     with open('realtime_correlations.json', 'w', encoding='utf-8') as f:
                                         json.dump(result_data, f, indent=2, ensure_ascii=False)
                                     
-                                    correlation_matrix.to_csv('realtime_correlation_matrix.csv')
+                                    save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv')
                                     
                                     st.success(f"✅ Korelasyon hesaplandı! {len(high_corr)} yüksek korelasyon çifti bulundu.")
                                     st.info("💡 Sayfayı yenileyerek sonuçları görebilirsiniz.")
@@ -1281,34 +1326,75 @@ elif page == "Korelasyon Analizi":
         coin_correlations_file = "realtime_coin_correlations.json"
     
     # Korelasyon matrisi
-    corr_matrix = load_csv_file(corr_matrix_file)
+    corr_matrix = load_correlation_matrix(corr_matrix_file)
     
     if corr_matrix is not None:
         st.subheader("📊 Korelasyon Matrisi")
         
-        # Coin seçimi
-        coins = corr_matrix.columns.tolist()
-        selected_coins = st.multiselect(
-            "Coin Seçin (boş bırakırsanız tüm coinler gösterilir)",
-            coins,
-            default=coins[:20] if len(coins) > 20 else coins
+        # Küme bilgisi matrisle birlikte kaydedilir (seriation sırası + etiketler)
+        clusters = load_correlation_clusters(corr_matrix_file, corr_matrix)
+        heatmap_view = st.radio(
+            "Heatmap Görünümü",
+            ["Seçilen Coinler", "Kümelere Göre Sıralı", "Küme Özeti"] if clusters is not None else ["Seçilen Coinler"],
+            horizontal=True,
+            key="correlation_heatmap_view",
+            help="Kümelere Göre Sıralı: benzer coinler yan yana | Küme Özeti: her hücre iki küme arasındaki ortalama korelasyon"
         )
         
-        if selected_coins:
-            filtered_matrix = corr_matrix.loc[selected_coins, selected_coins]
-            
-            # Heatmap
-            fig = px.imshow(
-                filtered_matrix,
-                labels=dict(x="Coin", y="Coin", color="Korelasyon"),
-                x=filtered_matrix.columns,
-                y=filtered_matrix.columns,
-                color_continuous_scale="RdBu",
-                aspect="auto",
-                title="Korelasyon Matrisi Heatmap"
+        if heatmap_view == "Küme Özeti":
+            collapsed, cluster_sizes = clusters.collapse(corr_matrix, min_size=2)
+            st.caption(f"💡 {clusters.n_clusters} küme, {len(cluster_sizes)} tanesi 2+ coinli "
+                       f"(küme içi ortalama |r| ≥ {1 - clusters.max_distance:.2f}). Tekil coinler gösterilmez.")
+            if len(collapsed) > 0:
+                fig = px.imshow(
+                    collapsed,
+                    labels=dict(x="Küme", y="Küme", color="Ort. Korelasyon"),
+                    x=collapsed.columns,
+                    y=collapsed.columns,
+                    color_continuous_scale="RdBu",
+                    zmin=-1,
+                    zmax=1,
+                    aspect="auto",
+                    title="Küme × Küme Ortalama Korelasyon"
+                )
+                fig.update_layout(height=800)
+                st.plotly_chart(fig, use_container_width=True)
+                
+                with st.expander("📋 Küme Üyeleri"):
+                    members = clusters.members(min_size=2)
+                    st.dataframe(pd.DataFrame([
+                        {'Küme': f"K{label}", 'Coin Sayısı': len(coins), 'Coinler': ', '.join(coins)}
+                        for label, coins in members.items()
+                    ]), use_container_width=True)
+            else:
+                st.info("Birden fazla coin içeren küme yok.")
+        else:
+            # Coin seçimi
+            coins = clusters.ordered_symbols() if heatmap_view == "Kümelere Göre Sıralı" else corr_matrix.columns.tolist()
+            coins = [coin for coin in coins if coin in corr_matrix.columns]
+            selected_coins = st.multiselect(
+                "Coin Seçin (boş bırakırsanız tüm coinler gösterilir)",
+                coins,
+                default=coins[:20] if len(coins) > 20 else coins
             )
-            fig.update_layout(height=800)
-            st.plotly_chart(fig, use_container_width=True)
+            
+            if selected_coins:
+                filtered_matrix = corr_matrix.loc[selected_coins, selected_coins]
+                if heatmap_view == "Kümelere Göre Sıralı":
+                    filtered_matrix = clusters.reorder(filtered_matrix)
+                
+                # Heatmap
+                fig = px.imshow(
+                    filtered_matrix,
+                    labels=dict(x="Coin", y="Coin", color="Korelasyon"),
+                    x=filtered_matrix.columns,
+                    y=filtered_matrix.columns,
+                    color_continuous_scale="RdBu",
+                    aspect="auto",
+                    title="Korelasyon Matrisi Heatmap"
+                )
+                fig.update_layout(height=800)
+                st.plotly_chart(fig, use_container_width=True)
         
         # Yüksek korelasyonlu çiftler
         st.subheader("🔗 Yüksek Korelasyonlu Çiftler")
@@ -1547,21 +1633,13 @@ elif page == "Korelasyon Analizi":
                 # Korelasyon tablosu - Pozitif/Negatif ayrımı ile
                 st.markdown("### 📋 Detaylı Korelasyon Tablosu")
                 
-                # Üst üçgen matrisi (duplicate'leri önlemek için)
-                correlation_pairs = []
-                for i, coin1 in enumerate(selected_coins_for_analysis):
-                    for j, coin2 in enumerate(selected_coins_for_analysis):
-                        if i < j:  # Üst üçgen
-                            corr_value = selected_matrix.loc[coin1, coin2]
-                            correlation_pairs.append({
-                                'Coin 1': coin1,
-                                'Coin 2': coin2,
-                                'Korelasyon': corr_value,
-                                'Mutlak Korelasyon': abs(corr_value)
-                            })
-                
-                df_pairs = pd.DataFrame(correlation_pairs)
-                df_pairs = df_pairs.sort_values('Mutlak Korelasyon', ascending=False)
+                # Üst üçgen çiftleri (duplicate'ler yok, |r|'ye göre sıralı)
+                df_pairs = high_correlation_pairs(selected_matrix, threshold=None).rename(columns={
+                    'coin1': 'Coin 1',
+                    'coin2': 'Coin 2',
+                    'correlation': 'Korelasyon',
+                    'abs_correlation': 'Mutlak Korelasyon'
+                })
                 
                 # Pozitif ve Negatif ayrımı
                 df_pairs_positive = df_pairs[df_pairs['Korelasyon'] > 0].copy()
@@ -1729,7 +1807,7 @@ elif page == "Tüm Korelasyonlar":
         corr_matrix_file = "realtime_correlation_matrix.csv"
     
     correlations = load_json_file(correlations_file)
-    corr_matrix = load_csv_file(corr_matrix_file)
+    corr_matrix = load_correlation_matrix(corr_matrix_file)
     
     if correlations:
         # Format kontrolü: {"timestamp": "...", "high_correlations": [...]}
@@ -2462,19 +2540,12 @@ elif page == "Korelasyon Değişiklikleri":
     - Son **30 günlük** değişiklikler saklanır ve gösterilir (daha eski kayıtlar otomatik temizlenir)
     """)
     
-    # Değişiklik geçmişini yükle (dosya yoksa oluştur)
-    changes_data = load_json_file('correlation_changes_history.json')
+    # Değişiklik günlüğünü yükle (saklama süresi içindeki kayıtlar, en yeniler önce)
+    changes_data = {'changes_history': ChangeLog('correlation_changes').read()}
     
-    # Dosya yoksa veya boşsa, boş bir yapı oluştur
-    if not changes_data:
-        changes_data = {'changes_history': [], 'last_correlations': {}}
-        # Dosyayı oluştur
-        try:
-            import json
-            with open('correlation_changes_history.json', 'w', encoding='utf-8') as f:
-                json.dump(changes_data, f, indent=2, ensure_ascii=False)
-        except:
-            pass
+    # Günlük boşsa eski tek-dosya geçmişe bak
+    if not changes_data['changes_history']:
+        changes_data = load_json_file('correlation_changes_history.json') or changes_data
     
     if changes_data and 'changes_history' in changes_data:
         changes = changes_data['changes_history']
@@ -2637,7 +2708,7 @@ elif page == "🔍 Coin Arama":
         sudden_analysis_file = "sudden_price_volume_analysis.json"
     
     # Korelasyon matrisi ve diğer verileri yükle
-    corr_matrix = load_csv_file(corr_matrix_file)
+    corr_matrix = load_correlation_matrix(corr_matrix_file)
     correlations_data = load_json_file(correlations_file)
     pv_analysis_data = load_json_file(pv_analysis_file)
     sudden_analysis_data = load_json_file(sudden_analysis_file)
@@ -2647,7 +2718,7 @@ elif page == "🔍 Coin Arama":
     if corr_matrix is None or corr_matrix.empty:
         # Diğer dosyayı dene
         alt_file = "realtime_correlation_matrix.csv" if data_source == "Geçmiş Veriler" else "historical_correlation_matrix.csv"
-        corr_matrix = load_csv_file(alt_file)
+        corr_matrix = load_correlation_matrix(alt_file)
         if corr_matrix is not None and not corr_matrix.empty:
             st.info(f"💡 {corr_matrix_file} bulunamadı, {alt_file} kullanılıyor.")
     
@@ -9,6 +9,11 @@ import numpy as np
 import json
 from datetime import datetime, timedelta
 import time
+import os
+import tempfile
+from correlation_kernels import blocked_correlation, approximate_correlation_pairs, high_correlation_records
+from matrix_store import save_matrix_pair
+from correlation_clusters import CorrelationClusters, MAX_CLUSTER_SYMBOLS
 
 def fetch_all_coins_from_gecko(max_pages=20):
     """CoinGecko'dan TÜM coinleri çek (pagination ile)"""
@@ -172,66 +177,93 @@ def fetch_historical_single(coin_id, days=7):
     except Exception as e:
         return None
 
-def calculate_correlation_matrix(price_data_dict, use_returns=True):
-    """Korelasyon matrisi hesapla"""
-    if len(price_data_dict) < 2:
-        return None
-    
-    # Tüm coinlerin ortak zaman noktalarını bul
-    all_timestamps = set()
-    for symbol, data in price_data_dict.items():
-        all_timestamps.update(data['timestamps'])
-    
-    all_timestamps = sorted(list(all_timestamps))
+def prepare_returns(price_data_dict, use_returns=True):
+    """Coinleri ortak zaman eksenine hizala
     
-    # Her coin için fiyat serisi oluştur
-    price_series = {}
+    Dönen format: (semboller, T × N float64 matris) - boşluklar ileri/geri doldurulur
+    """
+    series = {}
     for symbol, data in price_data_dict.items():
-        ts_to_price = dict(zip(data['timestamps'], data['prices']))
-        series = []
-        for ts in all_timestamps:
-            if ts in ts_to_price:
-                series.append(ts_to_price[ts])
-            else:
-                series.append(np.nan)
-        price_series[symbol] = series
+        s = pd.Series(data['prices'], index=pd.DatetimeIndex(data['timestamps']), dtype=np.float64)
+        series[symbol] = s[~s.index.duplicated(keep='last')]
     
-    # DataFrame oluştur
-    df = pd.DataFrame(price_series, index=all_timestamps)
+    # Tüm coinlerin ortak zaman noktaları (birleşim, sıralı)
+    df = pd.concat(series, axis=1).sort_index()
     
     # NaN değerleri doldur
-    df = df.fillna(method='ffill').fillna(method='bfill')
+    df = df.ffill().bfill()
     
     # Returns hesapla
     if use_returns:
         df = df.pct_change().dropna()
     
-    # Korelasyon matrisi
-    correlation_matrix = df.corr()
+    values = df.to_numpy(dtype=np.float64)
+    values[~np.isfinite(values)] = np.nan  # Sıfır fiyattan gelen inf
+    return list(df.columns), values
+
+def calculate_correlation_matrix(price_data_dict, use_returns=True):
+    """Korelasyon matrisi hesapla (bloklu BLAS, DataFrame olarak)"""
+    if len(price_data_dict) < 2:
+        return None
     
-    return correlation_matrix
+    symbols, values = prepare_returns(price_data_dict, use_returns)
+    matrix = np.empty((len(symbols), len(symbols)))
+    blocked_correlation(values, threshold=None, out=matrix)
+    return pd.DataFrame(matrix, index=symbols, columns=symbols)
 
-def find_high_correlations(correlation_matrix, threshold=0.7):
-    """Yüksek korelasyonları bul"""
-    high_corr = []
-    symbols = correlation_matrix.columns.tolist()
+def calculate_correlations_blocked(price_data_dict, threshold=0.7, use_returns=True,
+                                   matrix_file='realtime_correlation_matrix.csv', block_size=1024,
+                                   matrix_floor=None, approximate=False, recall=0.95):
+    """Binlerce coin için bellek dışı korelasyon
     
-    for i, symbol1 in enumerate(symbols):
-        for j, symbol2 in enumerate(symbols):
-            if i < j:  # Sadece üst üçgen
-                corr = correlation_matrix.loc[symbol1, symbol2]
-                if not np.isnan(corr) and abs(corr) >= threshold:
-                    high_corr.append({
-                        'coin1': symbol1,
-                        'coin2': symbol2,
-                        'correlation': float(corr),
-                        'abs_correlation': float(abs(corr))
-                    })
+    Matris blok blok hesaplanıp geçici bir memmap dosyasına yazılır, yüksek
+    korelasyonlu çiftler hesaplanırken toplanır; yoğun N × N matris RAM'de
+    tutulmaz. Matris CSV'ye ve binary .corr dosyasına memmap'ten yazılır.
+    
+    matrix_floor: Binary matrisi sadece |r| ≥ bu değer olan girdilerle seyrek yaz (None = yoğun float32)
+    approximate: True = matris hiç hesaplanmaz; çiftler SimHash LSH adaylarından kesin doğrulamayla
+                 bulunur (eşiğe yakın çiftlerin ~%(1 - recall)'ı kaçabilir, matris dosyası yazılmaz)
     
-    # Korelasyon değerine göre sırala
-    high_corr.sort(key=lambda x: x['abs_correlation'], reverse=True)
+    Dönen değer: (yüksek korelasyon listesi, coin sayısı) - yeterli coin yoksa (None, 0)
+    """
+    if len(price_data_dict) < 2:
+        return None, 0
+    
+    symbols, values = prepare_returns(price_data_dict, use_returns)
+    if approximate:
+        rows, cols, correlations = approximate_correlation_pairs(values, threshold=threshold, recall=recall)
+    else:
+        rows, cols, correlations = _blocked_pairs(symbols, values, threshold, matrix_file, block_size, matrix_floor)
     
-    return high_corr
+    high_corr = [
+        {
+            'coin1': symbols[i],
+            'coin2': symbols[j],
+            'correlation': r,
+            'abs_correlation': abs(r)
+        }
+        for i, j, r in zip(rows.tolist(), cols.tolist(), correlations.tolist())
+    ]
+    return high_corr, len(symbols)
+
+def _blocked_pairs(symbols, values, threshold, matrix_file, block_size, matrix_floor):
+    """Kesin bloklu korelasyon; matris geçici memmap üzerinden dosyaya yazılır"""
+    with tempfile.TemporaryDirectory() as workdir:
+        matrix = np.lib.format.open_memmap(os.path.join(workdir, 'correlation_matrix.npy'), mode='w+',
+                                           dtype=np.float64, shape=(len(symbols), len(symbols)))
+        rows, cols, correlations = blocked_correlation(values, threshold=threshold, block_size=block_size, out=matrix)
+        if matrix_file:
+            # Dashboard heatmap'leri için seriation sırası + küme etiketleri matrisle birlikte yazılır
+            clusters = (CorrelationClusters.from_matrix(matrix, symbols=symbols)
+                        if len(symbols) <= MAX_CLUSTER_SYMBOLS else None)
+            save_correlation_matrix(pd.DataFrame(matrix, index=symbols, columns=symbols, copy=False), matrix_file,
+                                    floor=matrix_floor, clusters=clusters)
+        del matrix
+    return rows, cols, correlations
+
+def find_high_correlations(correlation_matrix, threshold=0.7):
+    """Yüksek korelasyonları bul"""
+    return high_correlation_records(correlation_matrix, threshold=threshold)
 
 def save_correlations(high_corr, filename='realtime_correlations.json'):
     """Korelasyonları JSON'a kaydet"""
@@ -243,9 +275,9 @@ def save_correlations(high_corr, filename='realtime_correlations.json'):
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-def save_correlation_matrix(correlation_matrix, filename='realtime_correlation_matrix.csv'):
-    """Korelasyon matrisini CSV'ye kaydet"""
-    correlation_matrix.to_csv(filename)
+def save_correlation_matrix(correlation_matrix, filename='realtime_correlation_matrix.csv', floor=None, clusters=None):
+    """Korelasyon matrisini CSV'ye ve dashboard'un memmap ile okuduğu .corr dosyasına kaydet"""
+    save_matrix_pair(filename, correlation_matrix, floor=floor, clusters=clusters)
 
 def analyze_sudden_changes(current_prices, coin_mapping):
     """Ani fiyat değişimlerini analiz et"""
@@ -333,17 +365,15 @@ def main():
         # Korelasyon analizi
         print('Korelasyon matrisi hesaplanıyor...')
         try:
-            correlation_matrix = calculate_correlation_matrix(historical_data, use_returns=True)
+            # Matris diske akar, yüksek korelasyonlar hesaplanırken toplanır
+            high_corr, n_coins = calculate_correlations_blocked(historical_data, threshold=0.7, use_returns=True,
+                                                                matrix_file='realtime_correlation_matrix.csv')
             
-            if correlation_matrix is not None and not correlation_matrix.empty:
-                # Yüksek korelasyonları bul
-                high_corr = find_high_correlations(correlation_matrix, threshold=0.7)
-                
+            if high_corr is not None and n_coins > 0:
                 # Kaydet
                 save_correlations(high_corr, 'realtime_correlations.json')
-                save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv')
                 
-                print(f'✓ Korelasyon analizi kaydedildi! ({len(high_corr)} yüksek korelasyon çifti)')
+                print(f'✓ Korelasyon analizi kaydedildi! ({n_coins} coin, {len(high_corr)} yüksek korelasyon çifti)')
             else:
                 print('⚠️  Korelasyon analizi sonucu boş!')
         except Exception as e:
@@ -5,6 +5,7 @@ Sadece anlık fiyat verilerini çeker - Geçmiş veri çekmez
 """
 import requests
 import json
+import os
 from datetime import datetime
 import time
 
@@ -211,11 +212,44 @@ def save_price_history(current_prices, coin_mapping, max_history=2016):
         traceback.print_exc()
         return 0
 
+def update_correlation_pyramid(history_file='realtime_price_history.json',
+                               pyramid_file='correlation_pyramid.npz', max_symbols=200,
+                               changes_directory='correlation_pyramid_changes'):
+    """Fiyat geçmişinden korelasyon piramidini tek geçişte kur, kaydet ve 1 saatlik değişiklikleri takip et
+    
+    changes_directory: Piramit takipçisinin günlük / durum klasörü - main.py'deki anlık
+                       Binance takipçisinin 'correlation_changes' klasöründen ayrı tutulur
+                       (iki farklı coin evreni aynı önceki durumun üzerine yazmasın)
+    """
+    try:
+        from correlation_pyramid import pyramid_from_price_history
+        from correlation_change_tracker import CorrelationChangeTracker
+        
+        with open(history_file, 'r', encoding='utf-8') as f:
+            history_data = json.load(f)
+        
+        pyramid = pyramid_from_price_history(history_data, max_symbols=max_symbols)
+        if pyramid is None:
+            print('⚠️  Piramit için yeterli geçmiş yok')
+            return None
+        pyramid.save(pyramid_file)
+        print(f'✓ Korelasyon piramidi kaydedildi ({len(pyramid.symbols)} coin, '
+              f'{len(pyramid.bucket_rows)} kova, {pyramid.coverage() / 3600:.1f} saat)')
+        
+        CorrelationChangeTracker(history_file=os.path.join(changes_directory, 'correlation_changes_history.json'),
+                                 threshold_change=0.1, min_correlation=0.7,
+                                 log_directory=changes_directory).analyze_pyramid(pyramid, '1h')
+        return pyramid
+    except Exception as e:
+        print(f'⚠️  Korelasyon piramidi hatası: {e}')
+        return None
+
 def calculate_correlation_from_history(history_data, min_data_points=5):
     """Geçmiş verilerden korelasyon hesapla"""
     try:
         import pandas as pd
         import numpy as np
+        from correlation_kernels import correlation_frame, high_correlation_records
         
         if not history_data or 'history' not in history_data:
             return None, None
@@ -252,26 +286,10 @@ def calculate_correlation_from_history(history_data, min_data_points=5):
             return None, None
         
         # Korelasyon matrisi
-        correlation_matrix = df_returns.corr()
+        correlation_matrix = correlation_frame(df_returns)
         
         # Yüksek korelasyonları bul
-        high_corr = []
-        symbols = correlation_matrix.columns.tolist()
-        
-        for i, symbol1 in enumerate(symbols):
-            for j, symbol2 in enumerate(symbols):
-                if i < j:
-                    corr = correlation_matrix.loc[symbol1, symbol2]
-                    if not np.isnan(corr) and abs(corr) >= 0.7:
-                        high_corr.append({
-                            'coin1': symbol1,
-                            'coin2': symbol2,
-                            'correlation': float(corr),
-                            'abs_correlation': float(abs(corr))
-                        })
-        
-        # Korelasyon değerine göre sırala
-        high_corr.sort(key=lambda x: x['abs_correlation'], reverse=True)
+        high_corr = high_correlation_records(correlation_matrix, threshold=0.7)
         
         return correlation_matrix, high_corr
     except Exception as e:
@@ -313,6 +331,9 @@ def main():
     history_count = save_price_history(current_prices, coin_mapping, max_history=2016)
     print(f'✓ Geçmiş veri noktası sayısı: {history_count}\n')
     
+    # Korelasyon piramidi (1h / 4h / 24h / 7d / 30d) - dashboard ve değişiklik takibi doğrudan okur
+    update_correlation_pyramid()
+    
     # 4. Ani değişim analizi
     print('[4/4] Ani değişim analizi yapılıyor...')
     sudden_analyses = analyze_sudden_changes(current_prices, coin_mapping)
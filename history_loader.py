@@ -0,0 +1,165 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from kline_fetcher import KlineFetcher, KLINE_COLUMNS, INTERVAL_MS, klines_to_arrays
+
+# Sayfa boyu = Binance /klines tek istek limiti
+PAGE_BARS = 1000
+
+
+class DeepHistoryLoader:
+    """1000 bar sınırının ötesinde (aylarca) kline geçmişi yükleyici
+
+    Zaman ekseni mutlak sayfalara bölünür: sayfa p, [p*1000, (p+1)*1000) bar
+    indekslerini kapsar (bar indeksi = open_time // interval_ms). Her sayfa tek
+    bir startTime/endTime isteğidir; tüm semboller ve sayfalar aynı thread
+    havuzunda eşzamanlı çekilir ve doğrudan sembolün önceden ayrılmış dizisine
+    yazılır.
+
+    Tamamen kapanmış sayfalar diske kaydedilir ve bir daha çekilmez; böylece
+    kesilen bir yükleme kaldığı yerden devam eder.
+    """
+
+    def __init__(self, fetcher=None, directory='kline_cache/pages'):
+        """
+        fetcher: KlineFetcher (None = varsayılan Binance çekicisi)
+        directory: Tamamlanmış sayfaların klasörü (None = diske yazma, devam yok)
+        """
+        self.fetcher = fetcher or KlineFetcher()
+        self.directory = directory
+        self.stats = {'pages_cached': 0, 'pages_fetched': 0, 'pages_failed': 0}
+
+    # ---------------- Sayfa dosyaları ----------------
+    def _page_path(self, symbol, interval, page):
+        return os.path.join(self.directory, interval, symbol, f"{page}.npy")
+
+    def _load_page(self, symbol, interval, page):
+        if self.directory is None:
+            return None
+        path = self._page_path(symbol, interval, page)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path)
+        except Exception:
+            return None  # Bozuk sayfa - yeniden çekilir
+
+    def _save_page(self, symbol, interval, page, values):
+        """Sayfayı atomik olarak yaz (PAGE_BARS × 5, eksik barlar NaN)"""
+        if self.directory is None:
+            return
+        path = self._page_path(symbol, interval, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    # ---------------- Yükleme ----------------
+    def _fetch_page(self, symbol, interval, interval_ms, page, now_index):
+        """Bir sayfayı çek; (PAGE_BARS × 5 değer matrisi, sayfa tamamen kapanmış mı) döndür"""
+        page_first = page * PAGE_BARS
+        page_last = min(page_first + PAGE_BARS, now_index + 1)
+        rows = self.fetcher.fetch(symbol, interval, PAGE_BARS,
+                                  start_time=page_first * interval_ms,
+                                  end_time=page_last * interval_ms - 1)
+        if rows is None:
+            return None, False
+        arrays = klines_to_arrays(rows)
+        values = np.full((PAGE_BARS, len(KLINE_COLUMNS) - 1), np.nan)
+        slots = arrays['open_time'] // interval_ms - page_first
+        inside = (slots >= 0) & (slots < PAGE_BARS)
+        for i, column in enumerate(KLINE_COLUMNS[1:]):
+            values[slots[inside], i] = arrays[column][inside]
+        # Şu anki (açık) barı içermeyen sayfalar değişmez - kaydedilebilir
+        complete = page_first + PAGE_BARS <= now_index
+        return values, complete
+
+    def load_many(self, symbols, interval='1m', start_ms=None, end_ms=None, progress=True):
+        """[start_ms, end_ms] aralığındaki barları tüm semboller için yükle
+
+        start_ms: Başlangıç (epoch ms, zorunlu)
+        end_ms: Bitiş (epoch ms, None = şimdi, açık bar dahil)
+        Dönen format: {symbol: {'open_time': int64[n], 'open': float64[n], ...}}
+                      (sadece borsada bulunan barlar, liste öncesi boşluklar atılır)
+        """
+        if start_ms is None:
+            raise ValueError("start_ms gerekli")
+        interval_ms = INTERVAL_MS[interval]
+        now_index = int(time.time() * 1000) // interval_ms
+        first = -(-int(start_ms) // interval_ms)
+        last = min(now_index, (int(end_ms) if end_ms is not None else now_index * interval_ms) // interval_ms) + 1
+        n_bars = max(0, last - first)
+        pages = range(first // PAGE_BARS, (last - 1) // PAGE_BARS + 1) if n_bars else range(0)
+
+        # Sembol başına önceden ayrılmış matris (satır = bar, kolon = OHLCV)
+        buffers = {symbol: np.full((n_bars, len(KLINE_COLUMNS) - 1), np.nan) for symbol in symbols}
+        failed = set()
+
+        def place(symbol, page, values):
+            """Sayfanın [first, last) ile kesişen kısmını sembolün matrisine kopyala"""
+            lo = max(page * PAGE_BARS, first)
+            hi = min((page + 1) * PAGE_BARS, last)
+            buffers[symbol][lo - first:hi - first] = values[lo - page * PAGE_BARS:hi - page * PAGE_BARS]
+
+        tasks = []
+        for symbol in symbols:
+            for page in pages:
+                values = self._load_page(symbol, interval, page)
+                if values is not None:
+                    place(symbol, page, values)
+                    self.stats['pages_cached'] += 1
+                else:
+                    tasks.append((symbol, page))
+
+        if progress:
+            print(f"Derin geçmiş: {len(symbols)} sembol × {n_bars} bar ({interval}), "
+                  f"{len(tasks)} sayfa çekilecek, {self.stats['pages_cached']} sayfa diskte")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.fetcher.max_workers) as executor:
+            futures = {executor.submit(self._fetch_page, symbol, interval, interval_ms, page, now_index): (symbol, page)
+                       for symbol, page in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                symbol, page = futures[future]
+                try:
+                    values, complete = future.result()
+                except Exception as e:
+                    print(f"  {symbol} sayfa {page} hatası: {e}")
+                    values, complete = None, False
+                if values is None:
+                    failed.add(symbol)
+                    self.stats['pages_failed'] += 1
+                    continue
+                place(symbol, page, values)
+                self.stats['pages_fetched'] += 1
+                if complete:
+                    self._save_page(symbol, interval, page, values)
+                if progress and (done % 200 == 0 or done == len(tasks)):
+                    print(f"  [{done}/{len(tasks)} sayfa] {time.perf_counter() - start:.1f} sn")
+
+        open_time = (first + np.arange(n_bars, dtype=np.int64)) * interval_ms
+        results = {}
+        for symbol, values in buffers.items():
+            if symbol in failed:
+                continue  # Eksik sayfalı seri korelasyonu bozar; bir sonraki çalıştırmada tamamlanır
+            present = ~np.isnan(values[:, 3])
+            if not present.any():
+                continue
+            arrays = {'open_time': open_time[present]}
+            for i, column in enumerate(KLINE_COLUMNS[1:]):
+                arrays[column] = values[present, i]
+            results[symbol] = arrays
+        return results
+
+    def load(self, symbol, interval='1m', start_ms=None, end_ms=None):
+        """Tek sembol için load_many (başarısızsa None)"""
+        return self.load_many([symbol], interval, start_ms, end_ms, progress=False).get(symbol)
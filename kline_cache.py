@@ -0,0 +1,144 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from kline_fetcher import KlineFetcher, KLINE_COLUMNS, INTERVAL_MS, klines_to_arrays
+
+# Binance /klines tek istekte en fazla bu kadar bar döndürür
+MAX_KLINES_PER_REQUEST = 1000
+
+
+class KlineCache:
+    """(symbol, interval) başına NPZ dosyalarında tutulan kalıcı kline önbelleği
+
+    İlk istekte `limit` bar tam olarak indirilir. Sonraki isteklerde sadece son
+    önbelleklenmiş barın açılış zamanından (startTime) sonrası çekilir ve
+    birleştirilir. Son bar her seferinde yeniden çekilir çünkü önbelleğe
+    alındığında henüz kapanmamış olabilir.
+    """
+
+    def __init__(self, directory='kline_cache', fetcher=None, max_bars=5000):
+        """
+        directory: Önbellek klasörü (interval başına alt klasör)
+        fetcher: KlineFetcher (None = varsayılan Binance çekicisi)
+        max_bars: Sembol başına diskte tutulacak maksimum bar sayısı
+        """
+        self.directory = directory
+        self.fetcher = fetcher or KlineFetcher()
+        self.max_bars = max_bars
+        self.stats = {'full_downloads': 0, 'top_ups': 0, 'bars_fetched': 0}
+        self._stats_lock = threading.Lock()
+
+    # ---------------- Disk ----------------
+    def path(self, symbol, interval):
+        return os.path.join(self.directory, interval, f"{symbol}.npz")
+
+    def load(self, symbol, interval):
+        """Önbellekteki kolon dizilerini oku (yoksa / bozuksa None)"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return {column: data[column] for column in KLINE_COLUMNS}
+        except Exception as e:
+            print(f"  ⚠️  Bozuk önbellek dosyası atlanıyor ({path}): {e}")
+            return None
+
+    def save(self, symbol, interval, arrays):
+        """Kolon dizilerini atomik olarak yaz (yarım dosya hiçbir zaman görünmez)"""
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    # ---------------- Okuma + güncelleme ----------------
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _top_up(self, symbol, interval, cached):
+        """Son önbelleklenmiş bardan itibaren yeni barları çekip birleştir"""
+        merged = cached
+        start_time = int(cached['open_time'][-1])
+        while True:
+            rows = self.fetcher.fetch(symbol, interval, MAX_KLINES_PER_REQUEST, start_time=start_time)
+            if rows is None:
+                return None
+            fresh = klines_to_arrays(rows)
+            self._count('bars_fetched', len(rows))
+            if len(fresh['open_time']) == 0:
+                return merged
+            keep = merged['open_time'] < fresh['open_time'][0]
+            merged = {column: np.concatenate([merged[column][keep], fresh[column]]) for column in KLINE_COLUMNS}
+            if len(rows) < MAX_KLINES_PER_REQUEST:
+                return merged
+            # Aradaki boşluk tek istekten büyük - sonraki sayfa
+            start_time = int(fresh['open_time'][-1])
+
+    def get(self, symbol, interval='1m', limit=500):
+        """Son `limit` barı döndür (önbellek + artımlı güncelleme), başarısızsa None"""
+        cached = self.load(symbol, interval)
+        arrays = None
+
+        if cached is not None and len(cached['open_time']) > 0:
+            # Önbellek çok eskiyse (aradaki boşluk `limit`ten büyük) tam indirme daha ucuz
+            interval_ms = INTERVAL_MS.get(interval)
+            now_ms = int(time.time() * 1000)
+            stale_bars = (now_ms - int(cached['open_time'][-1])) // interval_ms if interval_ms else 0
+            if stale_bars < limit:
+                merged = self._top_up(symbol, interval, cached)
+                # Önbellek istenen derinliği karşılamıyorsa tam indirmeye düş
+                if merged is not None and len(merged['open_time']) >= limit:
+                    arrays = merged
+                    self._count('top_ups')
+
+        if arrays is None:
+            arrays = self.fetcher.fetch_arrays(symbol, interval, min(limit, MAX_KLINES_PER_REQUEST))
+            if arrays is None:
+                return None
+            self._count('full_downloads')
+            self._count('bars_fetched', len(arrays['open_time']))
+            if cached is not None and len(cached['open_time']) > 0 and len(arrays['open_time']) > 0 \
+                    and cached['open_time'][-1] >= arrays['open_time'][0]:
+                # Çakışma varsa eski geçmişi koru (boşluk varsa eski veri atılır)
+                keep = cached['open_time'] < arrays['open_time'][0]
+                arrays = {column: np.concatenate([cached[column][keep], arrays[column]]) for column in KLINE_COLUMNS}
+
+        if len(arrays['open_time']) > self.max_bars:
+            arrays = {column: values[-self.max_bars:] for column, values in arrays.items()}
+        if len(arrays['open_time']) > 0:
+            self.save(symbol, interval, arrays)
+        return {column: values[-limit:] for column, values in arrays.items()}
+
+    def get_many(self, symbols, interval='1m', limit=500, progress=True):
+        """Birden çok sembolü eşzamanlı olarak önbellekten / API'den al
+
+        Dönen format: {symbol: kolon dizileri} (başarısız semboller dahil edilmez)
+        """
+        results = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.fetcher.max_workers) as executor:
+            futures = {executor.submit(self.get, symbol, interval, limit): symbol for symbol in symbols}
+            for done, future in enumerate(as_completed(futures), 1):
+                symbol = futures[future]
+                try:
+                    arrays = future.result()
+                except Exception as e:
+                    print(f"  {symbol} önbellek hatası: {e}")
+                    arrays = None
+                if arrays is not None and len(arrays['close']) > 0:
+                    results[symbol] = arrays
+                if progress and (done % 50 == 0 or done == len(symbols)):
+                    print(f"  [{done}/{len(symbols)}] {time.perf_counter() - start:.1f} sn")
+        return results
@@ -0,0 +1,199 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# Binance spot: IP başına dakikalık istek ağırlığı limiti
+DEFAULT_WEIGHT_LIMIT = 6000
+# /api/v3/klines ağırlığı
+KLINES_WEIGHT = 2
+
+KLINE_COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+# Binance kline aralıkları (ms)
+INTERVAL_MS = {
+    '1s': 1000, '1m': 60000, '3m': 180000, '5m': 300000, '15m': 900000, '30m': 1800000,
+    '1h': 3600000, '2h': 7200000, '4h': 14400000, '6h': 21600000, '8h': 28800000,
+    '12h': 43200000, '1d': 86400000, '3d': 259200000, '1w': 604800000,
+}
+
+
+class WeightRateLimiter:
+    """Binance istek ağırlığı için token bucket
+
+    Kova dakikalık limitin `safety` katı kadar token tutar ve sürekli dolar.
+    Sunucunun bildirdiği kullanılmış ağırlık (X-MBX-USED-WEIGHT-1M) bizim
+    tahminimizden yüksekse kova ona göre boşaltılır; böylece aynı IP'yi
+    paylaşan başka süreçler de hesaba katılır.
+    """
+
+    def __init__(self, weight_per_minute=DEFAULT_WEIGHT_LIMIT, safety=0.8):
+        """
+        weight_per_minute: Borsanın dakikalık ağırlık limiti
+        safety: Limitin kullanılacak oranı (0.8 = %80'inde dur)
+        """
+        self.capacity = weight_per_minute * safety
+        self.refill_per_second = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def acquire(self, weight=1):
+        """Yeterli token birikene kadar bekle ve harca"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = max(self.paused_until - now, (weight - self.tokens) / self.refill_per_second)
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, used_weight):
+        """Sunucunun bildirdiği dakikalık kullanılmış ağırlıkla kovayı hizala
+
+        Borsanın sayacı her takvim dakikasında sıfırlanır; limit dolduysa
+        bir sonraki dakikanın başına kadar beklenir.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            remaining = self.capacity - used_weight
+            if remaining <= 0:
+                self.paused_until = max(self.paused_until, now + 60 - time.time() % 60)
+                self.tokens = 0.0
+            else:
+                self.tokens = min(self.tokens, remaining)
+
+    def pause(self, seconds):
+        """429 / 418 sonrası tüm istekleri belirtilen süre durdur"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+
+def klines_to_arrays(rows):
+    """Binance kline satırlarını kolon dizilerine çevir
+
+    Dönen format: {'open_time': int64[n], 'open': float64[n], ..., 'volume': float64[n]}
+    """
+    if not rows:
+        result = {'open_time': np.empty(0, dtype=np.int64)}
+        result.update({column: np.empty(0) for column in KLINE_COLUMNS[1:]})
+        return result
+    values = np.array([row[1:6] for row in rows], dtype=np.float64)  # Fiyatlar string gelir
+    result = {'open_time': np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))}
+    for i, column in enumerate(KLINE_COLUMNS[1:]):
+        result[column] = values[:, i]
+    return result
+
+
+class KlineFetcher:
+    """Bağlantı havuzlu, ağırlık sınırlı, eşzamanlı kline çekici
+
+    Tüm thread'ler tek bir requests.Session'ı (keep-alive havuzu) ve tek bir
+    WeightRateLimiter'ı paylaşır. 429 / 418 yanıtlarında Retry-After'a uyulur,
+    ağ ve 5xx hatalarında jitter'lı üstel beklemeyle tekrar denenir.
+    """
+
+    def __init__(self, base_url="https://api.binance.com/api/v3", max_workers=16,
+                 weight_limit=DEFAULT_WEIGHT_LIMIT, max_retries=5, timeout=10):
+        """
+        base_url: Binance REST API base URL
+        max_workers: Eşzamanlı istek sayısı (aynı zamanda havuz boyutu)
+        weight_limit: Dakikalık ağırlık limiti
+        max_retries: İstek başına maksimum tekrar deneme
+        timeout: İstek zaman aşımı (saniye)
+        """
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = WeightRateLimiter(weight_limit)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(30.0, 0.5 * (2 ** attempt)))
+
+    def fetch(self, symbol, interval='1m', limit=500, start_time=None, end_time=None):
+        """Tek bir sembol için ham kline satırlarını çek (başarısızsa None)
+
+        start_time / end_time: Epoch ms (opsiyonel)
+        """
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+        if end_time is not None:
+            params['endTime'] = int(end_time)
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(KLINES_WEIGHT)
+            try:
+                response = self.session.get(f"{self.base_url}/klines", params=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                if attempt == self.max_retries:
+                    print(f"  {symbol} geçmiş veri çekme hatası: {e}")
+                    return None
+                time.sleep(self._backoff(attempt))
+                continue
+
+            used = response.headers.get('X-MBX-USED-WEIGHT-1M') or response.headers.get('X-MBX-USED-WEIGHT')
+            if used is not None:
+                self.limiter.observe(int(used))
+
+            if response.status_code in (429, 418):
+                # 429 = limit aşıldı, 418 = IP geçici olarak yasaklandı
+                retry_after = float(response.headers.get('Retry-After', 0)) or self._backoff(attempt) + 1
+                print(f"  ⚠️  HTTP {response.status_code} ({symbol}), {retry_after:.0f}s bekleniyor...")
+                self.limiter.pause(retry_after)
+                continue
+            if response.status_code >= 500:
+                time.sleep(self._backoff(attempt))
+                continue
+            if response.status_code != 200:
+                print(f"  {symbol} geçmiş veri çekme hatası: HTTP {response.status_code} {response.text[:100]}")
+                return None
+            return response.json()
+
+        print(f"  {symbol} geçmiş veri çekme hatası: {self.max_retries} deneme başarısız")
+        return None
+
+    def fetch_arrays(self, symbol, interval='1m', limit=500, start_time=None, end_time=None):
+        """fetch() sonucunu kolon dizileri olarak döndür (başarısızsa None)"""
+        rows = self.fetch(symbol, interval, limit, start_time, end_time)
+        return None if rows is None else klines_to_arrays(rows)
+
+    def fetch_many(self, symbols, interval='1m', limit=500, progress=True):
+        """Birden çok sembolü eşzamanlı çek
+
+        Dönen format: {symbol: kolon dizileri} (başarısız semboller dahil edilmez)
+        """
+        results = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_arrays, symbol, interval, limit): symbol
+                       for symbol in symbols}
+            for done, future in enumerate(as_completed(futures), 1):
+                symbol = futures[future]
+                arrays = future.result()
+                if arrays is not None and len(arrays['close']) > 0:
+                    results[symbol] = arrays
+                if progress and (done % 50 == 0 or done == len(symbols)):
+                    print(f"  [{done}/{len(symbols)}] {time.perf_counter() - start:.1f} sn")
+        return results
+
+    def close(self):
+        self.session.close()
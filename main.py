@@ -3,24 +3,45 @@ import threading
 import os
 import subprocess
 from datetime import datetime
-from binance_websocket import BinanceWebSocket
+from binance_websocket import BinanceWebSocket, BINANCE_REST_URL, BINANCE_STREAM_URL
 from correlation_analyzer import CorrelationAnalyzer
 from price_volume_analyzer import PriceVolumeAnalyzer
 from correlation_change_tracker import CorrelationChangeTracker
 
 class ContinuousAnalyzer:
-    def __init__(self, analysis_interval_minutes=30, auto_push_to_github=False):
+    def __init__(self, analysis_interval_minutes=30, auto_push_to_github=False, use_asyncio=False,
+                 stream_mode='ticker', use_klines=False, base_url=BINANCE_REST_URL,
+                 stream_url=BINANCE_STREAM_URL, refresh_interval_minutes=None,
+                 correlation_method='pearson', ewma_half_life_minutes=30, lead_lag_max_minutes=10):
         """
         Sürekli çalışan analiz servisi
         
         analysis_interval_minutes: Her kaç dakikada bir analiz yapılacak (varsayılan: 30 dakika)
         auto_push_to_github: Analiz sonrası otomatik GitHub push yapılsın mı? (Railway/Render için)
+        use_asyncio: WebSocket verisini tek asyncio event loop'unda topla (thread'li istemci yerine)
+        stream_mode: 'ticker' (sembol başına stream) veya 'all_market' (tek !miniTicker@arr bağlantısı)
+        use_klines: Anlık korelasyonu ticker örnekleri yerine borsanın kapattığı 1m barlarla hesapla
+        base_url / stream_url: Binance REST / WebSocket adresleri (örn: mock_binance_server)
+        refresh_interval_minutes: Tam analizler arasında artımlı korelasyon güncelleme aralığı (None = kapalı)
+        correlation_method: 'pearson' (son 60 dakika eşit ağırlıklı), 'ewma' (üstel ağırlıklı),
+                            'spearman' veya 'winsorized' (fitillere dayanıklı)
+        ewma_half_life_minutes: EWMA yarı ömrü (dakika = 1m bar)
+        lead_lag_max_minutes: Her analizde 1..N dakika gecikmeli korelasyon taraması (None = kapalı)
         """
         self.analysis_interval = analysis_interval_minutes * 60  # Saniyeye çevir
+        self.refresh_interval = refresh_interval_minutes * 60 if refresh_interval_minutes else None
         self.auto_push_to_github = auto_push_to_github
         self.running = False
-        self.ws = BinanceWebSocket()
+        self.base_url = base_url
+        self.ws = BinanceWebSocket(use_asyncio=use_asyncio, stream_mode=stream_mode,
+                                   subscribe_klines=use_klines, base_url=base_url,
+                                   stream_url=stream_url)
+        self.use_klines = use_klines
+        self.correlation_method = correlation_method
+        self.ewma_half_life = ewma_half_life_minutes
+        self.lead_lag_max_lag = lead_lag_max_minutes
         self.correlation_analyzer = CorrelationAnalyzer(
+            base_url=base_url,
             min_data_points=50,
             correlation_threshold=0.7
         )
@@ -76,6 +97,7 @@ class ContinuousAnalyzer:
         print("\n[BAŞLATMA] İlk geçmiş veri analizi yapılıyor...")
         try:
             correlation_analyzer = CorrelationAnalyzer(
+                base_url=self.base_url,
                 min_data_points=50,
                 correlation_threshold=0.7
             )
@@ -111,26 +133,43 @@ class ContinuousAnalyzer:
             print(f"{'='*80}")
             
             # Veri kontrolü
-            price_data = self.ws.get_price_data()
-            price_volume_data = self.ws.get_price_volume_data()
+            tick_store = self.ws.get_price_data()
             
-            total_price_points = sum(len(v) for v in price_data.values())
-            total_pv_points = sum(len(v) for v in price_volume_data.values())
+            # Ring buffer'lar eski tick'lerin üzerine yazdığı için ayrıca temizlik gerekmez
+            total_price_points = tick_store.total_points()
             
-            print(f"Toplanan veri: {total_price_points} fiyat noktası, {total_pv_points} fiyat-volume noktası")
+            print(f"Toplanan veri: {total_price_points} fiyat-volume noktası ({len(tick_store)} coin)")
             
             if total_price_points < 50:
                 print(f"⚠️  Yetersiz veri ({total_price_points} < 50). Bir sonraki analizde tekrar denenecek.")
                 return
             
+            # Hizalanmış (zaman × coin) anlık görüntü - döngü başına bir kez, iki analizör paylaşır
+            snapshot = self.ws.snapshot(window=3600, interval_seconds=60)
+            price_data = snapshot
+            price_volume_data = snapshot
+            print(f"Anlık görüntü: {len(snapshot)} dakika × {len(snapshot.symbols)} coin")
+            
+            if self.use_klines:
+                # Korelasyon için kesin kapanış fiyatları (yeterli bar yoksa ticker görüntüsü kullanılır)
+                bars = self.ws.bar_snapshot(window=3600)
+                if len(bars) >= 2 and len(bars.symbols) > 0:
+                    price_data = bars
+                    print(f"Kline bar görüntüsü: {len(bars)} bar × {len(bars.symbols)} coin")
+                else:
+                    print("⚠️  Henüz yeterli kapanmış bar yok, ticker görüntüsü kullanılıyor")
+            
             # 1. Anlık verilerle korelasyon analizi
             print("\n[1/2] Anlık verilerle korelasyon analizi...")
-            if price_data:
+            if len(price_data) > 0:
                 correlation_matrix_realtime, high_corr_realtime, coin_analyses_realtime = \
                     self.correlation_analyzer.analyze_realtime_data(
                         price_data=price_data,
                         use_returns=True,
-                        resample_interval='1min'
+                        resample_interval='1min',
+                        method=self.correlation_method,
+                        half_life=self.ewma_half_life,
+                        lead_lag_max_lag=self.lead_lag_max_lag
                     )
                 print("✓ Korelasyon analizi tamamlandı!")
                 
@@ -145,7 +184,7 @@ class ContinuousAnalyzer:
             
             # 2. Fiyat-Volume ve ani değişim analizi
             print("\n[2/2] Fiyat-Volume ve ani değişim analizi...")
-            if price_volume_data:
+            if len(price_volume_data) > 0:
                 # Fiyat-Volume korelasyon analizi
                 coin_analyses_pv = self.price_volume_analyzer.analyze_price_volume_relationship(
                     price_volume_data=price_volume_data,
@@ -176,10 +215,6 @@ class ContinuousAnalyzer:
             else:
                 print("⚠️  Fiyat-volume verisi bulunamadı!")
             
-            # Veri temizleme (son 1 saatlik veriyi tut, eskileri sil)
-            print("\n[VERİ TEMİZLİĞİ] Eski veriler temizleniyor...")
-            self.clean_old_data(keep_hours=1)
-            
             # Otomatik GitHub push (Railway/Render için)
             if self.auto_push_to_github:
                 print("\n[GITHUB PUSH] JSON dosyaları GitHub'a pushlanıyor...")
@@ -200,37 +235,34 @@ class ContinuousAnalyzer:
             else:
                 print(error_trace)
     
-    def clean_old_data(self, keep_hours=1):
-        """Eski verileri temizle (son N saatlik veriyi tut)"""
+    def refresh_correlation(self):
+        """Ara güncelleme: korelasyon matrisini sadece yeni barlarla güncelle
+        
+        Tam analiz (coin başına tablo, fiyat-volume) yapılmaz; sadece yüksek
+        korelasyonlar ve matris güncellenir. Değişiklik takibi tam analizin
+        aralığında kalır (dakikalık gürültülü anlık görüntüler karşılaştırılmaz).
+        """
         try:
-            from datetime import timedelta
-            cutoff_time = datetime.now() - timedelta(hours=keep_hours)
-            
-            cleaned_price = 0
-            cleaned_pv = 0
-            
-            # Fiyat verilerini temizle
-            for symbol in list(self.ws.price_data.keys()):
-                original_len = len(self.ws.price_data[symbol])
-                self.ws.price_data[symbol] = [
-                    item for item in self.ws.price_data[symbol]
-                    if item['timestamp'] >= cutoff_time
-                ]
-                cleaned_price += original_len - len(self.ws.price_data[symbol])
-            
-            # Fiyat-volume verilerini temizle
-            for symbol in list(self.ws.price_volume_data.keys()):
-                original_len = len(self.ws.price_volume_data[symbol])
-                self.ws.price_volume_data[symbol] = [
-                    item for item in self.ws.price_volume_data[symbol]
-                    if item['timestamp'] >= cutoff_time
-                ]
-                cleaned_pv += original_len - len(self.ws.price_volume_data[symbol])
+            if self.use_klines:
+                price_data = self.ws.bar_snapshot(window=3600)
+                if len(price_data) < 2 or len(price_data.symbols) == 0:
+                    price_data = self.ws.snapshot(window=3600, interval_seconds=60)
+            else:
+                price_data = self.ws.snapshot(window=3600, interval_seconds=60)
+            if len(price_data) < 2:
+                return
             
-            if cleaned_price > 0 or cleaned_pv > 0:
-                print(f"✓ Temizlendi: {cleaned_price} fiyat, {cleaned_pv} fiyat-volume verisi")
+            correlation_matrix = self.correlation_analyzer.update_rolling_correlation(
+                price_data, window=60, method=self.correlation_method, half_life=self.ewma_half_life)
+            if correlation_matrix is None:
+                return
+            high_correlations = self.correlation_analyzer.find_high_correlations(correlation_matrix)
+            self.correlation_analyzer.save_correlations(high_correlations, 'realtime_correlations.json')
+            clusters = self.correlation_analyzer.cluster_correlation_matrix(correlation_matrix)
+            self.correlation_analyzer.save_correlation_matrix(correlation_matrix, 'realtime_correlation_matrix.csv',
+                                                              clusters=clusters)
         except Exception as e:
-            print(f"⚠️  Veri temizleme hatası: {e}")
+            print(f"⚠️  Artımlı korelasyon hatası: {type(e).__name__}: {e}")
     
     def push_to_github(self):
         """JSON ve CSV dosyalarını GitHub'a otomatik pushla (Railway/Render için)"""
@@ -278,9 +310,11 @@ class ContinuousAnalyzer:
                 'realtime_correlations.json',
                 'price_volume_analysis.json',
                 'sudden_price_volume_analysis.json',
-                'correlation_changes_history.json',
+                'correlation_changes',
                 'realtime_correlation_matrix.csv',
-                'realtime_coin_correlations.json'
+                'realtime_correlation_matrix.corr',
+                'realtime_coin_correlations.json',
+                'realtime_lead_lag.json'
             ]
             
             changed_files = [f for f in json_files if os.path.exists(f)]
@@ -351,10 +385,15 @@ class ContinuousAnalyzer:
                 print(f"⏳ {wait_seconds // 60} dakika bekleniyor...")
                 
                 # Her 10 saniyede bir kontrol et (daha hızlı durdurma için)
+                next_refresh = time.monotonic() + self.refresh_interval if self.refresh_interval else None
                 for _ in range(wait_seconds // 10):
                     if not self.running:
                         break
                     time.sleep(10)
+                    if next_refresh is not None and time.monotonic() >= next_refresh:
+                        # Tam analizler arasında artımlı korelasyon güncellemesi
+                        self.refresh_correlation()
+                        next_refresh += self.refresh_interval
                 
             except KeyboardInterrupt:
                 print("\n\n⚠️  Kullanıcı tarafından durduruldu!")
@@ -422,9 +461,10 @@ if __name__ == "__main__":
     if auto_push:
         print("🚀 Railway/Render ortamı tespit edildi - Otomatik GitHub push aktif!")
     
-    # 30 dakikada bir analiz yapılacak (daha mantıklı bir süre)
+    # 30 dakikada bir tam analiz, arada her dakika artımlı korelasyon güncellemesi
     analyzer = ContinuousAnalyzer(
         analysis_interval_minutes=30,
-        auto_push_to_github=auto_push
+        auto_push_to_github=auto_push,
+        refresh_interval_minutes=1
     )
     analyzer.start()
@@ -0,0 +1,246 @@
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from correlation_clusters import CorrelationClusters
+
+# Dosya başı: 8 bayt sihirli değer + 8 bayt başlık uzunluğu + JSON başlık
+MATRIX_MAGIC = b'CORRMTX1'
+# Bölümler bu sınıra hizalanır (memmap için)
+MATRIX_ALIGN = 64
+MATRIX_SUFFIX = '.corr'
+
+
+def matrix_path(filename):
+    """CSV matris dosyasının binary kardeşi ('x.csv' -> 'x.corr')"""
+    return os.path.splitext(filename)[0] + MATRIX_SUFFIX
+
+
+def _aligned(offset):
+    return -(-offset // MATRIX_ALIGN) * MATRIX_ALIGN
+
+
+def _triangle_start(i, n):
+    """Satır-öncelikli üst üçgende (köşegen dahil) i. satırın başlangıç indeksi"""
+    return i * n - i * (i - 1) // 2
+
+
+def write_correlation_matrix(path, matrix, symbols=None, dtype='float32', floor=None, clusters=None,
+                             csv_bytes=None):
+    """Korelasyon matrisini memmap'lenebilir binary dosyaya atomik olarak yaz
+
+    Yoğun düzen: köşegen dahil üst üçgen, satır-öncelikli (N(N+1)/2 değer).
+    Seyrek düzen (floor verilirse): sadece |r| ≥ floor olan köşegen dışı üst
+    üçgen girdileri CSR olarak (offsets int64, indices int32, values).
+    Matris satır satır okunur; memmap girdiler RAM'e tamamen alınmaz.
+
+    matrix: DataFrame veya N × N dizi (memmap olabilir)
+    symbols: Sembol listesi (DataFrame için None = kolonlar)
+    dtype: Değer tipi ('float32', 'float16' veya tam hassasiyet için 'float64')
+    floor: Seyrek düzen için mutlak korelasyon alt sınırı (None = yoğun)
+    clusters: CorrelationClusters - seriation sırası ve küme etiketleri başlığa yazılır
+    csv_bytes: Aynı anda yazılan CSV kardeşinin bayt boyutu (save_matrix_pair)
+    """
+    if isinstance(matrix, pd.DataFrame):
+        if symbols is None:
+            symbols = matrix.columns
+        matrix = matrix.to_numpy()
+    symbols = [str(symbol) for symbol in symbols]
+    n = len(symbols)
+    if matrix.shape != (n, n):
+        raise ValueError(f"Matris boyutu {matrix.shape}, sembol sayısı {n} ile uyuşmuyor")
+    dtype = np.dtype(dtype)
+
+    header = {'dtype': dtype.str, 'symbols': symbols, 'created': time.time()}
+    if csv_bytes is not None:
+        header['csv_bytes'] = int(csv_bytes)
+    if clusters is not None:
+        header['clusters'] = clusters.to_header()
+    if floor is None:
+        header['layout'] = 'dense'
+        sections = [('values', dtype, n * (n + 1) // 2)]
+    else:
+        # CSR girdileri: satır başına üst üçgenden eşiği geçenler
+        row_indices, row_values = [], []
+        for i in range(n):
+            row = np.asarray(matrix[i, i + 1:], dtype=np.float64)
+            keep = np.flatnonzero(np.abs(row) >= floor)  # NaN elenir
+            row_indices.append((keep + i + 1).astype(np.int32))
+            row_values.append(row[keep].astype(dtype))
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(keep) for keep in row_indices], out=offsets[1:])
+        header.update(layout='sparse', floor=float(floor), nnz=int(offsets[-1]))
+        sections = [('offsets', np.dtype(np.int64), n + 1),
+                    ('indices', np.dtype(np.int32), int(offsets[-1])),
+                    ('values', dtype, int(offsets[-1]))]
+
+    # Başlık, bölüm konumlarını içerir; uzunluğu konumları etkilemesin diye iki geçiş
+    header['sections'] = {}
+    for _ in range(2):
+        offset = _aligned(16 + len(json.dumps(header).encode('utf-8')))
+        for name, section_dtype, count in sections:
+            header['sections'][name] = [offset, count]
+            offset = _aligned(offset + count * section_dtype.itemsize)
+    encoded = json.dumps(header).encode('utf-8')
+    encoded += b' ' * (header['sections'][sections[0][0]][0] - 16 - len(encoded))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MATRIX_MAGIC)
+            f.write(np.uint64(len(encoded)).tobytes())
+            f.write(encoded)
+            for name, section_dtype, count in sections:
+                f.seek(header['sections'][name][0])
+                if name == 'values' and floor is None:
+                    for i in range(n):
+                        f.write(np.asarray(matrix[i, i:], dtype=dtype).tobytes())
+                elif name == 'offsets':
+                    f.write(offsets.tobytes())
+                else:
+                    for part in (row_indices if name == 'indices' else row_values):
+                        f.write(part.tobytes())
+            f.truncate(_aligned(f.tell()))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class CorrelationMatrixFile:
+    """write_correlation_matrix ile yazılmış dosyanın memmap görünümü
+
+    Dosya açılırken sadece başlık okunur; satır / alt matris istekleri
+    yalnızca ilgili baytlara dokunur. Seyrek düzende eşiğin altındaki
+    girdiler NaN döner.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MATRIX_MAGIC)) != MATRIX_MAGIC:
+                raise ValueError(f"{path} bir korelasyon matrisi dosyası değil")
+            length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(length).decode('utf-8'))
+
+        self.symbols = header['symbols']
+        self.layout = header['layout']
+        self.floor = header.get('floor')
+        self.dtype = np.dtype(header['dtype'])
+        self.created = header.get('created')      # Yazım zamanı (epoch sn)
+        self.csv_bytes = header.get('csv_bytes')  # Birlikte yazılan CSV'nin boyutu
+        self.clusters = (CorrelationClusters.from_header(self.symbols, header['clusters'])
+                         if 'clusters' in header else None)
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        sections = {}
+        for name, (offset, count) in header['sections'].items():
+            section_dtype = {'offsets': np.int64, 'indices': np.int32}.get(name, self.dtype)
+            sections[name] = (np.memmap(path, dtype=section_dtype, mode='r', offset=offset, shape=(count,))
+                              if count else np.empty(0, dtype=section_dtype))
+        self._values = sections['values']
+        self._offsets = sections.get('offsets')
+        self._indices = sections.get('indices')
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def _position(self, symbol):
+        if symbol not in self._positions:
+            raise KeyError(symbol)
+        return self._positions[symbol]
+
+    def _dense_row(self, i):
+        n = len(self.symbols)
+        row = np.empty(n)
+        start = _triangle_start(i, n)
+        row[i:] = self._values[start:start + n - i]
+        earlier = np.arange(i)
+        row[:i] = self._values[_triangle_start(earlier, n) + i - earlier]
+        return row
+
+    def _sparse_row(self, i):
+        row = np.full(len(self.symbols), np.nan)
+        lo, hi = self._offsets[i], self._offsets[i + 1]
+        row[self._indices[lo:hi]] = self._values[lo:hi]
+        # Alt üçgen: önceki satırlarda kolonu i olan girdiler
+        hits = np.flatnonzero(self._indices[:lo] == i)
+        row[np.searchsorted(self._offsets, hits, side='right') - 1] = self._values[hits]
+        row[i] = 1.0
+        return row
+
+    def row(self, symbol):
+        """Bir coinin tüm coinlerle korelasyonu (Series, float64)"""
+        i = self._position(symbol)
+        values = self._dense_row(i) if self.layout == 'dense' else self._sparse_row(i)
+        return pd.Series(values, index=self.symbols, name=symbol)
+
+    def submatrix(self, symbols):
+        """Seçilen coinlerin korelasyon matrisi (DataFrame, float64)"""
+        symbols = list(symbols)
+        positions = np.array([self._position(symbol) for symbol in symbols], dtype=np.int64)
+        if self.layout == 'dense':
+            lo = np.minimum.outer(positions, positions)
+            hi = np.maximum.outer(positions, positions)
+            values = self._values[_triangle_start(lo, len(self.symbols)) + hi - lo].astype(np.float64)
+        else:
+            values = np.array([self._sparse_row(i)[positions] for i in positions]).reshape(len(positions), -1)
+        return pd.DataFrame(values, index=symbols, columns=symbols)
+
+    def to_frame(self):
+        """Tam korelasyon matrisi (DataFrame, float64) - df.corr() formatı"""
+        n = len(self.symbols)
+        matrix = np.empty((n, n))
+        if self.layout == 'dense':
+            for i in range(n):
+                start = _triangle_start(i, n)
+                matrix[i, i:] = self._values[start:start + n - i]
+                matrix[i:, i] = matrix[i, i:]
+        else:
+            matrix.fill(np.nan)
+            np.fill_diagonal(matrix, 1.0)
+            rows = np.repeat(np.arange(n), np.diff(self._offsets))
+            values = np.asarray(self._values, dtype=np.float64)
+            matrix[rows, self._indices] = values
+            matrix[self._indices, rows] = values
+        return pd.DataFrame(matrix, index=self.symbols, columns=self.symbols)
+
+
+# ---------------- CSV + binary çifti ----------------
+
+def save_matrix_pair(filename, matrix, floor=None, clusters=None):
+    """Matrisi CSV'ye ve yanına binary .corr kardeşine birlikte kaydet
+
+    .corr başlığına yazım zamanı ve CSV'nin bayt boyutu yazılır; okuyucu
+    iki dosyanın aynı yazımdan geldiğini dosya zamanlarına bakmadan anlar
+    (git clone / checkout mtime'ları anlamsızlaştırır).
+    """
+    matrix.to_csv(filename)
+    write_correlation_matrix(matrix_path(filename), matrix, floor=floor, clusters=clusters,
+                             csv_bytes=os.path.getsize(filename))
+
+
+def load_matrix_pair(filename):
+    """CSV'nin .corr kardeşini aç - sadece CSV ile aynı yazımdan geliyorsa
+
+    CSV yoksa .corr tek başına kullanılır. CSV varsa ve başlıktaki boyut
+    tutmuyorsa (CSV sonradan ayrıca yazılmış / çekilmiş) veya .corr eski
+    formattaysa None döner - CSV okunmalıdır.
+    """
+    binary_file = matrix_path(filename)
+    if not os.path.exists(binary_file):
+        return None
+    try:
+        matrix_file = CorrelationMatrixFile(binary_file)
+    except Exception:
+        return None
+    if os.path.exists(filename) and matrix_file.csv_bytes != os.path.getsize(filename):
+        return None
+    return matrix_file
@@ -0,0 +1,585 @@
+"""
+Yerel Binance taklit sunucusu (ağ olmadan yük / verim testleri için)
+
+REST:
+    GET /api/v3/exchangeInfo
+    GET /api/v3/klines?symbol=&interval=&limit=&startTime=&endTime=
+    GET /api/v3/ticker/24hr[?symbol=]
+WebSocket (combined stream):
+    /stream?streams=<s>@ticker/<s>@kline_1m/!miniTicker@arr/!ticker@arr
+
+Fiyatlar faktör modeliyle üretilir (piyasa + sektör + sembole özel gürültü),
+böylece semboller arasında bilinen bir korelasyon yapısı oluşur.
+
+Kullanım:
+    python mock_binance_server.py --symbols 2000 --tick-rate 10
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from kline_fetcher import INTERVAL_MS
+
+try:
+    import websockets
+except ImportError:  # Opsiyonel bağımlılık - sadece REST sunulur
+    websockets = None
+
+# 24hrTicker combined-stream mesajı (sıcak yolda json.dumps yerine hazır şablon)
+TICKER_TEMPLATE = (
+    '{{"stream":"{stream}@ticker","data":{{"e":"24hrTicker","E":{E},"s":"{s}",'
+    '"p":"{p:.8f}","P":"{P:.3f}","c":"{c:.8f}","o":"{o:.8f}","h":"{h:.8f}",'
+    '"l":"{l:.8f}","v":"{v:.8f}","q":"{q:.8f}"}}}}'
+)
+
+# Binance istek ağırlıkları (X-MBX-USED-WEIGHT-1M başlığı için)
+ENDPOINT_WEIGHTS = {'exchangeInfo': 20, 'klines': 2, 'ticker/24hr': 2, 'ticker/24hr_all': 80}
+
+
+# ==================== SENTETİK PİYASA ====================
+
+class SyntheticMarket:
+    """Faktör modeliyle korelasyonlu fiyat yolları üreten sentetik piyasa
+
+    Getiri: r_i = vol_i * sigma * (beta_i * piyasa + gamma_i * sektör_s(i) + delta_i * gürültü_i)
+    Aynı sektördeki iki sembolün korelasyonu ~ beta_i*beta_j + gamma_i*gamma_j,
+    farklı sektörlerde ~ beta_i*beta_j olur.
+
+    Geçmiş barlar (interval, bar indeksi) ile tohumlandığı için deterministiktir:
+    aynı istek her zaman aynı barları döndürür.
+    """
+
+    CHUNK = 500  # Tek seferde üretilen bar sayısı
+
+    def __init__(self, n_symbols=200, n_sectors=8, seed=42, sigma_1m=0.002,
+                 history_bars=20000, start_ms=None):
+        """
+        n_symbols: Sembol sayısı
+        n_sectors: Sektör (ortak faktör) sayısı
+        seed: Rastgele tohum
+        sigma_1m: 1 dakikalık bar getirisinin tipik standart sapması
+        history_bars: Her interval için sunulabilecek geçmiş bar sayısı
+        start_ms: Piyasa saati başlangıcı (None = şimdi)
+        """
+        rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.n_symbols = n_symbols
+        self.n_sectors = n_sectors
+        self.sigma_1m = sigma_1m
+        self.history_bars = history_bars
+        self.start_ms = int(time.time() * 1000) if start_ms is None else start_ms
+
+        self.symbols = [f"MOCK{i:04d}USDT" for i in range(n_symbols)]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.sector = np.arange(n_symbols) % n_sectors
+        self.beta = rng.uniform(0.4, 0.9, n_symbols)
+        self.gamma = rng.uniform(0.2, 0.6, n_symbols)
+        self.delta = np.sqrt(np.maximum(0.05, 1 - self.beta ** 2 - self.gamma ** 2))
+        self.vol = rng.uniform(0.5, 2.0, n_symbols)
+        self.log_p0 = np.log(rng.lognormal(0, 3, n_symbols).clip(1e-4, 1e5))
+
+        self._levels = {}  # interval_ms -> chunk başlangıç log fiyatları listesi
+        self._levels_lock = threading.Lock()
+
+    # ---------------- Faktör modeli ----------------
+    def factor_returns(self, rng, n_steps, sigma):
+        """n_steps × n_symbols korelasyonlu log getiri matrisi"""
+        market = rng.standard_normal((n_steps, 1))
+        sectors = rng.standard_normal((n_steps, self.n_sectors))[:, self.sector]
+        noise = rng.standard_normal((n_steps, self.n_symbols))
+        shocks = self.beta * market + self.gamma * sectors + self.delta * noise
+        return (sigma * self.vol * shocks).astype(np.float32)
+
+    def true_correlation(self):
+        """Modelin teorik korelasyon matrisi (doğrulama için)"""
+        same_sector = self.sector[:, None] == self.sector[None, :]
+        cov = np.outer(self.beta, self.beta) + np.outer(self.gamma, self.gamma) * same_sector
+        np.fill_diagonal(cov, 1.0)
+        return cov / np.sqrt(np.outer(np.diag(cov), np.diag(cov)))
+
+    # ---------------- Geçmiş barlar ----------------
+    def _origin(self, interval_ms):
+        """Bu interval için üretilebilen ilk bar indeksi"""
+        return self.start_ms // interval_ms - self.history_bars
+
+    @lru_cache(maxsize=16)
+    def _chunk(self, interval_ms, chunk):
+        """Bir chunk'ın (CHUNK × n_symbols) getiri, fitil ve hacim gürültüsü"""
+        rng = np.random.default_rng([self.seed, interval_ms, chunk])
+        sigma = self.sigma_1m * np.sqrt(interval_ms / 60000)
+        returns = self.factor_returns(rng, self.CHUNK, sigma)
+        wicks = np.abs(rng.standard_normal((self.CHUNK, self.n_symbols))).astype(np.float32) * sigma * 0.5
+        volumes = rng.lognormal(8, 1, (self.CHUNK, self.n_symbols)).astype(np.float32)
+        return returns, wicks, volumes
+
+    def _chunk_level(self, interval_ms, chunk):
+        """Chunk başındaki log fiyatlar (chunk'lar sırayla biriktirilir, önbelleklenir)"""
+        first_chunk = self._origin(interval_ms) // self.CHUNK
+        with self._levels_lock:
+            levels = self._levels.setdefault(interval_ms, [self.log_p0])
+            while len(levels) <= chunk - first_chunk:
+                returns = self._chunk(interval_ms, first_chunk + len(levels) - 1)[0]
+                levels.append(levels[-1] + returns.sum(axis=0, dtype=np.float64))
+            return levels[chunk - first_chunk]
+
+    def bars(self, symbol_index, interval_ms, first, last):
+        """[first, last) bar indeksleri için (open, high, low, close, volume) dizileri"""
+        first = max(first, self._origin(interval_ms))
+        if last <= first:
+            empty = np.empty(0)
+            return first, empty, empty, empty, empty, empty
+
+        parts = []
+        for chunk in range(first // self.CHUNK, (last - 1) // self.CHUNK + 1):
+            returns, wicks, volumes = self._chunk(interval_ms, chunk)
+            level = self._chunk_level(interval_ms, chunk)[symbol_index]
+            log_close = level + np.cumsum(returns[:, symbol_index], dtype=np.float64)
+            log_open = np.r_[level, log_close[:-1]]
+            lo = max(first, chunk * self.CHUNK) - chunk * self.CHUNK
+            hi = min(last, (chunk + 1) * self.CHUNK) - chunk * self.CHUNK
+            parts.append((log_open[lo:hi], log_close[lo:hi], wicks[lo:hi, symbol_index],
+                          volumes[lo:hi, symbol_index]))
+
+        log_open = np.concatenate([p[0] for p in parts])
+        log_close = np.concatenate([p[1] for p in parts])
+        wick = np.concatenate([p[2] for p in parts])
+        volume = np.concatenate([p[3] for p in parts]).astype(np.float64)
+        opens, closes = np.exp(log_open), np.exp(log_close)
+        highs = np.maximum(opens, closes) * np.exp(wick)
+        lows = np.minimum(opens, closes) * np.exp(-wick)
+        return first, opens, highs, lows, closes, volume
+
+    def current_prices(self, now_ms):
+        """Tüm sembollerin son kapanmış 1m barındaki fiyatları (canlı akışın başlangıcı)"""
+        index = now_ms // 60000 - 1
+        chunk = index // self.CHUNK
+        returns = self._chunk(60000, chunk)[0]
+        offset = index - chunk * self.CHUNK
+        level = self._chunk_level(60000, chunk) + returns[:offset + 1].sum(axis=0, dtype=np.float64)
+        return np.exp(level)
+
+
+# ==================== CANLI AKIŞ DURUMU ====================
+
+class LiveState:
+    """Canlı ticker / kline durumunu adım adım ilerleten vektörel durum"""
+
+    def __init__(self, market, tick_rate, seed):
+        self.market = market
+        self.tick_rate = tick_rate
+        self.rng = np.random.default_rng([seed, 1])
+        # Her adımın getirisi: 1 dakikalık sigma'nın adım sayısına bölünmüş hali
+        self.step_sigma = market.sigma_1m / np.sqrt(60 * tick_rate)
+        now = int(time.time() * 1000)
+        self.price = market.current_prices(now)
+        self.open_24h = self.price.copy()
+        self.high_24h = self.price.copy()
+        self.low_24h = self.price.copy()
+        self.volume_24h = np.zeros(market.n_symbols)
+        self._new_bar(now // 60000 * 60000)
+
+    def _new_bar(self, open_time):
+        self.bar_open_time = open_time
+        self.bar_open = self.price.copy()
+        self.bar_high = self.price.copy()
+        self.bar_low = self.price.copy()
+        self.bar_volume = np.zeros(self.market.n_symbols)
+
+    def step(self, now_ms):
+        """Fiyatları bir adım ilerlet; kapanan bar varsa (open_time, o, h, l, c, v) döndür"""
+        closed = None
+        if now_ms // 60000 * 60000 != self.bar_open_time:
+            closed = (self.bar_open_time, self.bar_open, self.bar_high, self.bar_low,
+                      self.price.copy(), self.bar_volume)
+            self._new_bar(now_ms // 60000 * 60000)
+
+        returns = self.market.factor_returns(self.rng, 1, self.step_sigma)[0]
+        self.price = self.price * np.exp(returns.astype(np.float64))
+        traded = self.rng.lognormal(2, 1, self.market.n_symbols)
+        np.maximum(self.high_24h, self.price, out=self.high_24h)
+        np.minimum(self.low_24h, self.price, out=self.low_24h)
+        np.maximum(self.bar_high, self.price, out=self.bar_high)
+        np.minimum(self.bar_low, self.price, out=self.bar_low)
+        self.volume_24h += traded
+        self.bar_volume += traded
+        return closed
+
+
+# ==================== SUNUCU ====================
+
+class MockBinanceServer:
+    """REST + combined-stream WebSocket sunan yerel Binance taklidi
+
+    base_url ve stream_url doğrudan BinanceWebSocket / CorrelationAnalyzer'a verilebilir.
+    """
+
+    def __init__(self, n_symbols=200, tick_rate=1.0, n_sectors=8, seed=42,
+                 host='127.0.0.1', rest_port=0, ws_port=0, weight_limit=6000):
+        """
+        n_symbols: Sembol sayısı
+        tick_rate: Sembol başına saniyedeki ticker güncellemesi (Binance = 1)
+        n_sectors: Sektör (ortak faktör) sayısı
+        seed: Rastgele tohum
+        host: Dinlenecek adres
+        rest_port / ws_port: Portlar (0 = boş port seç)
+        weight_limit: Dakikalık istek ağırlığı limiti (aşılınca 429, None = sınırsız)
+        """
+        self.market = SyntheticMarket(n_symbols, n_sectors, seed)
+        self.tick_rate = tick_rate
+        self.seed = seed
+        self.host = host
+        self.rest_port = rest_port
+        self.ws_port = ws_port
+        self.weight_limit = weight_limit
+        self.live = None
+        self.stats = {'rest_requests': 0, 'ws_messages': 0, 'ws_clients': 0}
+
+        self._weight = 0
+        self._weight_minute = 0
+        self._weight_lock = threading.Lock()
+        self._http = None
+        self._http_thread = None
+        self._loop = None
+        self._ws_thread = None
+        self._clients = {}  # ws -> abonelikler
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.rest_port}/api/v3"
+
+    @property
+    def stream_url(self):
+        return f"ws://{self.host}:{self.ws_port}/stream"
+
+    # ---------------- Başlatma / durdurma ----------------
+    def start(self):
+        """REST ve WebSocket sunucularını arka plan thread'lerinde başlat"""
+        self._http = ThreadingHTTPServer((self.host, self.rest_port), self._make_handler())
+        self._http.daemon_threads = True
+        self.rest_port = self._http.server_address[1]
+        self._http_thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._http_thread.start()
+
+        if websockets is not None:
+            self.live = LiveState(self.market, self.tick_rate, self.seed)
+            ready = threading.Event()
+            self._ws_thread = threading.Thread(target=self._run_ws, args=(ready,), daemon=True)
+            self._ws_thread.start()
+            ready.wait()
+        else:
+            print("⚠️  'websockets' paketi yok - sadece REST sunuluyor")
+
+        print(f"✓ Mock Binance hazır: {self.market.n_symbols} sembol, {self.tick_rate:g} tick/sn")
+        print(f"  REST:   {self.base_url}")
+        print(f"  Stream: {self.stream_url}")
+        return self
+
+    def stop(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._shutdown.set)
+            self._ws_thread.join(timeout=5)
+            self._loop = None
+
+    # ---------------- REST ----------------
+    def _use_weight(self, weight):
+        """Dakikalık ağırlık sayacını artır; (kullanılan ağırlık, limit aşıldı mı)"""
+        with self._weight_lock:
+            minute = int(time.time() // 60)
+            if minute != self._weight_minute:
+                self._weight_minute = minute
+                self._weight = 0
+            self._weight += weight
+            over = self.weight_limit is not None and self._weight > self.weight_limit
+            return self._weight, over
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                endpoint = url.path.replace('/api/v3/', '', 1)
+                server.stats['rest_requests'] += 1
+
+                weight_key = 'ticker/24hr_all' if endpoint == 'ticker/24hr' and 'symbol' not in params else endpoint
+                used, over = server._use_weight(ENDPOINT_WEIGHTS.get(weight_key, 1))
+                if over:
+                    retry_after = 60 - int(time.time()) % 60
+                    return self._send(429, {'code': -1003, 'msg': 'Too many requests.'},
+                                      used, {'Retry-After': str(retry_after)})
+                try:
+                    if endpoint == 'exchangeInfo':
+                        body = server.exchange_info()
+                    elif endpoint == 'klines':
+                        body = server.klines(params)
+                    elif endpoint == 'ticker/24hr':
+                        body = server.ticker_24hr(params.get('symbol'))
+                    elif url.path == '/mock/stats':
+                        body = dict(server.stats)
+                    else:
+                        return self._send(404, {'code': -1, 'msg': 'Not found.'}, used)
+                except ValueError as e:
+                    return self._send(400, {'code': -1121, 'msg': str(e)}, used)
+                self._send(200, body, used)
+
+            def _send(self, status, body, used, headers=None):
+                payload = json.dumps(body, separators=(',', ':')).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.send_header('X-MBX-USED-WEIGHT-1M', str(used))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # İstek başına log basma
+
+        return Handler
+
+    def _symbol_index(self, symbol):
+        if symbol not in self.market.index:
+            raise ValueError('Invalid symbol.')
+        return self.market.index[symbol]
+
+    def exchange_info(self):
+        return {
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'symbols': [{'symbol': s, 'status': 'TRADING', 'baseAsset': s[:-4], 'quoteAsset': 'USDT'}
+                        for s in self.market.symbols],
+        }
+
+    def klines(self, params):
+        """Binance /klines formatında barlar (en fazla 1000)"""
+        index = self._symbol_index(params.get('symbol'))
+        interval = params.get('interval', '1m')
+        if interval not in INTERVAL_MS:
+            raise ValueError('Invalid interval.')
+        interval_ms = INTERVAL_MS[interval]
+        limit = min(int(params.get('limit', 500)), 1000)
+        now_index = int(time.time() * 1000) // interval_ms
+
+        end_index = now_index + 1
+        if 'endTime' in params:
+            end_index = min(end_index, int(params['endTime']) // interval_ms + 1)
+        if 'startTime' in params:
+            first = -(-int(params['startTime']) // interval_ms)  # Yukarı yuvarla
+            last = min(end_index, first + limit)
+        else:
+            last = end_index
+            first = last - limit
+
+        first, opens, highs, lows, closes, volumes = self.market.bars(index, interval_ms, first, last)
+        rows = []
+        for k in range(len(closes)):
+            open_time = (first + k) * interval_ms
+            rows.append([
+                open_time, f"{opens[k]:.8f}", f"{highs[k]:.8f}", f"{lows[k]:.8f}", f"{closes[k]:.8f}",
+                f"{volumes[k]:.8f}", open_time + interval_ms - 1, f"{volumes[k] * closes[k]:.8f}",
+                100, f"{volumes[k] / 2:.8f}", f"{volumes[k] * closes[k] / 2:.8f}", "0",
+            ])
+        return rows
+
+    def ticker_24hr(self, symbol=None):
+        indices = [self._symbol_index(symbol)] if symbol else range(self.market.n_symbols)
+        now = int(time.time() * 1000)
+        live = self.live
+        price = live.price if live else self.market.current_prices(now)
+        open_24h = live.open_24h if live else price
+        result = []
+        for i in indices:
+            change = price[i] - open_24h[i]
+            result.append({
+                'symbol': self.market.symbols[i],
+                'priceChange': f"{change:.8f}",
+                'priceChangePercent': f"{change / open_24h[i] * 100:.3f}",
+                'lastPrice': f"{price[i]:.8f}",
+                'openPrice': f"{open_24h[i]:.8f}",
+                'highPrice': f"{(live.high_24h[i] if live else price[i]):.8f}",
+                'lowPrice': f"{(live.low_24h[i] if live else price[i]):.8f}",
+                'volume': f"{(live.volume_24h[i] if live else 0.0):.8f}",
+                'quoteVolume': f"{(live.volume_24h[i] * price[i] if live else 0.0):.8f}",
+                'openTime': now - 86400000, 'closeTime': now, 'count': 100,
+            })
+        return result[0] if symbol else result
+
+    # ---------------- WebSocket ----------------
+    def _run_ws(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._shutdown = asyncio.Event()
+
+        async def main():
+            async with websockets.serve(self._handle, self.host, self.ws_port, max_size=None) as ws_server:
+                self.ws_port = list(ws_server.sockets)[0].getsockname()[1]
+                ready.set()
+                producer = asyncio.ensure_future(self._produce())
+                await self._shutdown.wait()
+                producer.cancel()
+
+        try:
+            self._loop.run_until_complete(main())
+        finally:
+            self._loop.close()
+
+    def _subscription(self, path):
+        """Combined-stream URL'inden abonelikleri çıkar"""
+        query = parse_qs(urlparse(path).query)
+        streams = query.get('streams', [''])[0].split('/')
+        tickers, klines, arrays = [], [], []
+        for stream in filter(None, streams):
+            if stream in ('!miniTicker@arr', '!ticker@arr'):
+                arrays.append(stream)
+                continue
+            name, _, kind = stream.partition('@')
+            index = self.market.index.get(name.upper())
+            if index is None:
+                continue
+            if kind == 'ticker':
+                tickers.append(index)
+            elif kind == 'kline_1m':
+                klines.append(index)
+        return {'tickers': tickers, 'klines': klines, 'arrays': arrays}
+
+    async def _handle(self, ws, path=None):
+        # websockets>=13: yol ws.request.path içinde, eski API'de ikinci argüman
+        if path is None:
+            request = getattr(ws, 'request', None)
+            path = request.path if request is not None else ws.path
+        self._clients[ws] = self._subscription(path)
+        self.stats['ws_clients'] += 1
+        try:
+            await ws.wait_closed()
+        finally:
+            self._clients.pop(ws, None)
+
+    async def _produce(self):
+        """tick_rate hızında fiyatları ilerlet ve abonelere gönder"""
+        period = 1.0 / self.tick_rate
+        next_step = time.perf_counter()
+        while True:
+            next_step += period
+            await asyncio.sleep(max(0.0, next_step - time.perf_counter()))
+            now = int(time.time() * 1000)
+            closed = self.live.step(now)
+            if not self._clients:
+                continue
+            clients = list(self._clients.items())
+            messages = self._build_messages(clients, now, closed)
+            await asyncio.gather(*(self._send_all(ws, batch) for ws, batch in messages),
+                                 return_exceptions=True)
+
+    def _build_messages(self, clients, now, closed):
+        live = self.live
+        symbols = self.market.symbols
+        # numpy skalerlerine tek tek erişmek yavaş - adım başına bir kez listeye çevir
+        price = live.price.tolist()
+        open_24h = live.open_24h.tolist()
+        high_24h = live.high_24h.tolist()
+        low_24h = live.low_24h.tolist()
+        volume_24h = live.volume_24h.tolist()
+        change_pct = ((live.price / live.open_24h - 1) * 100).tolist()
+        ticker_cache = {}
+        out = []
+        for ws, sub in clients:
+            batch = []
+            for i in sub['tickers']:
+                message = ticker_cache.get(i)
+                if message is None:
+                    message = TICKER_TEMPLATE.format(
+                        stream=symbols[i].lower(), E=now, s=symbols[i],
+                        p=price[i] - open_24h[i], P=change_pct[i], c=price[i], o=open_24h[i],
+                        h=high_24h[i], l=low_24h[i], v=volume_24h[i], q=volume_24h[i] * price[i])
+                    ticker_cache[i] = message
+                batch.append(message)
+            for stream in sub['arrays']:
+                mini = stream == '!miniTicker@arr'
+                data = []
+                for i in range(self.market.n_symbols):
+                    item = {'e': '24hrMiniTicker' if mini else '24hrTicker', 'E': now, 's': symbols[i],
+                            'c': f"{price[i]:.8f}", 'o': f"{open_24h[i]:.8f}",
+                            'h': f"{high_24h[i]:.8f}", 'l': f"{low_24h[i]:.8f}",
+                            'v': f"{volume_24h[i]:.8f}", 'q': f"{volume_24h[i] * price[i]:.8f}"}
+                    if not mini:
+                        item['P'] = f"{change_pct[i]:.3f}"
+                    data.append(item)
+                batch.append(json.dumps({'stream': stream, 'data': data}, separators=(',', ':')))
+            if closed is not None:
+                open_time, o, h, l, c, v = closed
+                for i in sub['klines']:
+                    batch.append(json.dumps({'stream': f"{symbols[i].lower()}@kline_1m", 'data': {
+                        'e': 'kline', 'E': now, 's': symbols[i], 'k': {
+                            't': open_time, 'T': open_time + 59999, 's': symbols[i], 'i': '1m',
+                            'o': f"{o[i]:.8f}", 'h': f"{h[i]:.8f}", 'l': f"{l[i]:.8f}",
+                            'c': f"{c[i]:.8f}", 'v': f"{v[i]:.8f}", 'x': True,
+                        }}}, separators=(',', ':')))
+            out.append((ws, batch))
+        return out
+
+    async def _send_all(self, ws, batch):
+        for message in batch:
+            await ws.send(message)
+        self.stats['ws_messages'] += len(batch)
+
+
+def _serve_forever(kwargs, urls):
+    server = MockBinanceServer(**kwargs).start()
+    urls.put((server.base_url, server.stream_url))
+    while True:
+        time.sleep(1)
+
+
+def start_in_subprocess(**kwargs):
+    """Sunucuyu ayrı bir süreçte başlat (istemciyle GIL paylaşmasın)
+
+    Dönen: (process, base_url, stream_url) - işiniz bitince process.terminate()
+    """
+    import multiprocessing
+
+    urls = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve_forever, args=(kwargs, urls), daemon=True)
+    process.start()
+    base_url, stream_url = urls.get(timeout=60)
+    return process, base_url, stream_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Binance taklit sunucusu")
+    parser.add_argument('--symbols', type=int, default=200, help="Sembol sayısı")
+    parser.add_argument('--tick-rate', type=float, default=1.0, help="Sembol başına saniyedeki ticker güncellemesi")
+    parser.add_argument('--sectors', type=int, default=8, help="Sektör (ortak faktör) sayısı")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--rest-port', type=int, default=8080)
+    parser.add_argument('--ws-port', type=int, default=8081)
+    parser.add_argument('--weight-limit', type=int, default=6000, help="Dakikalık ağırlık limiti (0 = sınırsız)")
+    args = parser.parse_args()
+
+    server = MockBinanceServer(args.symbols, args.tick_rate, args.sectors, args.seed,
+                               args.host, args.rest_port, args.ws_port, args.weight_limit or None)
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
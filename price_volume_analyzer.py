@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import json
+from tick_store import TickRingBuffer, TickSnapshot
 
 class PriceVolumeAnalyzer:
     def __init__(self, correlation_threshold=0.5):
@@ -14,6 +15,17 @@ class PriceVolumeAnalyzer:
         """Fiyat ve volume verilerini DataFrame'e dönüştür"""
         print("\nFiyat ve Volume verileri DataFrame'e dönüştürülüyor...")
         
+        if isinstance(price_volume_data, TickSnapshot):
+            # Zaten hizalanmış matrisler - kopyalamadan DataFrame'e sar
+            if len(price_volume_data) < 2 or len(price_volume_data.symbols) == 0:
+                print("Yeterli veri bulunamadı!")
+                return None, None, None
+            df_prices = price_volume_data.to_frame('price', suffix='_price')
+            df_volumes = price_volume_data.to_frame('volume', suffix='_volume')
+            df_changes = price_volume_data.to_frame('price_change_percent', suffix='_change')
+            print(f"DataFrame'ler hazırlandı: {len(df_prices)} satır, {len(df_prices.columns)} coin")
+            return df_prices, df_volumes, df_changes
+        
         price_series = {}
         volume_series = {}
         price_change_series = {}
@@ -22,14 +34,23 @@ class PriceVolumeAnalyzer:
             if len(data_list) < 2:
                 continue
             
-            timestamps = [item['timestamp'] for item in data_list]
-            prices = [item['price'] for item in data_list]
-            volumes = [item['volume'] for item in data_list]
-            price_changes = [item['price_change_percent'] for item in data_list]
+            if isinstance(data_list, TickRingBuffer):
+                # Ring buffer kolonları (timestamp epoch ms)
+                arrays = data_list.arrays()
+                timestamps = pd.to_datetime(arrays['timestamp'], unit='ms')
+                prices = arrays['price']
+                volumes = arrays['volume']
+                price_changes = arrays['price_change_percent']
+            else:
+                timestamps = [item['timestamp'] for item in data_list]
+                prices = [item['price'] for item in data_list]
+                volumes = [item['volume'] for item in data_list]
+                price_changes = [item['price_change_percent'] for item in data_list]
             
-            price_series[symbol] = pd.Series(prices, index=timestamps, name=f"{symbol}_price")
-            volume_series[symbol] = pd.Series(volumes, index=timestamps, name=f"{symbol}_volume")
-            price_change_series[symbol] = pd.Series(price_changes, index=timestamps, name=f"{symbol}_change")
+            # Kolon isimleri analiz fonksiyonlarının beklediği '<symbol>_price' formatında
+            price_series[f"{symbol}_price"] = pd.Series(prices, index=timestamps, name=f"{symbol}_price")
+            volume_series[f"{symbol}_volume"] = pd.Series(volumes, index=timestamps, name=f"{symbol}_volume")
+            price_change_series[f"{symbol}_change"] = pd.Series(price_changes, index=timestamps, name=f"{symbol}_change")
         
         if not price_series:
             print("Yeterli veri bulunamadı!")
@@ -126,8 +147,8 @@ class PriceVolumeAnalyzer:
         if df_prices is None:
             return None
         
-        # 2. Yeniden örnekleme
-        if resample_interval:
+        # 2. Yeniden örnekleme (TickSnapshot zaten hizalı)
+        if resample_interval and not isinstance(price_volume_data, TickSnapshot):
             print(f"Veriler {resample_interval} aralığıyla yeniden örnekleniyor...")
             df_prices = df_prices.resample(resample_interval).last().ffill()
             df_volumes = df_volumes.resample(resample_interval).last().ffill()
@@ -411,8 +432,8 @@ class PriceVolumeAnalyzer:
         if df_prices is None:
             return None
         
-        # 2. Yeniden örnekleme (isteğe bağlı)
-        if resample_interval:
+        # 2. Yeniden örnekleme (isteğe bağlı, TickSnapshot zaten hizalı)
+        if resample_interval and not isinstance(price_volume_data, TickSnapshot):
             print(f"Veriler {resample_interval} aralığıyla yeniden örnekleniyor...")
             df_prices = df_prices.resample(resample_interval).last().ffill()
             df_volumes = df_volumes.resample(resample_interval).last().ffill()
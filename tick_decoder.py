@@ -0,0 +1,180 @@
+import json
+import threading
+import numpy as np
+from tick_store import now_ms
+
+# Opsiyonel hızlı JSON çözücüler (yoksa stdlib json kullanılır)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+def available_backends():
+    """Bu ortamda kullanılabilen JSON çözücüler (tercih sırasına göre)"""
+    backends = []
+    if orjson is not None:
+        backends.append('orjson')
+    if simdjson is not None:
+        backends.append('simdjson')
+    backends.append('json')
+    return backends
+
+
+# simdjson Parser'ı tek bir canlı doküman tutar ve thread'ler arasında paylaşılamaz
+_simdjson_local = threading.local()
+
+
+def _simdjson_loads(message):
+    """simdjson ile çöz, sonucu hemen Python nesnesine çevir (thread başına bir Parser)
+
+    Tek sembol stream'i nesne, tüm piyasa stream'i (!miniTicker@arr) dizi döner.
+    """
+    parser = getattr(_simdjson_local, 'parser', None)
+    if parser is None:
+        parser = _simdjson_local.parser = simdjson.Parser()
+    document = parser.parse(message)
+    if isinstance(document, simdjson.Object):
+        return document.as_dict()
+    if isinstance(document, simdjson.Array):
+        return document.as_list()
+    return document
+
+
+class TickerDecoder:
+    """24hrTicker mesajlarından sadece gerekli alanları (s, c, v, P, E) çıkaran çözücü
+
+    Dönen tick formatı: (symbol, event_time_ms, price, volume, price_change_percent)
+    Zaman damgası olarak borsanın event time'ı (E, int ms) kullanılır.
+    """
+
+    def __init__(self, backend=None):
+        """
+        backend: 'orjson', 'simdjson' veya 'json' (None = mevcut en hızlısı)
+        """
+        if backend is None:
+            backend = available_backends()[0]
+        if backend not in available_backends():
+            raise ValueError(f"JSON çözücü bulunamadı: {backend}")
+        self.backend = backend
+
+        if backend == 'orjson':
+            self._loads = orjson.loads
+        elif backend == 'simdjson':
+            self._loads = _simdjson_loads
+        else:
+            self._loads = json.loads
+
+    def loads(self, message):
+        """Ham mesajı seçili çözücüyle Python nesnesine çevir"""
+        return self._loads(message)
+
+    def decode(self, message):
+        """Tek ticker mesajını tick listesine çevir (combined veya single stream)"""
+        data = self._loads(message)
+        stream_data = data.get('data', data)  # combined veya single stream farkı
+        tick = self.extract(stream_data)
+        return [tick] if tick is not None else []
+
+    @staticmethod
+    def extract(stream_data):
+        """Ticker dict'inden minimum alanları çıkar (geçersizse None)"""
+        symbol = stream_data.get('s')
+        price = stream_data.get('c')
+        if not symbol or price is None:
+            return None
+        price = float(price)
+        if price <= 0:
+            return None
+        event_time = stream_data.get('E')
+        return (
+            symbol,
+            int(event_time) if event_time is not None else now_ms(),
+            price,
+            float(stream_data.get('v', 0)),
+            float(stream_data.get('P', 0)),
+        )
+
+    def _array_items(self, message, symbol_filter=None):
+        """Tüm piyasa dizi mesajındaki ticker dict'leri (filtrelenmiş)"""
+        data = self._loads(message)
+        items = data.get('data', data) if isinstance(data, dict) else data
+        if symbol_filter is not None:
+            items = [item for item in items if item.get('s') in symbol_filter]
+        return items
+
+    def decode_array(self, message, symbol_filter=None):
+        """Tüm piyasa dizi mesajını (!miniTicker@arr / !ticker@arr) tek adımda çöz
+
+        symbol_filter: Sadece bu kümedeki semboller alınır (None = hepsi)
+        Dönen format: (symbols, event_times int64[n], prices, volumes, price_changes)
+        """
+        items = self._array_items(message, symbol_filter)
+        symbols = [item['s'] for item in items]
+        event_times = np.array([item['E'] for item in items], dtype=np.int64)
+        prices = np.array([item['c'] for item in items], dtype=np.float64)
+        volumes = np.array([item['v'] for item in items], dtype=np.float64)
+        if items and 'P' in items[0]:
+            price_changes = np.array([item['P'] for item in items], dtype=np.float64)
+        else:
+            # miniTicker'da P yok - 24 saatlik açılış fiyatından hesapla
+            opens = np.array([item['o'] for item in items], dtype=np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                price_changes = np.where(opens > 0, (prices - opens) / opens * 100, 0.0)
+
+        valid = prices > 0
+        if not valid.all():
+            symbols = [symbol for symbol, ok in zip(symbols, valid) if ok]
+            event_times, prices = event_times[valid], prices[valid]
+            volumes, price_changes = volumes[valid], price_changes[valid]
+        return symbols, event_times, prices, volumes, price_changes
+
+    def decode_kline(self, message):
+        """Kline mesajını bar listesine çevir (sadece kapanmış barlar)
+
+        Borsa barı kapattığında (k.x = true) tek bir kesin OHLCV kaydı gönderir;
+        açık bar güncellemeleri atlanır.
+        Dönen format: [(symbol, open_time_ms, open, high, low, close, volume)]
+        """
+        data = self._loads(message)
+        stream_data = data.get('data', data)
+        kline = stream_data.get('k')
+        if not kline or not kline.get('x'):
+            return []
+        close = float(kline['c'])
+        if close <= 0:
+            return []
+        return [(
+            kline.get('s') or stream_data.get('s'),
+            int(kline['t']),
+            float(kline['o']),
+            float(kline['h']),
+            float(kline['l']),
+            close,
+            float(kline['v']),
+        )]
+
+    def decode_array_ticks(self, message, symbol_filter=None):
+        """Tüm piyasa dizi mesajını tick listesine çevir (batch'leyen asyncio yolu için)
+
+        Tuple'lar doğrudan dict'lerden kurulur; kolon dizileri gerekiyorsa
+        decode_array + TickStore.append_columns kullanılır.
+        """
+        ticks = []
+        for item in self._array_items(message, symbol_filter):
+            price = float(item['c'])
+            if price <= 0:
+                continue
+            if 'P' in item:
+                price_change = float(item['P'])
+            else:
+                # miniTicker'da P yok - 24 saatlik açılış fiyatından hesapla
+                open_price = float(item['o'])
+                price_change = (price - open_price) / open_price * 100 if open_price > 0 else 0.0
+            ticks.append((item['s'], int(item['E']), price, float(item['v']), price_change))
+        return ticks
@@ -0,0 +1,168 @@
+import json
+import struct
+import threading
+import time
+
+# Dosya başlığı: MAGIC + uint32 meta uzunluğu + JSON meta
+CAPTURE_MAGIC = b'TICKCAP1'
+# Kayıt başlığı: alınma zamanı (uint64 ns) + uzunluk (uint32) + kanal (uint8), ardından ham frame
+FRAME_HEADER = struct.Struct('<QIB')
+
+# Kanal numaraları (frame'in hangi handler'a gideceği)
+CHANNEL_TICKER = 0
+CHANNEL_KLINE = 1
+
+
+class TickRecorder:
+    """on_message'a gelen ham frame'leri uzunluk önekli ikili dosyaya yazar
+
+    Format, replay sırasında mesajları aynı sırada ve aynı zamanlama
+    aralıklarıyla tekrar oynatmaya yetecek kadar bilgi içerir.
+    """
+
+    def __init__(self, path, meta=None):
+        """
+        path: Kayıt dosyası (.tcap)
+        meta: Başlığa yazılacak bilgiler (örn: stream_mode, market_stream)
+        """
+        self.path = path
+        self.frames = 0
+        self.bytes = 0
+        self._lock = threading.Lock()  # Birden çok WebSocket thread'i aynı dosyaya yazar
+        self._file = open(path, 'wb')
+        header = json.dumps(meta or {}, ensure_ascii=False).encode('utf-8')
+        self._file.write(CAPTURE_MAGIC + struct.pack('<I', len(header)) + header)
+
+    def record(self, message, channel=CHANNEL_TICKER, recv_ns=None):
+        """Tek bir ham frame'i kaydet (str veya bytes)"""
+        if recv_ns is None:
+            recv_ns = time.time_ns()
+        payload = message.encode('utf-8') if isinstance(message, str) else message
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(FRAME_HEADER.pack(recv_ns, len(payload), channel))
+            self._file.write(payload)
+            self.frames += 1
+            self.bytes += len(payload)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture_meta(path):
+    """Kayıt dosyasının başlık bilgilerini oku"""
+    with open(path, 'rb') as f:
+        return _read_header(f)
+
+
+def _read_header(f):
+    magic = f.read(len(CAPTURE_MAGIC))
+    if magic != CAPTURE_MAGIC:
+        raise ValueError(f"Geçersiz kayıt dosyası: {f.name}")
+    (length,) = struct.unpack('<I', f.read(4))
+    return json.loads(f.read(length).decode('utf-8'))
+
+
+def read_frames(path):
+    """Kayıt dosyasındaki frame'leri sırayla döndür: (recv_ns, channel, payload)
+
+    Yarım yazılmış son kayıt (örn: süreç öldürüldüyse) sessizce atlanır.
+    """
+    with open(path, 'rb') as f:
+        _read_header(f)
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            recv_ns, length, channel = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield recv_ns, channel, payload
+
+
+class TickReplayer:
+    """Kaydedilmiş frame'leri BinanceWebSocket handler'larından tekrar geçirir
+
+    speed: 1.0 = kayıttaki gerçek zamanlama, N = N kat hızlı, None = bekleme yok (maksimum hız)
+    """
+
+    def __init__(self, client, path, speed=1.0):
+        """
+        client: BinanceWebSocket (on_message / on_kline_message sağlar)
+        path: Kayıt dosyası
+        speed: Oynatma hızı (None = maksimum)
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("speed pozitif olmalı (maksimum hız için None)")
+        self.client = client
+        self.path = path
+        self.speed = speed
+        self.meta = read_capture_meta(path)
+
+    def replay(self, limit=None):
+        """Frame'leri oynat ve verim / gecikme istatistiklerini döndür
+
+        limit: En fazla bu kadar frame oynat (None = hepsi)
+        Dönen dict: frames, bytes, elapsed, frames_per_second,
+                    handler_us (p50/p99/max), lag_ms (p50/p99/max, sadece zamanlı oynatmada)
+        """
+        handlers = {
+            CHANNEL_TICKER: self.client.on_message,
+            CHANNEL_KLINE: self.client.on_kline_message,
+        }
+        handler_ns = []
+        lags_ns = []
+        n_bytes = 0
+        first_recv = None
+        start = time.perf_counter_ns()
+
+        for recv_ns, channel, payload in read_frames(self.path):
+            if limit is not None and len(handler_ns) >= limit:
+                break
+            if first_recv is None:
+                first_recv = recv_ns
+
+            if self.speed is not None:
+                # Kayıttaki aralıkları hıza göre ölçekleyerek bekle
+                due = start + (recv_ns - first_recv) / self.speed
+                wait = due - time.perf_counter_ns()
+                if wait > 0:
+                    time.sleep(wait / 1e9)
+                lags_ns.append(max(0, time.perf_counter_ns() - due))
+
+            handler = handlers.get(channel)
+            if handler is None:
+                continue
+            t0 = time.perf_counter_ns()
+            handler(None, payload.decode('utf-8'))
+            handler_ns.append(time.perf_counter_ns() - t0)
+            n_bytes += len(payload)
+
+        elapsed = (time.perf_counter_ns() - start) / 1e9
+        stats = {
+            'frames': len(handler_ns),
+            'bytes': n_bytes,
+            'elapsed': elapsed,
+            'frames_per_second': len(handler_ns) / elapsed if elapsed > 0 else 0.0,
+            'handler_us': _percentiles(handler_ns, 1e3),
+        }
+        if lags_ns:
+            stats['lag_ms'] = _percentiles(lags_ns, 1e6)
+        return stats
+
+
+def _percentiles(samples_ns, scale):
+    if not samples_ns:
+        return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+    ordered = sorted(samples_ns)
+    n = len(ordered)
+    return {
+        'p50': ordered[n // 2] / scale,
+        'p99': ordered[min(n - 1, int(n * 0.99))] / scale,
+        'max': ordered[-1] / scale,
+    }
@@ -0,0 +1,356 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Her tick için saklanan kolonlar (sıra önemli - ring buffer kolon indeksleri)
+TICK_FIELDS = ('timestamp', 'price', 'volume', 'price_change_percent')
+
+# Kapanmış kline (OHLCV) barları için kolonlar (zaman = bar açılış zamanı)
+KLINE_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+
+class TickRingBuffer:
+    """Tek bir sembol için önceden ayrılmış, NumPy tabanlı halka tampon (ring buffer)
+
+    Tick'ler sabit boyutlu dizilere yazılır; kapasite dolunca en eski tick
+    O(1) maliyetle üzerine yazılır. Böylece ne tick başına dict oluşturulur
+    ne de periyodik temizlik gerekir.
+
+    Eşzamanlılık: yazıcılar buffer'a özel bir kilitle sıralanır (farklı
+    semboller birbirini beklemez). Okuyucular kilit almaz; sıra numarası
+    (seqlock) ile yazım sırasında okunan yarım kopyayı tespit edip tekrar dener.
+    """
+
+    def __init__(self, capacity=3600, horizon_seconds=None, fields=TICK_FIELDS):
+        """
+        capacity: Saklanacak maksimum tick sayısı (sayı ufku)
+        horizon_seconds: Okumada tutulacak zaman ufku (saniye, None = sınırsız)
+        fields: Kolon isimleri (ilk kolon her zaman timestamp, epoch ms)
+        """
+        if capacity < 1:
+            raise ValueError("capacity en az 1 olmalı")
+        self.capacity = capacity
+        self.horizon_ms = int(horizon_seconds * 1000) if horizon_seconds else None
+        self.fields = fields
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(fields) - 1), dtype=np.float64)
+        self.head = 0  # Bir sonraki yazılacak slot
+        self.count = 0  # Tampondaki geçerli tick sayısı
+        self.seq = 0  # Tek = yazım sürüyor, çift = tutarlı
+        self._write_lock = threading.Lock()
+
+    def append(self, timestamp_ms, *values):
+        """Yeni tick ekle (O(1), tampon doluysa en eskisinin üzerine yazar)"""
+        with self._write_lock:
+            self.seq += 1
+            slot = self.head
+            self.timestamps[slot] = timestamp_ms
+            self.values[slot] = values
+            self.head = (slot + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+            self.seq += 1
+
+    def extend(self, timestamps_ms, values):
+        """Birden çok tick'i tek kilitli işlemde ekle (kronolojik sırada)
+
+        timestamps_ms: int64[n] epoch ms
+        values: float64[n, kolon sayısı] (timestamp hariç kolonlar)
+        Kapasiteden fazla tick verilirse sadece son `capacity` tanesi yazılır.
+        """
+        n = len(timestamps_ms)
+        if n == 0:
+            return
+        if n > self.capacity:
+            timestamps_ms, values, n = timestamps_ms[-self.capacity:], values[-self.capacity:], self.capacity
+        with self._write_lock:
+            self.seq += 1
+            head = self.head
+            first = min(n, self.capacity - head)  # Sona kadar sığan kısım, kalanı baştan
+            self.timestamps[head:head + first] = timestamps_ms[:first]
+            self.values[head:head + first] = values[:first]
+            if first < n:
+                self.timestamps[:n - first] = timestamps_ms[first:]
+                self.values[:n - first] = values[first:]
+            self.head = (head + n) % self.capacity
+            self.count = min(self.capacity, self.count + n)
+            self.seq += 1
+
+    def _consistent_copy(self, max_retries=100):
+        """Yazıcıları bloklamadan tutarlı (timestamps, values) kopyası al
+
+        Kopya sırasında yazım olduysa (sıra numarası değiştiyse) tekrar dener;
+        çok yoğun yazımda son çare olarak yazıcı kilidini alır.
+        """
+        for _ in range(max_retries):
+            seq = self.seq
+            if seq & 1:
+                time.sleep(0)  # Yazıcıya GIL'i bırak
+                continue
+            start = (self.head - self.count) % self.capacity
+            slots = (start + np.arange(self.count)) % self.capacity
+            timestamps = self.timestamps[slots]
+            values = self.values[slots]
+            if self.seq == seq:
+                return timestamps, values
+        with self._write_lock:
+            slots = self._ordered_slots()
+            return self.timestamps[slots], self.values[slots]
+
+    def __len__(self):
+        return self.count
+
+    def _ordered_slots(self):
+        """Kronolojik sıradaki slot indekslerini döndür"""
+        start = (self.head - self.count) % self.capacity
+        return (start + np.arange(self.count)) % self.capacity
+
+    def arrays(self, since_ms=None):
+        """Tick'leri kronolojik sırada kolon dizileri olarak döndür (kopya)
+
+        since_ms: Bu zamandan (epoch ms) eski tick'leri dahil etme
+        Format: {'timestamp': int64[n], 'price': float64[n], ...}
+        """
+        timestamps, values = self._consistent_copy()
+
+        cutoff = since_ms
+        if self.horizon_ms is not None and len(timestamps) > 0:
+            horizon_cutoff = timestamps.max() - self.horizon_ms  # Eşzamanlı yazımda son tick en yenisi olmayabilir
+            cutoff = horizon_cutoff if cutoff is None else max(cutoff, horizon_cutoff)
+        if cutoff is not None:
+            keep = timestamps >= cutoff
+            timestamps = timestamps[keep]
+            values = values[keep]
+
+        result = {self.fields[0]: timestamps}
+        for i, field in enumerate(self.fields[1:]):
+            result[field] = values[:, i]
+        return result
+
+
+class TickSnapshot:
+    """Tick deposunun hizalanmış (zaman × sembol) kolonlu anlık görüntüsü
+
+    Her kolon (price, volume, ...) T×N boyutlu bir float64 matristir.
+    Satırlar sabit aralıklı zaman kovalarıdır (her kovada son tick, boşluklar
+    ileri doldurulur). Bir analiz döngüsünde bir kez oluşturulur ve tüm
+    analizörler tarafından paylaşılır.
+    """
+
+    def __init__(self, timestamps, symbols, columns, interval_ms):
+        """
+        timestamps: Kova başlangıç zamanları (int64 epoch ms, T)
+        symbols: Sembol listesi (N)
+        columns: {field: float64[T, N]}
+        interval_ms: Kova aralığı (ms)
+        """
+        self.timestamps = timestamps
+        self.symbols = symbols
+        self.columns = columns
+        self.interval_ms = interval_ms
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def index(self):
+        """Zaman kovalarını pandas DatetimeIndex olarak döndür"""
+        return pd.to_datetime(self.timestamps, unit='ms')
+
+    def to_frame(self, field='price', suffix=None):
+        """Bir kolonu DataFrame olarak döndür (matris kopyalanmaz)
+
+        suffix: Kolon isimlerine eklenecek son ek (örn: '_price')
+        """
+        columns = self.symbols if suffix is None else [f"{symbol}{suffix}" for symbol in self.symbols]
+        return pd.DataFrame(self.columns[field], index=self.index(), columns=columns, copy=False)
+
+
+def _forward_fill(matrix):
+    """NaN değerleri zaman ekseninde (satır) bir önceki değerle doldur"""
+    rows = np.arange(matrix.shape[0])[:, None]
+    last_valid = np.where(np.isnan(matrix), 0, rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return matrix[last_valid, np.arange(matrix.shape[1])]
+
+
+class TickStore:
+    """Tüm semboller için ring buffer'ları tutan tick deposu
+
+    Eski `defaultdict(list)` tabanlı price_data / price_volume_data
+    depolarının yerini alır. Sembol ilk kez görüldüğünde buffer ayrılır.
+
+    Eşzamanlılık sözleşmesi:
+    - Yazıcılar (WebSocket thread'leri / asyncio) global kilit almadan ekler;
+      sadece yeni sembol eklenirken kısa bir kilit alınır.
+    - Sembol sözlüğü copy-on-write'tır: yeni sembol eklemek veya clear()
+      sözlüğü değiştirmez, yenisiyle takas eder. Okuyucular hiçbir zaman
+      "dictionary changed size during iteration" hatası görmez.
+    - Her buffer okuması (arrays / snapshot) tutarlı bir kopyadır.
+    """
+
+    def __init__(self, capacity=3600, horizon_seconds=None, fields=TICK_FIELDS):
+        """
+        capacity: Sembol başına maksimum tick sayısı
+        horizon_seconds: Okumada tutulacak zaman ufku (saniye, None = sınırsız)
+        """
+        self.capacity = capacity
+        self.horizon_seconds = horizon_seconds
+        self.fields = fields
+        self._buffers = {}
+        self._create_lock = threading.Lock()
+
+    def _buffer(self, symbol):
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            with self._create_lock:
+                buffer = self._buffers.get(symbol)
+                if buffer is None:
+                    buffer = TickRingBuffer(self.capacity, self.horizon_seconds, self.fields)
+                    # Copy-on-write: okuyucuların elindeki sözlük değişmez
+                    buffers = dict(self._buffers)
+                    buffers[symbol] = buffer
+                    self._buffers = buffers
+        return buffer
+
+    def append(self, symbol, timestamp_ms, *values):
+        """Sembol için yeni tick ekle"""
+        self._buffer(symbol).append(timestamp_ms, *values)
+
+    def append_batch(self, ticks):
+        """Birden çok tick'i sembol başına tek kilitli yazımla ekle
+
+        ticks: [(symbol, timestamp_ms, price, volume, price_change_percent), ...]
+        """
+        if len(ticks) == 1:
+            symbol, timestamp_ms, *values = ticks[0]
+            self._buffer(symbol).append(timestamp_ms, *values)
+            return
+        groups = {}
+        for symbol, *row in ticks:
+            groups.setdefault(symbol, []).append(row)
+        for symbol, rows in groups.items():
+            if len(rows) == 1:
+                self._buffer(symbol).append(*rows[0])
+                continue
+            rows = np.array(rows, dtype=np.float64)
+            self._buffer(symbol).extend(rows[:, 0].astype(np.int64), rows[:, 1:])
+
+    def append_columns(self, symbols, timestamps_ms, values):
+        """Kolon dizilerinden (örn. tüm piyasa mesajı) tick ekle
+
+        symbols: Sembol listesi (n)
+        timestamps_ms: int64[n] epoch ms
+        values: float64[n, kolon sayısı]
+        Satırlar sembole göre gruplanır, her buffer'a kolon dilimleri tek
+        kilitli işlemle yazılır (tick başına Python tuple'ı oluşturulmaz).
+        """
+        if len(symbols) == 0:
+            return
+        if len(set(symbols)) == len(symbols):
+            # Mesaj başına sembol başına tek tick (tipik durum) - gruplama gerekmez
+            for i, symbol in enumerate(symbols):
+                self._buffer(symbol).extend(timestamps_ms[i:i + 1], values[i:i + 1])
+            return
+        names, inverse = np.unique(np.asarray(symbols), return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+        for start, end in zip(starts.tolist(), np.r_[starts[1:], len(order)].tolist()):
+            rows = order[start:end]
+            self._buffer(str(names[inverse[rows[0]]])).extend(timestamps_ms[rows], values[rows])
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def __contains__(self, symbol):
+        return symbol in self._buffers
+
+    def __getitem__(self, symbol):
+        return self._buffers[symbol]
+
+    def symbols(self):
+        return list(self._buffers.keys())
+
+    def items(self):
+        return list(self._buffers.items())
+
+    def values(self):
+        return list(self._buffers.values())
+
+    def total_points(self):
+        """Depodaki toplam tick sayısı"""
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def clear(self):
+        with self._create_lock:
+            self._buffers = {}
+
+    def snapshot(self, window_seconds=None, interval_ms=60000, min_points=2):
+        """Tüm sembolleri ortak zaman kovalarına hizalanmış matrislere dönüştür
+
+        window_seconds: Son kaç saniyelik veri (None = tampondaki tüm veri)
+        interval_ms: Kova aralığı (varsayılan 1 dakika)
+        min_points: Bu sayıdan az tick'i olan semboller atlanır
+        """
+        per_symbol = []
+        end_ms = None
+        for symbol, buffer in self.items():
+            if len(buffer) < min_points:
+                continue
+            arrays = buffer.arrays()
+            timestamps = arrays[self.fields[0]]
+            if len(timestamps) < min_points:
+                continue
+            if (timestamps[1:] < timestamps[:-1]).any():
+                # Eşzamanlı yazıcılar tick'leri sırasız ekleyebilir - zamana göre diz
+                # (stable: aynı zaman damgasında sonra eklenen sonda kalır)
+                order = np.argsort(timestamps, kind='stable')
+                arrays = {field: values[order] for field, values in arrays.items()}
+                timestamps = arrays[self.fields[0]]
+            per_symbol.append((symbol, arrays))
+            last = int(timestamps[-1])
+            end_ms = last if end_ms is None else max(end_ms, last)
+
+        fields = self.fields[1:]
+        if not per_symbol:
+            empty = {field: np.empty((0, 0)) for field in fields}
+            return TickSnapshot(np.empty(0, dtype=np.int64), [], empty, interval_ms)
+
+        end_bucket = end_ms // interval_ms
+        if window_seconds is not None:
+            start_bucket = (end_ms - int(window_seconds * 1000)) // interval_ms
+        else:
+            start_bucket = min(int(arrays[self.fields[0]][0]) for _, arrays in per_symbol) // interval_ms
+        n_rows = int(end_bucket - start_bucket + 1)
+
+        symbols = [symbol for symbol, _ in per_symbol]
+        columns = {field: np.full((n_rows, len(symbols)), np.nan) for field in fields}
+
+        for j, (_, arrays) in enumerate(per_symbol):
+            buckets = arrays[self.fields[0]] // interval_ms - start_bucket
+            keep = (buckets >= 0) & (buckets < n_rows)
+            buckets = buckets[keep]
+            if len(buckets) == 0:
+                continue
+            # Her kovadaki son tick (diziler yukarıda zamana göre sıralandı)
+            last_in_bucket = np.r_[buckets[1:] != buckets[:-1], True]
+            rows = buckets[last_in_bucket]
+            for field in fields:
+                columns[field][rows, j] = arrays[field][keep][last_in_bucket]
+
+        for field in fields:
+            columns[field] = _forward_fill(columns[field])
+
+        # Hiçbir sembolün verisi olmayan baştaki kovaları at
+        first_row = int(np.argmax(~np.isnan(columns[fields[0]]).all(axis=1)))
+        timestamps = (start_bucket + np.arange(first_row, n_rows, dtype=np.int64)) * interval_ms
+        columns = {field: matrix[first_row:] for field, matrix in columns.items()}
+        return TickSnapshot(timestamps, symbols, columns, interval_ms)
+
+
+def now_ms():
+    """Yerel saat (epoch ms)"""
+    return int(time.time() * 1000)